@@ -0,0 +1,51 @@
+"""Per-PDF CPU cost of generate_branded_pdf with and without the cached template.
+
+    python benchmarks/bench_pdf.py [--quotes 300] [--lots 5]
+
+"uncached" builds a fresh QuoteTemplate for every PDF, which is what every
+call did before templates were cached; "cached" reuses the process template.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shipquote import DEMO_LOTS, price_quote  # noqa: E402
+from shipquote.pdf import QuoteTemplate, generate_branded_pdf, get_template  # noqa: E402
+
+
+def cpu_ms_per_pdf(quotes, template_factory):
+    start = time.process_time()
+    for quote_id, result in quotes:
+        generate_branded_pdf(quote_id, "Client", "10 Downing Street, London", "Wood crate",
+                             "Front delivery", result["breakdown"], result, "EUR",
+                             template=template_factory())
+    return (time.process_time() - start) * 1000 / len(quotes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quotes", type=int, default=300)
+    parser.add_argument("--lots", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    lots = list(DEMO_LOTS)[:args.lots]
+    quotes = [(f"SQ-{i:06d}", price_quote(lots, "Wood crate", "Front delivery", 344, 1.5))
+              for i in range(args.quotes)]
+    get_template()  # build outside the timed loop, as a warm worker would have
+    uncached = cpu_ms_per_pdf(quotes, QuoteTemplate)
+    cached = cpu_ms_per_pdf(quotes, get_template)
+    print(json.dumps({
+        "quotes": args.quotes,
+        "lots_per_quote": len(lots),
+        "uncached_cpu_ms_per_pdf": round(uncached, 3),
+        "cached_cpu_ms_per_pdf": round(cached, 3),
+        "saving_pct": round(100 * (1 - cached / uncached), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
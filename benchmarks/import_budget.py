@@ -0,0 +1,115 @@
+"""Cold-start import budget: fails when importing an entry point gets slow.
+
+    python benchmarks/import_budget.py                 # exits 1 when over budget
+    python benchmarks/import_budget.py --scale 2       # on a slower machine
+
+Every entry point - the package, a worker's ``shipquote.engine``, the API,
+the CLI and the ``shipquote`` modules ``shipping-calculator.py`` imports - is
+imported in a fresh interpreter, best of ``--repeat``, and checked against
+its budget in ``BUDGETS_MS``.  pandas, pyarrow, reportlab, geopy and
+http.server are only loaded by the features that use them, so importing
+any of them at startup fails the check too, whatever the time.  The
+slowest imports are listed for each entry point that fails.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "shipping-calculator.py")
+
+BUDGETS_MS = {
+    "shipquote": 50,
+    "engine": 400,
+    "service": 500,
+    "cli": 500,
+    "app": 500,
+}
+DEFERRED = ("pandas", "pyarrow", "reportlab", "geopy", "http.server")
+
+# Imports the statement in a fresh interpreter and reports its wall time and
+# which deferred modules it loaded; -X importtime breaks it down on stderr
+PROBE = """
+import sys, time
+print("probe", file=sys.stderr, flush=True)
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, *[m for m in {deferred!r} if m in sys.modules])
+"""
+
+
+def app_modules():
+    """``shipquote`` modules the Streamlit app imports at the top level."""
+    with open(APP, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = set()
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] == "shipquote":
+            modules.add(node.module)
+        elif isinstance(node, ast.Import):
+            modules.update(a.name for a in node.names if a.name.split(".")[0] == "shipquote")
+    return sorted(modules)
+
+
+def entry_points():
+    return {
+        "shipquote": "import shipquote",
+        "engine": "import shipquote.engine",
+        "service": "import shipquote.service",
+        "cli": "import shipquote.cli",
+        "app": "import " + ", ".join(app_modules()),
+    }
+
+
+def probe(statement):
+    """``(seconds, deferred modules loaded, importtime lines)`` for one cold import."""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(statement=statement, deferred=DEFERRED)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    seconds, *loaded = child.stdout.split()
+    # Interpreter startup is reported before the marker and is not ours
+    lines = child.stderr.splitlines()
+    return float(seconds), loaded, lines[lines.index("probe") + 1:]
+
+
+def slowest(importtime_lines, n=10):
+    """The ``n`` imports with the largest cumulative time, as ``(ms, module)``."""
+    rows = []
+    for line in importtime_lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ShipQuote Pro cold-start import budget")
+    parser.add_argument("--repeat", type=int, default=5, help="cold imports per entry point; the best counts")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slower machines")
+    parser.add_argument("--only", nargs="+", choices=sorted(BUDGETS_MS), help="entry points to check")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for name, statement in entry_points().items():
+        if args.only and name not in args.only:
+            continue
+        runs = [probe(statement) for _ in range(args.repeat)]
+        seconds, loaded, lines = min(runs, key=lambda run: run[0])
+        budget = BUDGETS_MS[name] * args.scale
+        over = seconds * 1000 > budget
+        status = "OVER BUDGET" if over else ("EAGER " + ", ".join(loaded) if loaded else "ok")
+        print(f"{name:10} {seconds * 1000:8.1f} ms  budget {budget:6.0f} ms  {status}")
+        if over or loaded:
+            failures += 1
+            for ms, module in slowest(lines):
+                print(f"    {ms:8.1f} ms  {module}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
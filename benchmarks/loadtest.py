@@ -0,0 +1,235 @@
+"""Concurrent-session load test of the Streamlit app.
+
+    python benchmarks/loadtest.py                          # 1, 2, 4, 8 and 16 sessions
+    python benchmarks/loadtest.py --sessions 1 8 32 --rounds 5 -o load.json
+
+Each simulated session drives ``shipping-calculator.py`` through Streamlit's
+``AppTest`` like a user would: select lots, type an address, switch
+currency and click "Generate PDF Quote", ``--rounds`` times over.  All
+sessions of a concurrency level run on their own threads in one process,
+sharing its caches as they would share one server; every level runs in a
+fresh process so its memory figures start from the same warm baseline.
+
+Geocoding is served by a ``ReplayGeocoder`` over ``benchmarks/geocodes.json``
+with ``--geocode-latency`` seconds per lookup, and quotes are saved to a
+throwaway quote store.  For every level the report has p50/p95/p99 rerun
+latency overall and per step, reruns per second across all sessions, and
+the resident memory each session added.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Importing run also puts the repository on sys.path
+from run import FIXTURE, ROOT, git_commit
+
+from shipquote import DEMO_LOTS, engine
+from shipquote.replay import ReplayGeocoder
+
+APP = os.path.join(ROOT, "shipping-calculator.py")
+SESSION_COUNTS = [1, 2, 4, 8, 16]
+STEPS = ("load", "select_lots", "type_address", "switch_currency", "generate_pdf")
+PERCENTILES = (50, 95, 99)
+
+
+def _share_app_test_globals():
+    """Let ``AppTest`` sessions run on several threads at once.
+
+    Every ``AppTest.run`` installs a mock ``Runtime`` and a patched
+    ``config.get_option`` globally and removes them when it returns, which
+    would pull them from under a session still running on another thread.
+    Instead, every session uses the first run's runtime (and so one set of
+    caches, like one server) and ``global.appTest`` is patched once.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    shared = []
+
+    def instance(cls):
+        if not shared:
+            if cls._instance is None:
+                raise RuntimeError("Runtime hasn't been created!")
+            shared.append(cls._instance)
+        return shared[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: bool(shared) or cls._instance is not None)
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Peak rather than current outside Linux; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Session:
+    """One simulated user; ``timings`` collects ``(step, seconds)`` per rerun."""
+
+    def __init__(self, seed, addresses, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.random = random.Random(seed)
+        self.addresses = addresses
+        self.app = AppTest.from_file(APP, default_timeout=timeout)
+        self.timings = []
+        self.errors = []
+
+    def _run(self, step, widget=None):
+        start = time.perf_counter()
+        (widget or self.app).run()
+        self.timings.append((step, time.perf_counter() - start))
+        self.errors.extend(f"{step}: {e.value}" for e in self.app.exception)
+
+    def _widget(self, kind, label_prefix):
+        return next(w for w in getattr(self.app, kind) if w.label.startswith(label_prefix))
+
+    def scenario(self, think=0.0):
+        if not self.timings:
+            self._run("load")
+        lots = self.random.sample(list(DEMO_LOTS), self.random.randint(1, 5))
+        self._run("select_lots", self.app.multiselect(key="lot_multiselect").set_value(lots))
+        time.sleep(think)
+        address = self.random.choice(self.addresses)
+        self._run("type_address", self.app.text_input(key="address_text_input").set_value(address))
+        time.sleep(think)
+        currency = self._widget("selectbox", "💰")
+        choices = [c for c in currency.options if c != currency.value]
+        self._run("switch_currency", currency.set_value(self.random.choice(choices)))
+        time.sleep(think)
+        self._run("generate_pdf", self._widget("button", "📥").click())
+        if not self.app.get("download_button"):
+            self.errors.append("generate_pdf: no PDF was offered")
+        time.sleep(think)
+
+
+def _summary(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        "reruns": len(ms),
+        **{f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in PERCENTILES},
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def run_level(sessions, rounds, think, geocode_latency, timeout):
+    """Drive ``sessions`` concurrent sessions in this process and summarize them."""
+    _share_app_test_globals()
+    geocoder = ReplayGeocoder.load(FIXTURE, latency=geocode_latency, strict=False)
+    engine.geocoder_from_env = lambda: geocoder
+    addresses = geocoder.queries()
+
+    # One untimed session warms imports and process-wide caches first
+    Session(-1, addresses, timeout).scenario()
+    gc.collect()
+    baseline = _rss_bytes()
+
+    users = [Session(seed, addresses, timeout) for seed in range(sessions)]
+    barrier = threading.Barrier(sessions)
+
+    def drive(user):
+        barrier.wait()
+        for _ in range(rounds):
+            user.scenario(think)
+
+    threads = [threading.Thread(target=drive, args=(user,)) for user in users]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    # The sessions are still referenced, so their state counts
+    per_session = (_rss_bytes() - baseline) / sessions
+
+    timings = [t for user in users for t in user.timings]
+    errors = [e for user in users for e in user.errors]
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        **_summary([s for _, s in timings]),
+        "reruns_per_s": round(len(timings) / elapsed, 2),
+        "session_mb": round(per_session / 1e6, 2),
+        "steps": {step: _summary([s for name, s in timings if name == step]) for step in STEPS},
+        "errors": len(errors),
+        "first_errors": errors[:5],
+    }
+
+
+def run(levels, rounds, think, geocode_latency, timeout):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SHIPQUOTE_QUOTE_STORE=os.path.join(tmp, "quotes.sqlite3"))
+        for sessions in levels:
+            # Each level in a fresh process, so memory and caches start alike
+            worker = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", str(sessions), "--rounds", str(rounds),
+                 "--think", str(think), "--geocode-latency", str(geocode_latency), "--timeout", str(timeout)],
+                cwd=tmp, env=env, capture_output=True, text=True, check=True,
+            )
+            level = json.loads(worker.stdout.splitlines()[-1])
+            results.append(level)
+            print(f"{sessions:4} sessions  p50 {level['p50_ms']:8.1f}  p95 {level['p95_ms']:8.1f}  "
+                  f"p99 {level['p99_ms']:8.1f} ms  {level['reruns_per_s']:7.1f} reruns/s  "
+                  f"{level['session_mb']:6.2f} MB/session  {level['errors']} errors", file=sys.stderr)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "rounds": rounds,
+            "think_s": think,
+            "geocode_latency_s": geocode_latency,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ShipQuote Pro Streamlit load test")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--sessions", type=int, nargs="+", default=SESSION_COUNTS,
+                        help="concurrency levels to run")
+    parser.add_argument("--rounds", type=int, default=3, help="scenarios per session")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds a user pauses between steps")
+    parser.add_argument("--geocode-latency", type=float, default=0.05, help="seconds per stubbed geocode")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a rerun counts as hung")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        level = run_level(args.worker, args.rounds, args.think, args.geocode_latency, args.timeout)
+        print(json.dumps(level))
+        return 0
+    results = run(args.sessions, args.rounds, args.think, args.geocode_latency, args.timeout)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if any(level["errors"] for level in results["results"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
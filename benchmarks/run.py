@@ -0,0 +1,217 @@
+"""Offline benchmark suite for the quote engine.
+
+    python benchmarks/run.py --record                 # once, against the live geocoder
+    python benchmarks/run.py -o results.json          # replayed from benchmarks/geocodes.json
+    python benchmarks/run.py --compare base.json results.json
+
+Pricing, packing suggestions, crate consolidation, geocoding, depot matching, PDF rendering and batch quoting are
+timed at increasing lot counts and batch sizes.  Geocoding is served by a
+``ReplayGeocoder`` so runs are deterministic and need no network.  Results
+are JSON keyed by benchmark name and parameters; ``--compare`` flags every
+benchmark whose best time regressed by more than ``--threshold``.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from shipquote import DEMO_LOTS, LotCatalog  # noqa: E402
+from shipquote.batch import calculate_shipping_batch  # noqa: E402
+from shipquote.depots import DepotIndex  # noqa: E402
+from shipquote.engine import (  # noqa: E402
+    calculate_shipping, geocoder_from_env, get_address_suggestions,
+    get_distance_and_multiplier, price_quote, suggest_packing_for_lots,
+)
+from shipquote.packing import plan_packing  # noqa: E402
+from shipquote.pdf import generate_branded_pdf  # noqa: E402
+from shipquote.replay import RecordingGeocoder, ReplayGeocoder  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocodes.json")
+DEPOTS = os.path.join(ROOT, "data", "depots-sample.csv")
+
+BENCH_ADDRESSES = [
+    "Paris", "Versailles", "Rouen", "Lille", "Lyon, France", "Marseille", "Bordeaux",
+    "London", "10 Downing Street, London", "Brussels", "Amsterdam", "Geneva", "Berlin",
+    "Milan", "Rome", "Madrid", "Vienna", "New York", "Hong Kong",
+]
+BENCH_PREFIXES = ["Par", "Lon", "Lyo", "Mar", "Ber", "Rom"]
+
+LOT_COUNTS = [1, 5, 50, 500]
+PDF_LOT_COUNTS = [1, 5, 50, 500]
+PACKING_LOT_COUNTS = [5, 10, 50, 200, 500]
+BATCH_SIZES = [1_000, 10_000, 100_000]
+
+
+def measure(fn, min_time=0.05, repeat=5):
+    """Best/median/mean seconds per call over ``repeat`` timed loops."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    per_call = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    return {
+        "calls": number * repeat,
+        "best_ms": min(per_call) * 1000,
+        "median_ms": statistics.median(per_call) * 1000,
+        "mean_ms": statistics.fmean(per_call) * 1000,
+    }
+
+
+def synthetic_catalog(size):
+    """``size`` lots cycling through the demo lots' attributes."""
+    infos = list(DEMO_LOTS.values())
+    lots = {100_000 + i: infos[i % len(infos)] for i in range(size)}
+    return LotCatalog.from_mapping(lots)
+
+
+def benchmarks(geocoder, catalog, quick=False):
+    lot_numbers = list(catalog)
+    addresses = itertools.cycle(BENCH_ADDRESSES)
+    lot_counts = LOT_COUNTS[:3] if quick else LOT_COUNTS
+    batch_sizes = BATCH_SIZES[:2] if quick else BATCH_SIZES
+
+    for n in lot_counts:
+        lots = lot_numbers[:n]
+        yield "price_quote", {"lots": n}, lambda: price_quote(
+            lots, "Wood crate", "Front delivery", 344, 1.5, catalog=catalog)
+        yield "suggest_packing_for_lots", {"lots": n}, lambda: suggest_packing_for_lots(lots, catalog)
+        yield "calculate_shipping", {"lots": n}, lambda: calculate_shipping(
+            lots, "Wood crate", "Front delivery", next(addresses), geocoder=geocoder, catalog=catalog)
+
+    for n in PACKING_LOT_COUNTS[:3] if quick else PACKING_LOT_COUNTS:
+        lots = lot_numbers[:n]
+        yield "plan_packing", {"lots": n}, lambda: plan_packing(lots, catalog=catalog)
+
+    yield "get_distance_and_multiplier", {"addresses": len(BENCH_ADDRESSES)}, lambda: [
+        get_distance_and_multiplier(a, geocoder=geocoder) for a in BENCH_ADDRESSES]
+    yield "get_address_suggestions", {"queries": len(BENCH_PREFIXES)}, lambda: [
+        get_address_suggestions(q, geocoder=geocoder) for q in BENCH_PREFIXES]
+
+    for n in PDF_LOT_COUNTS:
+        result = price_quote(lot_numbers[:n], "Wood crate", "Front delivery", 344, 1.5, catalog=catalog)
+        yield "generate_branded_pdf", {"lots": n}, lambda: generate_branded_pdf(
+            "SQ-BENCH01", "Client", "London", "Wood crate", "Front delivery",
+            result["breakdown"], result, "EUR")
+
+    rng = np.random.default_rng(0)
+    for size in batch_sizes:
+        df = pd.DataFrame({
+            "quote_id": np.arange(size) // 5,
+            "lot": rng.choice(lot_numbers, size),
+            "packing": "Wood crate",
+            "delivery": "Front delivery",
+            "km": rng.uniform(0, 3000, size),
+        })
+        yield "calculate_shipping_batch", {"line_items": size}, lambda: calculate_shipping_batch(df, catalog)
+
+    depots = DepotIndex.load(DEPOTS)
+    for size in batch_sizes:
+        lat, lon = rng.uniform(-60, 70, size), rng.uniform(-180, 180, size)
+        yield "nearest_depot", {"destinations": size, "depots": len(depots)}, lambda: depots.nearest(lat, lon)
+
+
+def record(path):
+    recorder = RecordingGeocoder(geocoder_from_env(), path)
+    for address in BENCH_ADDRESSES:
+        get_distance_and_multiplier(address, geocoder=recorder)
+    for prefix in BENCH_PREFIXES:
+        get_address_suggestions(prefix, geocoder=recorder)
+    recorder.save()
+    print(f"recorded {len(recorder.answers)} answers to {path}", file=sys.stderr)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(fixture, quick=False, only=None):
+    geocoder = ReplayGeocoder.load(fixture)
+    catalog = synthetic_catalog(max(LOT_COUNTS))
+    results = []
+    for name, params, fn in benchmarks(geocoder, catalog, quick):
+        if only and name not in only:
+            continue
+        stats = measure(fn)
+        results.append({"name": name, "params": params, **{k: round(v, 4) for k, v in stats.items()}})
+        print(f"{name:30} {json.dumps(params):24} {stats['best_ms']:10.3f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(base_path, new_path, threshold):
+    """Print best-time ratios; returns the number of regressions."""
+    def index(path):
+        with open(path, encoding="utf-8") as f:
+            return {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+
+    base, new = index(base_path), index(new_path)
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        ratio = new[key]["best_ms"] / base[key]["best_ms"] if base[key]["best_ms"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"{key[0]:30} {key[1]:24} {base[key]['best_ms']:10.3f} -> {new[key]['best_ms']:10.3f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ShipQuote Pro benchmarks")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--fixture", default=FIXTURE, help="recorded geocoder answers")
+    parser.add_argument("--record", action="store_true", help="record the fixture from the live geocoder")
+    parser.add_argument("--quick", action="store_true", help="skip the largest sizes")
+    parser.add_argument("--only", nargs="+", help="benchmark names to run")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown for --compare")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.fixture)
+        return 0
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+    results = run(args.fixture, args.quick, args.only)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
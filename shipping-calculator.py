@@ -1,19 +1,29 @@
+import hashlib
+import os
+import threading
+import time
+
 import streamlit as st
-from datetime import datetime, timedelta
 from uuid import uuid4
-from io import BytesIO
-import pandas as pd
-
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-)
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import cm
+from shipquote import metrics
+from shipquote.autocomplete import AddressAutocompleter
+from shipquote.bulkquote import quote_file
+from shipquote.catalog import catalog_from_env
+from shipquote.config import DAYS_LEFT
+from shipquote.depots import get_default_depots
+from shipquote.engine import AddressNotFound, convert_result, geocoder_from_env, suggest_packing_for_lots
+from shipquote.fx import fx_rates_from_env, snapshot_from_env
+from shipquote.gazetteer import FallbackGeocoder
+from shipquote.geocoding import Place
+from shipquote.incremental import IncrementalQuote
+from shipquote.lotsearch import LotIndex
+from shipquote.packing import describe_plan
+from shipquote.ratecard import rates_from_env
+from shipquote.pdf import cached_branded_pdf
+from shipquote.store import DEFAULT_QUOTE_STORE, QuoteStore, render_stored_pdf
+
+rerun_started = time.perf_counter()
 
 # ================= CONFIG =================
 st.set_page_config(page_title="ShipQuote Pro", page_icon="📦", layout="wide")
@@ -224,257 +234,69 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-PARIS_COORD = (48.8566, 2.3522)
-DAYS_LEFT = 7
-
-geolocator = Nominatim(user_agent="shipquote_pro")
-
-# ================= DEMO LOT DATA =================
-DEMO_LOTS = {
-    86: {"weight": "Heavy", "weight_kg": 45, "material": "Canvas", "title": "Abstract Expressionism #3", "artist": "J. Basquiat"},
-    87: {"weight": "Medium", "weight_kg": 25, "material": "Canvas", "title": "Landscape Vista", "artist": "M. Rousseau"},
-    88: {"weight": "Medium", "weight_kg": 30, "material": "Canvas", "title": "Urban Nocturne", "artist": "K. Tanaka"},
-    89: {"weight": "Heavy", "weight_kg": 85, "material": "Glass/Steel", "title": "Reflections III", "artist": "L. Fontana"},
-    90: {"weight": "Heavy", "weight_kg": 120, "material": "Metal", "title": "Kinetic Sculpture", "artist": "A. Calder"},
-    91: {"weight": "Medium", "weight_kg": 22, "material": "Canvas", "title": "Still Life with Fruit", "artist": "P. Cezanne"},
-    92: {"weight": "Heavy", "weight_kg": 55, "material": "Canvas", "title": "The Great Wave", "artist": "K. Hokusai"},
-    93: {"weight": "Light", "weight_kg": 8, "material": "Photograph", "title": "Portrait Series #7", "artist": "A. Adams"},
-    94: {"weight": "Light", "weight_kg": 5, "material": "Photograph", "title": "Cityscape 2024", "artist": "D. LaChapelle"},
-    95: {"weight": "Medium", "weight_kg": 18, "material": "Photograph", "title": "Nature's Symmetry", "artist": "A. Gursky"},
-}
-
-WEIGHT_MULT = {"Light": 1, "Medium": 1.5, "Heavy": 2}
-MATERIAL_MULT = {
-    "Canvas": 1,
-    "Photograph": 1,
-    "Metal": 1.5,
-    "Glass/Steel": 1.6,
-}
-
-DELIVERY_COST = {
-    "Front delivery": 0,
-    "White Glove (ground)": 100,
-    "White Glove (elevator)": 150,
-    "Curbside": -30,
-}
-
-PACKING_COST = {
-    "Automatic (AI)": 0,
-    "Wood crate": 80,
-    "Cardboard box": 20,
-    "Bubble wrap": 40,
-    "Custom": 100,
-}
-
-PACKING_TYPES = list(PACKING_COST.keys())
-DELIVERY_TYPES = list(DELIVERY_COST.keys())
-
-CURRENCY_RATE = {"EUR": 1, "USD": 1.1, "GBP": 0.85}
-CURRENCY_SYMBOL = {"EUR": "€", "USD": "$", "GBP": "£"}
-
-VAT_RATE = 0.20  # 20% VAT
-INSURANCE_RATE = 0.02  # 2% of shipping cost for insurance
-
-# ================= HELPER FUNCTIONS =================
-def get_address_suggestions(query):
-    if not query or len(query) < 3:
-        return []
-    try:
-        results = geolocator.geocode(query, exactly_one=False, limit=5, timeout=3, addressdetails=True)
-        return [r.address for r in results] if results else []
-    except:
-        return []
-
-def suggest_packing_for_lots(selected_lots):
-    if not selected_lots:
-        return "Automatic (AI)", "ℹ️ Select lots for packing suggestions"
-
-    suggestions = []
-    votes = {}
-
-    for lot in selected_lots:
-        info = DEMO_LOTS.get(lot)
-        if not info:
-            continue
-
-        material = info["material"].lower()
-
-        if any(k in material for k in ["glass", "metal", "steel"]):
-            pack = "Wood crate"
-        elif "photo" in material:
-            pack = "Cardboard box"
-        else:
-            pack = "Automatic (AI)"
-
-        votes[pack] = votes.get(pack, 0) + 1
-
-    overall = max(votes, key=votes.get) if votes else "Automatic (AI)"
-    return overall, f"💡 Recommended: {overall}"
-    if not selected_lots:
-        return "Automatic (AI)", "ℹ️ Select lots for packing suggestions"
-
-    suggestions = []
-    votes = {}
-
-    for lot in selected_lots:
-        info = DEMO_LOTS.get(lot)
-        if not info:
-            continue
-
-        material = info["material"].lower()
-
-        if any(k in material for k in ["glass", "metal", "steel"]):
-            pack = "Wood crate"
-        elif "photo" in material:
-            pack = "Cardboard box"
-        else:
-            pack = "Automatic (AI)"
-
-        votes[pack] = votes.get(pack, 0) + 1
-
-    overall = max(votes, key=votes.get) if votes else "Automatic (AI)"
-    return overall, f"💡 Recommended: {overall}"
-
-def get_distance_and_multiplier(address):
-    try:
-        loc = geolocator.geocode(address, timeout=4)
-        if not loc:
-            return 0, 1
-        km = geodesic(PARIS_COORD, (loc.latitude, loc.longitude)).km
-        if km < 50:
-            m = 1
-        elif km < 300:
-            m = 1.2
-        elif km < 1000:
-            m = 1.5
-        else:
-            m = 2
-        return round(km), m
-    except:
-        return 0, 1
-
-def calculate_shipping(lots, packing, delivery, address, include_insurance=True):
-    km, dist_mult = get_distance_and_multiplier(address)
-    base = 220
-    subtotal = 0
-    breakdown = []
-    total_weight = 0
-
-    for lot in lots:
-        info = DEMO_LOTS[lot]
-        
-        # Weight-based pricing component (€2 per kg)
-        weight_cost = info["weight_kg"] * 2
-        
-        # Calculate price with all factors
-        price = (
-            base
-            * WEIGHT_MULT[info["weight"]]
-            * MATERIAL_MULT[info["material"]]
-            * dist_mult
-        )
-        price += weight_cost + DELIVERY_COST[delivery] + PACKING_COST[packing]
-        
-        subtotal += price
-        total_weight += info["weight_kg"]
-        breakdown.append([f"Lot {lot}", info["weight"], info["material"], f"{info['weight_kg']} kg", f"{price:,.2f}"])
-
-    # Calculate insurance and VAT
-    insurance = subtotal * INSURANCE_RATE if include_insurance else 0
-    subtotal_with_insurance = subtotal + insurance
-    vat = subtotal_with_insurance * VAT_RATE
-    total = subtotal_with_insurance + vat
-
-    return {
-        "subtotal": subtotal,
-        "insurance": insurance,
-        "vat": vat,
-        "total": total,
-        "breakdown": breakdown,
-        "km": km,
-        "total_weight": total_weight
-    }
+@st.cache_resource
+def start_metrics_server():
+    # Timings are recorded with SHIPQUOTE_METRICS=1 and scraped from this port
+    port = os.environ.get("SHIPQUOTE_METRICS_PORT")
+    return metrics.serve(int(port)) if port else None
+
+start_metrics_server()
+
+@st.cache_resource
+def get_geolocator():
+    # One geocoder stack per process (configured by SHIPQUOTE_* env vars);
+    # its SQLite cache is shared between processes
+    return geocoder_from_env()
+
+geolocator = get_geolocator()
+
+@st.cache_resource
+def get_autocompleter():
+    local = geolocator.primary if isinstance(geolocator, FallbackGeocoder) else None
+    return AddressAutocompleter(geolocator, limit=5, timeout=3, local=local)
+
+autocompleter = get_autocompleter()
+
+@st.cache_resource
+def get_catalog():
+    # Lots of the sale named by SHIPQUOTE_SALE, loaded once per process
+    return catalog_from_env()
+
+catalog = get_catalog()
 
-def generate_branded_pdf(quote_id, client, address, packing, delivery, breakdown, result, currency):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=2*cm, rightMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    # Header
-    elements.append(Paragraph("<font size=22><b>ShipQuote Pro</b></font><br/><font size=10 color='grey'>Fine Art & High-Value Logistics</font>", styles["Normal"]))
-    elements.append(Spacer(1, 16))
-
-    # Quote metadata table
-    meta = Table([
-        ["Quote ID", quote_id],
-        ["Client", client or "—"],
-        ["Issued", datetime.now().strftime("%d %b %Y")],
-        ["Valid Until", (datetime.now() + timedelta(days=7)).strftime("%d %b %Y")],
-    ], colWidths=[4*cm, 10*cm])
-    meta.setStyle(TableStyle([
-        ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
-        ("FONT", (0,0), (0,-1), "Helvetica-Bold"),
-        ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 8),
-        ("TOPPADDING", (0,0), (-1,-1), 8),
-    ]))
-    elements.append(meta)
-    elements.append(Spacer(1, 20))
-
-    # Shipment details
-    elements.append(Paragraph("<b>Shipment Details</b>", styles["Heading2"]))
-    elements.append(Paragraph(f"<b>Delivery:</b><br/>{address}", styles["Normal"]))
-    elements.append(Spacer(1, 8))
-    elements.append(Paragraph(f"<b>Packing:</b> {packing}", styles["Normal"]))
-    elements.append(Spacer(1, 8))
-    elements.append(Paragraph(f"<b>Delivery Type:</b> {delivery}", styles["Normal"]))
-    elements.append(Spacer(1, 16))
-
-    # Breakdown table
-    table = Table([["Lot", "Weight", "Material", "Weight (kg)", "Price (€)"]] + breakdown, 
-                  colWidths=[2.5*cm, 2.5*cm, 3.5*cm, 2.5*cm, 2.5*cm])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.black),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
-        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, None]),
-        ("ALIGN", (3,1), (-1,-1), "RIGHT"),
-        ("FONT", (0,0), (-1,0), "Helvetica-Bold"),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 8),
-        ("TOPPADDING", (0,0), (-1,-1), 8),
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 18))
-
-    # Cost summary
-    subtotal_converted = result["subtotal"] * CURRENCY_RATE[currency]
-    insurance_converted = result["insurance"] * CURRENCY_RATE[currency]
-    vat_converted = result["vat"] * CURRENCY_RATE[currency]
-    total_converted = result["total"] * CURRENCY_RATE[currency]
-    
-    summary = Table([
-        ["Subtotal", f"{CURRENCY_SYMBOL[currency]}{subtotal_converted:,.2f}"],
-        ["Insurance (2%)", f"{CURRENCY_SYMBOL[currency]}{insurance_converted:,.2f}"],
-        ["VAT (20%)", f"{CURRENCY_SYMBOL[currency]}{vat_converted:,.2f}"],
-        ["<b>Total Quote</b>", f"<b>{CURRENCY_SYMBOL[currency]}{total_converted:,.2f}</b>"],
-    ], colWidths=[10*cm, 4*cm])
-    summary.setStyle(TableStyle([
-        ("ALIGN", (1,0), (1,-1), "RIGHT"),
-        ("FONT", (0,-1), (-1,-1), "Helvetica-Bold"),
-        ("FONTSIZE", (0,-1), (-1,-1), 14),
-        ("TOPPADDING", (0,-1), (-1,-1), 12),
-        ("LINEABOVE", (0,-1), (-1,-1), 2, colors.black),
-    ]))
-    elements.append(summary)
-    elements.append(Spacer(1, 12))
-
-    # Footer
-    elements.append(Paragraph("<font size=8 color='grey'>Demo quote generated by ShipQuote Pro. Non-binding and indicative.</font>", styles["Normal"]))
-
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+LOT_SEARCH_LIMIT = 50
+
+@st.cache_resource
+def get_lot_index():
+    return LotIndex(catalog)
+
+lot_index = get_lot_index()
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def packing_suggestion(lots, rates):
+    # Derived from the cheapest shared packing plan for the lots
+    return suggest_packing_for_lots(list(lots), catalog, rates)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def geocode_place(address):
+    # Geocoder errors propagate out of here, so only real answers are cached
+    place = geolocator.geocode(address, timeout=4)
+    return Place(place.address, place.latitude, place.longitude) if place else None
+
+def place_for(address):
+    # Unknown addresses and geocoder errors reach the quote engine, which
+    # reports them instead of pricing the quote
+    place = geocode_place(address)
+    if place is None:
+        raise AddressNotFound(f"address not found: {address}")
+    return place
+
+@st.cache_resource
+def get_quote_store():
+    # Issued quotes, shared by all sessions so any of them can be re-issued
+    return QuoteStore(os.environ.get("SHIPQUOTE_QUOTE_STORE", DEFAULT_QUOTE_STORE))
+
+quote_store = get_quote_store()
 
 # ================= UI =================
 if "quote_id" not in st.session_state:
@@ -488,8 +310,18 @@ if "address_suggestions" not in st.session_state:
 if "show_suggestions" not in st.session_state:
     st.session_state.show_suggestions = True
 
+if "quote_engine" not in st.session_state:
+    # Per-session pricing state; an edit only recomputes the stages it affects
+    st.session_state.quote_engine = IncrementalQuote(catalog=catalog, locate=place_for)
+
 QUOTE_ID = st.session_state.quote_id
 
+@st.fragment(run_every=0.25)
+def refresh_when_suggestions_ready(query):
+    # Polls the background lookup and reruns the app once it has finished
+    if not autocompleter.pending(query, channel=QUOTE_ID):
+        st.rerun()
+
 # Demo banner
 st.markdown("""
 <div class="demo-banner">
@@ -516,142 +348,202 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-left, right = st.columns([1.5, 1])
+def mark_inputs_changed():
+    st.session_state.inputs_changed = True
 
-with left:
-    # Multi-select dropdown for lots
+def rerun_if_inputs_changed():
+    # A widget inside a fragment only reruns that fragment; rerun the app so
+    # the other fragments and the summary see the new quote inputs
+    if st.session_state.pop("inputs_changed", False):
+        st.rerun()
+
+@st.fragment
+def lot_picker():
+    # Search-as-you-type lot picker; only the top matches are sent to the browser
     st.markdown("### 🎨 Select Artwork Lots (Max 5)")
-    
-    lot_options = [f"Lot {num} - {info['title']} ({info['artist']})" 
-                   for num, info in DEMO_LOTS.items()]
-    
-    # Convert stored lot numbers to display strings for default
-    default_displays = []
-    if st.session_state.selected_lots:
-        for lot_num in st.session_state.selected_lots:
-            if lot_num in DEMO_LOTS:
-                info = DEMO_LOTS[lot_num]
-                default_displays.append(f"Lot {lot_num} - {info['title']} ({info['artist']})")
-    
-    selected_displays = st.multiselect(
+
+    lot_query = st.text_input(
+        "🔎 Search lots",
+        placeholder="Lot number, title, artist or material...",
+        key="lot_search"
+    )
+
+    # Keep current selections available as options so they survive a new search
+    current_lots = [lot for lot in st.session_state.selected_lots if lot in catalog]
+    lot_options = list(dict.fromkeys(current_lots + lot_index.search(lot_query, limit=LOT_SEARCH_LIMIT)))
+
+    selected_lots = st.multiselect(
         "Choose up to 5 lots:",
         lot_options,
-        default=default_displays,
+        default=current_lots,
+        format_func=lot_index.label,
         max_selections=5,
-        key="lot_multiselect"
+        key="lot_multiselect",
+        on_change=mark_inputs_changed
     )
-    
-    # Extract lot numbers from selections
-    selected_lots = []
-    for display in selected_displays:
-        lot_num = int(display.split(" - ")[0].replace("Lot ", ""))
-        selected_lots.append(lot_num)
-    
+
     st.session_state.selected_lots = selected_lots
-    
+
     # Display selected lots compactly
     if selected_lots:
         st.markdown("#### 📋 Selected Lots")
         for lot in selected_lots:
-            lot_info = DEMO_LOTS[lot]
+            lot_info = catalog[lot]
             weight_badge = f"badge-{lot_info['weight'].lower()}"
-            
+
             st.markdown(f"""
             <div class="lot-compact-card">
                 <h4>Lot #{lot}: {lot_info['title']}</h4>
                 <p><b>Artist:</b> {lot_info['artist']} • <b>Material:</b> {lot_info['material']} • <b>Weight:</b> {lot_info['weight_kg']} kg • <span class="{weight_badge}">{lot_info['weight']}</span></p>
             </div>
             """, unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
+
+    rerun_if_inputs_changed()
+
+@st.fragment
+def shipping_options():
     # Shipping options (always visible)
     st.markdown("### ⚙️ Shipping Options")
-    
+
+    selected_lots = st.session_state.selected_lots
+    # Packing and delivery options come from the rate card (SHIPQUOTE_RATE_CARD)
+    rates = rates_from_env(catalog=catalog)
+    packing_types = list(rates.packing_cost)
+    delivery_types = list(rates.delivery_cost)
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        suggested_pack, pack_note = suggest_packing_for_lots(selected_lots)
-        packing = st.selectbox("📦 Packing Type", PACKING_TYPES, 
-                              index=PACKING_TYPES.index(suggested_pack))
-    
+        suggested_pack, pack_note = packing_suggestion(tuple(selected_lots), rates)
+        st.session_state.packing = st.selectbox("📦 Packing Type", packing_types,
+                                                index=packing_types.index(suggested_pack)
+                                                if suggested_pack in packing_types else 0,
+                                                disabled=st.session_state.get("consolidate", False),
+                                                on_change=mark_inputs_changed)
+
     with col2:
-        delivery = st.selectbox("🚚 Delivery Type", DELIVERY_TYPES)
-    
+        st.session_state.delivery = st.selectbox("🚚 Delivery Type", delivery_types,
+                                                 on_change=mark_inputs_changed)
+
     if selected_lots:
         with st.expander("💡 AI Packing Recommendation"):
             st.markdown(pack_note)
-    
-    st.markdown("---")
-    
+
+    st.session_state.include_insurance = st.checkbox(
+        f"🛡️ Include Insurance ({rates.insurance_rate * 100:g}% of shipping cost)", value=True,
+        on_change=mark_inputs_changed
+    )
+    st.session_state.consolidate = st.checkbox(
+        "🗃️ Consolidate lots into shared crates", value=False, on_change=mark_inputs_changed,
+        help="Pack compatible lots together and charge packing per container instead of per lot"
+    )
+
+    rerun_if_inputs_changed()
+
+@st.fragment
+def delivery_details():
     # Delivery details (always visible)
     st.markdown("### 📍 Delivery Details")
-    
+
     address_input = st.text_input(
         "Delivery Address",
         value=st.session_state.address_input,
         placeholder="Start typing (e.g., 'Paris', '10 Downing Street')...",
         help="Enter full address for accurate quote",
-        key="address_text_input"
+        key="address_text_input",
+        on_change=mark_inputs_changed
     )
-    
+
     # Update suggestions when input changes
     if address_input != st.session_state.address_input:
         st.session_state.address_input = address_input
         st.session_state.show_suggestions = True
-        
-        if len(address_input) >= 3:
-            with st.spinner("🔍 Searching addresses..."):
-                st.session_state.address_suggestions = get_address_suggestions(address_input)
-    
+    st.session_state.final_address = address_input or st.session_state.address_input
+
+    # Suggestions come from a background lookup so typing never blocks the rerun
+    if st.session_state.show_suggestions and len(address_input) >= 3:
+        st.session_state.address_suggestions, suggestions_pending = autocompleter.suggest(
+            address_input, channel=QUOTE_ID, wait=0.05
+        )
+        if suggestions_pending:
+            st.caption("🔍 Searching addresses...")
+            refresh_when_suggestions_ready(address_input)
+
     # Show address suggestions
-    if (st.session_state.show_suggestions and 
-        st.session_state.address_suggestions and 
+    if (st.session_state.show_suggestions and
+        st.session_state.address_suggestions and
         len(address_input) >= 3):
-        
+
         st.markdown("**📍 Suggestions:**")
-        
+
         for idx, addr in enumerate(st.session_state.address_suggestions):
             col1, col2 = st.columns([5, 1])
-            
+
             with col1:
                 st.markdown(f"""
-                <div style="background: white; border: 1px solid #e0e0e0; border-radius: 6px; 
+                <div style="background: white; border: 1px solid #e0e0e0; border-radius: 6px;
                      padding: 0.6rem; margin: 0.3rem 0; cursor: pointer;">
                     📍 {addr}
                 </div>
                 """, unsafe_allow_html=True)
-            
+
             with col2:
                 if st.button("✓", key=f"select_addr_{idx}"):
                     st.session_state.address_input = addr
                     st.session_state.show_suggestions = False
                     st.rerun()
-    
+
+    rerun_if_inputs_changed()
+
+@st.fragment
+def quote_summary():
+    # Currency and client name only affect this panel, so changing them
+    # reruns just this fragment against the cached distance
+    st.markdown("### 📊 Quote Summary")
+
     col1, col2 = st.columns(2)
     with col1:
         client_name = st.text_input("👤 Client Name", placeholder="e.g., Henrietta Atsenokhai")
     with col2:
-        currency = st.selectbox("💰 Currency", ["EUR", "USD", "GBP"])
-    
-    include_insurance = st.checkbox("🛡️ Include Insurance (2% of shipping cost)", value=True)
+        # Prices come from SHIPQUOTE_RATE_CARD and exchange rates from
+        # SHIPQUOTE_FX_RATES when set; both are reloaded when their file changes
+        rates = rates_from_env(catalog=catalog)
+        fx = snapshot_from_env(rates)
+        fx_rates = fx.as_rates(rates)
+        currency = st.selectbox("💰 Currency", fx.currencies,
+                                index=fx.currencies.index("EUR") if "EUR" in fx.currencies else 0)
+    symbol = fx_rates.currency_symbol[currency]
+
+    selected_lots = st.session_state.selected_lots
+    final_address = st.session_state.final_address
+    packing = st.session_state.packing
+    delivery = st.session_state.delivery
 
-with right:
-    st.markdown("### 📊 Quote Summary")
-    
-    final_address = address_input or st.session_state.address_input
-    
     if selected_lots and final_address:
-        result = calculate_shipping(selected_lots, packing, delivery, final_address, include_insurance)
-        
+        quote_engine = st.session_state.quote_engine
+        if quote_engine.rates is not rates:
+            quote_engine.rates = rates
+            quote_engine.invalidate()
+        result = quote_engine.update(selected_lots, packing, delivery, final_address,
+                                     st.session_state.include_insurance, st.session_state.consolidate)
+        if "error" in result:
+            # No price rather than a wrong one; nothing is shown, saved or issued
+            st.warning(f"⚠️ This address could not be priced right now ({result['error']}). "
+                       "Check the address or retry in a moment.")
+            if st.button("🔄 Retry", key="retry_quote"):
+                st.rerun()
+            return
+        place = quote_engine.place
+        packing_label = describe_plan(result["containers"]) if "containers" in result else packing
+
         # Convert to selected currency
-        subtotal = result["subtotal"] * CURRENCY_RATE[currency]
-        insurance = result["insurance"] * CURRENCY_RATE[currency]
-        vat = result["vat"] * CURRENCY_RATE[currency]
-        total = result["total"] * CURRENCY_RATE[currency]
-        
+        converted = convert_result(result, currency, fx_rates)
+        subtotal = converted["subtotal"]
+        insurance = converted["insurance"]
+        vat = converted["vat"]
+        total = converted["total"]
+
         col1, col2 = st.columns(2)
-        
+
         with col1:
             st.markdown(f"""
             <div class="metric-card">
@@ -659,14 +551,17 @@ with right:
                 <h2>{result["km"]:,} km</h2>
             </div>
             """, unsafe_allow_html=True)
-            
+            depots = get_default_depots()
+            if place is not None and len(depots) > 1:
+                st.caption(f"🏭 Ships from {depots.measure(place)[0].name}")
+
             st.markdown(f"""
             <div class="metric-card">
                 <h4>📦 Lots</h4>
                 <h2>{len(selected_lots)}</h2>
             </div>
             """, unsafe_allow_html=True)
-        
+
         with col2:
             st.markdown(f"""
             <div class="metric-card">
@@ -674,58 +569,80 @@ with right:
                 <h2>{result["total_weight"]:.1f} kg</h2>
             </div>
             """, unsafe_allow_html=True)
-            
+
             st.markdown(f"""
             <div class="metric-card">
                 <h4>💵 Subtotal</h4>
-                <h2>{CURRENCY_SYMBOL[currency]}{subtotal:,.2f}</h2>
+                <h2>{symbol}{subtotal:,.2f}</h2>
             </div>
             """, unsafe_allow_html=True)
-        
+
         # Insurance and VAT
         st.markdown(f"""
         <div class="metric-card">
-            <h4>🛡️ Insurance (2%)</h4>
-            <h2>{CURRENCY_SYMBOL[currency]}{insurance:,.2f}</h2>
+            <h4>🛡️ Insurance ({rates.insurance_rate * 100:g}%)</h4>
+            <h2>{symbol}{insurance:,.2f}</h2>
         </div>
         """, unsafe_allow_html=True)
-        
+
         st.markdown(f"""
         <div class="metric-card">
-            <h4>📄 VAT (20%)</h4>
-            <h2>{CURRENCY_SYMBOL[currency]}{vat:,.2f}</h2>
+            <h4>📄 VAT ({rates.vat_rate * 100:g}%)</h4>
+            <h2>{symbol}{vat:,.2f}</h2>
         </div>
         """, unsafe_allow_html=True)
-        
+
         # Total - highlighted
         st.markdown(f"""
         <div class="metric-card metric-card-highlight">
             <h4>💰 TOTAL QUOTE</h4>
-            <h1>{CURRENCY_SYMBOL[currency]}{total:,.2f}</h1>
+            <h1>{symbol}{total:,.2f}</h1>
         </div>
         """, unsafe_allow_html=True)
-        
+
         # Cost breakdown
         with st.expander("📋 View Itemized Breakdown", expanded=False):
             for lot in selected_lots:
-                lot_info = DEMO_LOTS[lot]
+                lot_info = catalog[lot]
                 st.markdown(f"**Lot {lot}:** {lot_info['title']}")
                 st.caption(f"{lot_info['weight']} • {lot_info['material']} • {lot_info['weight_kg']} kg")
-            
+            for container in result.get("containers", []):
+                lots_in = ", ".join(str(lot) for lot in container["lots"])
+                st.markdown(f"**{container['packing']}:** lots {lots_in}")
+                st.caption(f"{container['weight_kg']} kg • {symbol}{container['cost'] * fx_rates.currency_rate[currency]:,.2f}")
+
             st.markdown("---")
             st.markdown(f"""
-            **Subtotal:** {CURRENCY_SYMBOL[currency]}{subtotal:,.2f}  
-            **Insurance (2%):** {CURRENCY_SYMBOL[currency]}{insurance:,.2f}  
-            **VAT (20%):** {CURRENCY_SYMBOL[currency]}{vat:,.2f}  
+            **Subtotal:** {symbol}{subtotal:,.2f}  
+            **Insurance ({rates.insurance_rate * 100:g}%):** {symbol}{insurance:,.2f}  
+            **VAT ({rates.vat_rate * 100:g}%):** {symbol}{vat:,.2f}  
             **Total Weight:** {result["total_weight"]:.1f} kg  
             **Distance:** {result["km"]} km
             """)
-        
+
+        with st.expander("🌍 Total in Other Currencies", expanded=False):
+            totals = fx.convert(result)
+            st.markdown("  \n".join(
+                f"**{code}:** {fx_rates.currency_symbol[code]}{amounts['total']:,.2f}"
+                for code, amounts in totals.items() if code != currency
+            ))
+
         st.markdown("---")
-        
+
         if st.button("📥 Generate PDF Quote", type="primary"):
-            pdf = generate_branded_pdf(QUOTE_ID, client_name, final_address, packing, 
-                                     delivery, result["breakdown"], result, currency)
+            # Issuing a quote saves it, so it can be re-issued without repricing;
+            # issuing it again unchanged keeps the revision (and date) already saved
+            consignment = {
+                "quote_id": QUOTE_ID, "client": client_name, "lots": selected_lots, "packing": packing,
+                "delivery": delivery, "address": final_address,
+                "include_insurance": st.session_state.include_insurance,
+                "consolidate": st.session_state.consolidate, "currency": currency,
+            }
+            issued = quote_store.save(consignment, result, place, rates=fx_rates, if_changed=True)
+            # Clicking again with the same inputs is served from the PDF cache
+            pdf = cached_branded_pdf(QUOTE_ID, client_name, final_address, packing_label,
+                                     delivery, result["breakdown"], result, currency,
+                                     rates=fx_rates, issued=issued.issued_at)
             st.download_button(
                 "⬇️ Download PDF Receipt",
                 pdf,
@@ -735,7 +652,7 @@ with right:
             )
     else:
         st.info("👈 **Select lots and enter details to generate quote**")
-        
+
         st.markdown("---")
         st.markdown("### 🚀 Quick Start")
         st.markdown("""
@@ -745,6 +662,127 @@ with right:
         4. **Generate** PDF receipt
         """)
 
+@st.fragment
+def reissue_quote():
+    with st.expander("🔁 Re-issue a saved quote"):
+        quote_id = st.text_input("Quote ID", placeholder="SQ-1234ABCD", key="reissue_quote_id").strip().upper()
+        if not quote_id:
+            return
+        saved = quote_store.get(quote_id)
+        if saved is None:
+            st.warning(f"No saved quote {quote_id}")
+            return
+        st.caption(f"{saved.client or '—'} • {saved.consignment['address']} • "
+                   f"issued {saved.issued_at:%d %b %Y}")
+        st.download_button(
+            "⬇️ Download PDF Receipt",
+            render_stored_pdf(saved),
+            file_name=f"ShipQuote_{saved.quote_id}.pdf",
+            mime="application/pdf",
+            key="reissue_download",
+            use_container_width=True
+        )
+
+BULK_DIR = os.environ.get("SHIPQUOTE_BULK_DIR", "bulk-quotes")
+
+@st.cache_resource
+def get_bulk_jobs():
+    # Bulk runs by output file, shared by all sessions so reruns and other
+    # tabs follow a running file instead of starting it again
+    return threading.Lock(), {}
+
+def start_bulk_job(source, output):
+    lock, jobs = get_bulk_jobs()
+    with lock:
+        job = jobs.get(output)
+        if job is not None and job["thread"].is_alive():
+            return job
+        job = {"rows": 0, "failed": 0, "error": None}
+
+        def report(rows, failed):
+            job.update(rows=rows, failed=failed)
+
+        def run():
+            # Priced like the CLI: rate card, then the day's exchange rates
+            try:
+                quote_file(source, output, geolocator, rates=fx_rates_from_env(rates_from_env(catalog=catalog)),
+                           catalog=catalog, on_progress=report)
+            except Exception as e:
+                job["error"] = f"{type(e).__name__}: {e}"
+
+        job["thread"] = threading.Thread(target=run, name=f"bulk-{os.path.basename(output)}", daemon=True)
+        jobs[output] = job
+        job["thread"].start()
+        return job
+
+@st.fragment(run_every=1)
+def bulk_progress(output):
+    # Polls a running bulk job and reruns the app once it has finished
+    job = get_bulk_jobs()[1][output]
+    st.caption(f"⏳ {job['rows']:,} rows priced, {job['failed']:,} failed...")
+    if not job["thread"].is_alive():
+        st.rerun()
+
+@st.fragment
+def bulk_quotes():
+    with st.expander("📂 Bulk Quotes"):
+        st.caption("A CSV or Parquet file of consignments: quote_id, lots, packing, delivery, address, currency")
+        upload = st.file_uploader("Consignments", type=["csv", "parquet"], key="bulk_upload")
+        if upload is None:
+            return
+        # Named by content, so pricing the same file again resumes an interrupted run
+        os.makedirs(BULK_DIR, exist_ok=True)
+        digest = hashlib.sha256()
+        for block in iter(lambda: upload.read(1 << 20), b""):
+            digest.update(block)
+        name = digest.hexdigest()[:16]
+        source = os.path.join(BULK_DIR, name + os.path.splitext(upload.name)[1].lower())
+        output = os.path.join(BULK_DIR, name + "-quotes.csv")
+        if not os.path.exists(source):
+            upload.seek(0)
+            with open(source + ".tmp", "wb") as f:
+                for block in iter(lambda: upload.read(1 << 20), b""):
+                    f.write(block)
+            os.replace(source + ".tmp", source)
+
+        # Pricing runs on a background thread; this fragment only shows its progress
+        job = get_bulk_jobs()[1].get(output)
+        done = os.path.exists(output) and not os.path.exists(output + ".checkpoint.json")
+        if not done and (job is None or not job["thread"].is_alive()):
+            if job is not None and job["error"]:
+                st.error(f"Pricing stopped: {job['error']}. Price the file again to resume.")
+            if not st.button("💰 Price File", key="bulk_price", use_container_width=True):
+                return
+            job = start_bulk_job(source, output)
+        if job is not None and job["thread"].is_alive():
+            bulk_progress(output)
+            return
+        if job is not None:
+            st.caption(f"{job['rows']:,} rows priced, {job['failed']:,} failed")
+        with open(output, "rb") as f:
+            st.download_button(
+                "⬇️ Download Priced Quotes",
+                f,
+                file_name=os.path.splitext(upload.name)[0] + "-quotes.csv",
+                mime="text/csv",
+                key="bulk_download",
+                use_container_width=True
+            )
+
+left, right = st.columns([1.5, 1])
+
+with left:
+    lot_picker()
+    st.markdown("---")
+    shipping_options()
+    st.markdown("---")
+    delivery_details()
+
+with right:
+    quote_summary()
+    reissue_quote()
+    bulk_quotes()
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -753,3 +791,5 @@ st.markdown("""
     Demo application for shipping quote calculations. Not for commercial use without permission.
 </div>
 """, unsafe_allow_html=True)
+
+metrics.observe("streamlit_rerun", time.perf_counter() - rerun_started)
@@ -0,0 +1,49 @@
+"""ShipQuote Pro quote engine, importable without Streamlit.
+
+Names are imported from their submodules on first access, so ``import
+shipquote`` stays cheap and pandas, reportlab and geopy only load for the
+features that need them.
+"""
+import importlib
+
+_EXPORTS = {
+    "calculate_shipping_batch": "batch",
+    "quote_file": "bulkquote",
+    "CatalogStore": "catalog", "DEMO_CATALOG": "catalog", "LotCatalog": "catalog",
+    "DEFAULT_RATES": "config", "DEMO_LOTS": "config", "Rates": "config",
+    "AddressNotFound": "engine", "calculate_shipping": "engine", "get_address_suggestions": "engine", "get_distance_and_multiplier": "engine",
+    "locate_address": "engine", "price_quote": "engine", "set_default_geocoder": "engine",
+    "suggest_packing_for_lots": "engine",
+    "FxSnapshot": "fx", "FxTable": "fx", "load_fx": "fx",
+    "CachingGeocoder": "geocoding", "GeocodeCache": "geocoding", "Place": "geocoding",
+    "normalize_address": "geocoding",
+    "IncrementalQuote": "incremental",
+    "LotIndex": "lotsearch",
+    "plan_packing": "packing",
+    "PdfCache": "pdfcache",
+    "generate_branded_pdf": "pdf",
+    "load_rate_card": "ratecard",
+    "QuoteStore": "store",
+}
+
+__all__ = [
+    "AddressNotFound", "CachingGeocoder", "CatalogStore", "DEFAULT_RATES", "DEMO_CATALOG", "DEMO_LOTS", "FxSnapshot", "FxTable",
+    "GeocodeCache", "IncrementalQuote", "LotCatalog", "LotIndex", "PdfCache", "Place", "QuoteStore",
+    "Rates", "calculate_shipping", "calculate_shipping_batch", "generate_branded_pdf",
+    "get_address_suggestions", "get_distance_and_multiplier", "load_fx", "load_rate_card", "locate_address",
+    "normalize_address", "plan_packing", "price_quote", "quote_file", "set_default_geocoder",
+    "suggest_packing_for_lots",
+]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
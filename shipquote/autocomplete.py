@@ -0,0 +1,162 @@
+"""Debounced, cancellable address autocomplete.
+
+Streamlit reruns the whole script whenever the address input changes, so a
+blocking Nominatim query holds up every keystroke.  ``AddressAutocompleter``
+runs lookups on a background asyncio loop instead: a rerun asks for
+suggestions, waits a few milliseconds at most and renders whatever is
+available, while the lookup finishes in the background.
+
+* Queries are debounced - a lookup only starts once the input has been
+  stable for ``debounce`` seconds.
+* Each channel (one per Streamlit session) has at most one lookup in flight;
+  newer input cancels the stale one, and finished lookups are forgotten.
+* Results are kept in a prefix cache, so "10 Down" can be answered from what
+  was already fetched for "10 Do".
+* An optional ``local`` index (e.g. a ``Gazetteer``) is consulted
+  synchronously first; only queries it cannot answer go to ``geocoder``.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import wait as wait_futures
+
+from .geocoding import normalize_address
+
+MIN_QUERY_LENGTH = 3
+
+
+def _words(text):
+    return normalize_address(text).replace(",", " ").split()
+
+
+def matches_query(query, address):
+    """True when every word of ``query`` starts some word of ``address``."""
+    address_words = _words(address)
+    return all(any(w.startswith(q) for w in address_words) for q in _words(query))
+
+
+class AddressAutocompleter:
+    def __init__(self, geocoder, limit=5, debounce=0.3, timeout=3, max_entries=1024, local=None):
+        self.geocoder = geocoder
+        self.local = local
+        self.limit = limit
+        self.debounce = debounce
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="address-autocomplete", daemon=True
+        )
+        self._thread.start()
+
+    def suggest(self, query, channel=None, wait=0.05):
+        """Return ``(suggestions, pending)`` for ``query`` without blocking.
+
+        ``pending`` is True while a lookup for ``query`` is still running; the
+        suggestions are then the best provisional answer from the prefix cache.
+        """
+        key = normalize_address(query)
+        if len(key) < MIN_QUERY_LENGTH:
+            self._cancel(channel)
+            return [], False
+
+        if self.local is not None:
+            local = self.local.suggest(query, limit=self.limit)
+            if local:
+                self._cancel(channel)
+                return [p.address for p in local], False
+
+        provisional = []
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                cached = self._results[key]
+            else:
+                cached = None
+                prefix = self._cached_prefix(key)
+                if prefix is not None:
+                    narrowed = [a for a in self._results[prefix] if matches_query(key, a)]
+                    if len(self._results[prefix]) < self.limit:
+                        # The prefix already returned everything the geocoder knows
+                        self._store(key, narrowed)
+                        cached = narrowed
+                    else:
+                        provisional = narrowed
+        if cached is not None:
+            self._cancel(channel)
+            return cached, False
+
+        future = self._submit(key, query, channel)
+        wait_futures([future], timeout=wait)
+        if future.done() and not future.cancelled() and future.result() is not None:
+            return future.result(), False
+        return provisional, not future.done()
+
+    def pending(self, query, channel=None):
+        """True while a lookup for ``query`` on ``channel`` has not finished."""
+        key = normalize_address(query)
+        with self._lock:
+            inflight = self._inflight.get(channel)
+        return inflight is not None and inflight[0] == key and not inflight[1].done()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1)
+
+    def _cached_prefix(self, key):
+        for end in range(len(key) - 1, MIN_QUERY_LENGTH - 1, -1):
+            if key[:end] in self._results:
+                return key[:end]
+        return None
+
+    def _store(self, key, addresses):
+        self._results[key] = addresses
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def _submit(self, key, query, channel):
+        with self._lock:
+            inflight = self._inflight.get(channel)
+            if inflight is not None and inflight[0] == key:
+                return inflight[1]
+            future = asyncio.run_coroutine_threadsafe(self._fetch(key, query), self._loop)
+            self._inflight[channel] = (key, future)
+        # Outside the lock: cancelling, or adding a callback to a finished
+        # lookup, runs ``_forget`` right away
+        if inflight is not None:
+            inflight[1].cancel()
+        future.add_done_callback(lambda done: self._forget(channel, done))
+        return future
+
+    def _forget(self, channel, future):
+        with self._lock:
+            inflight = self._inflight.get(channel)
+            if inflight is not None and inflight[1] is future:
+                del self._inflight[channel]
+
+    def _cancel(self, channel):
+        with self._lock:
+            inflight = self._inflight.pop(channel, None)
+        if inflight is not None:
+            inflight[1].cancel()
+
+    async def _fetch(self, key, query):
+        await asyncio.sleep(self.debounce)
+        addresses = await self._loop.run_in_executor(None, self._lookup, query)
+        if addresses is not None:
+            with self._lock:
+                self._store(key, addresses)
+        return addresses
+
+    def _lookup(self, query):
+        try:
+            results = self.geocoder.geocode(
+                query, exactly_one=False, limit=self.limit, timeout=self.timeout, addressdetails=True
+            )
+        except Exception:
+            return None
+        return [r.address for r in results] if results else []
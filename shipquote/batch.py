@@ -0,0 +1,144 @@
+"""Vectorized batch quoting.
+
+``calculate_shipping_batch`` prices a DataFrame of line items - one row per
+(quote, lot) - with NumPy array operations instead of a Python loop per lot.
+The arithmetic is done in the same order as ``calculate_shipping``, so for
+the same distance multipliers every figure is bit-for-bit identical to the
+scalar path.
+
+Input columns:
+
+* ``quote_id`` - groups line items into quotes
+* ``lot`` - lot number, looked up in the catalog (the demo lots by default)
+* ``packing`` / ``delivery`` - keys of the packing / delivery cost tables
+* ``dist_mult`` or ``km`` - the distance multiplier, or the distance it is
+  derived from with the rates' distance bands
+* or ``latitude`` / ``longitude`` - the destination; ``km`` is then the
+  distance from the nearest depot, found for every row in one vectorized
+  query (see ``shipquote.depots``).  It is the great-circle distance, which
+  is up to about 0.5% (``depots.TIE_TOLERANCE``) off the geodesic one the
+  scalar path prices on, except for rows that close to a distance band
+  bound or to a second depot: those are measured geodesically, so every row
+  gets the scalar path's depot and multiplier.  ``km`` is not rounded.
+* ``include_insurance`` - optional, defaults to True
+"""
+import numpy as np
+import pandas as pd
+
+from .catalog import DEMO_CATALOG, as_catalog
+from .config import DEFAULT_RATES
+from .depots import get_default_depots
+from .ratecard import tables
+
+
+def _lookup(values, names, column):
+    idx = pd.Index(names).get_indexer(values)
+    if (idx < 0).any():
+        unknown = pd.unique(np.asarray(values)[idx < 0])
+        raise KeyError(f"unknown {column}: {list(unknown[:5])}")
+    return idx
+
+
+def distance_multipliers(km, rates=DEFAULT_RATES):
+    """Vectorized equivalent of ``engine.distance_multiplier``."""
+    return tables(rates).distance_multipliers(km)
+
+
+def nearest_depots(df, depots=None, rates=DEFAULT_RATES):
+    """Return ``df`` with the nearest ``depot`` and its ``km`` for each destination.
+
+    ``km`` is geodesic where it is close enough to one of the ``rates``'
+    distance band bounds for the great-circle distance to change the band.
+    """
+    depots = depots or get_default_depots()
+    positions, km = depots.nearest_measured(df["latitude"].to_numpy(), df["longitude"].to_numpy(),
+                                            limits=tables(rates).band_limits)
+    out = df.copy()
+    out["depot"] = np.array([d.name for d in depots.depots], dtype=object)[positions]
+    out["km"] = km
+    return out
+
+
+def price_lines(df, catalog=DEMO_CATALOG, rates=DEFAULT_RATES, depots=None):
+    """Return ``df`` with ``weight``, ``material``, ``weight_kg`` and ``price`` columns added."""
+    if "dist_mult" not in df and "km" not in df:
+        df = nearest_depots(df, depots, rates)
+    catalog = as_catalog(catalog)
+    rows = catalog.positions(df["lot"].to_numpy())
+    if (rows < 0).any():
+        unknown = pd.unique(df["lot"].to_numpy()[rows < 0])
+        raise KeyError(f"unknown lot: {list(unknown[:5])}")
+    weight_code = np.asarray(catalog.records["weight"])[rows]
+    material_code = np.asarray(catalog.records["material"])[rows]
+    card = tables(rates)
+    # The catalog's weight/material vocabularies, mapped onto the rate card's
+    weight_mult = card.weight_mult[[card.weight_index[w] for w in catalog.weights]]
+    material_mult = card.material_mult[[card.material_index[m] for m in catalog.materials]]
+
+    packing = card.packing_cost[_lookup(df["packing"], card.packings, "packing")]
+    delivery = card.delivery_cost[_lookup(df["delivery"], card.deliveries, "delivery")]
+    if "dist_mult" in df:
+        dist_mult = df["dist_mult"].to_numpy(dtype=float)
+    else:
+        dist_mult = distance_multipliers(df["km"], rates)
+
+    weight_kg = np.asarray(catalog.records["weight_kg"])[rows]
+    price = rates.base_rate * weight_mult[weight_code] * material_mult[material_code] * dist_mult
+    price = price + (weight_kg * rates.price_per_kg + delivery + packing)
+
+    out = df.copy()
+    out["weight"] = np.array(catalog.weights, dtype=object)[weight_code]
+    out["material"] = np.array(catalog.materials, dtype=object)[material_code]
+    out["weight_kg"] = weight_kg
+    out["price"] = price
+    return out
+
+
+def _sequential_group_sum(codes, values, n_groups):
+    """Per-group sums accumulated in row order, like the scalar ``subtotal += price``.
+
+    Rows are bucketed by their position within the group; one vectorized add
+    per position keeps the floating point result identical to a Python loop.
+    """
+    position = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    order = np.argsort(position, kind="stable")
+    bounds = np.searchsorted(position[order], np.arange(position.max() + 2 if len(position) else 1))
+    acc = np.zeros(n_groups, dtype=values.dtype)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        rows = order[start:stop]
+        acc[codes[rows]] += values[rows]
+    return acc
+
+
+def calculate_shipping_batch(df, catalog=DEMO_CATALOG, rates=DEFAULT_RATES, depots=None):
+    """Price every quote in ``df``; returns one row per quote_id, in input order."""
+    lines = price_lines(df, catalog, rates, depots)
+    codes, quote_ids = pd.factorize(lines["quote_id"], sort=False)
+    n = len(quote_ids)
+
+    subtotal = _sequential_group_sum(codes, lines["price"].to_numpy(), n)
+    total_weight = _sequential_group_sum(codes, lines["weight_kg"].to_numpy(), n)
+    first = np.unique(codes, return_index=True)[1]
+    if "include_insurance" in lines:
+        include_insurance = lines["include_insurance"].to_numpy(dtype=bool)[first]
+    else:
+        include_insurance = np.ones(n, dtype=bool)
+
+    insurance = np.where(include_insurance, subtotal * rates.insurance_rate, 0.0)
+    subtotal_with_insurance = subtotal + insurance
+    vat = subtotal_with_insurance * rates.vat_rate
+    total = subtotal_with_insurance + vat
+
+    result = pd.DataFrame({
+        "subtotal": subtotal,
+        "insurance": insurance,
+        "vat": vat,
+        "total": total,
+        "total_weight": total_weight,
+        "lots": np.bincount(codes, minlength=n),
+    }, index=pd.Index(quote_ids, name="quote_id"))
+    if "km" in lines:
+        result.insert(5, "km", lines["km"].to_numpy()[first])
+    if "depot" in lines:
+        result.insert(5, "depot", lines["depot"].to_numpy()[first])
+    return result
@@ -0,0 +1,102 @@
+"""Parallel bulk PDF rendering.
+
+``render_bulk`` fans priced quotes out over a process pool and writes each
+finished PDF straight into a ZIP archive (a path ending in ``.zip``, or a
+binary stream such as stdout) or into a directory.  Only ``max_pending``
+quotes are in flight at a time and every PDF is written out as soon as it
+is done, so memory stays flat however long the input is.  Bulk PDFs are
+rendered without the PDF cache (``shipquote.pdfcache``), so a large run
+neither fills it nor evicts what interactive quoting has cached.
+"""
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .config import DEFAULT_RATES
+from .pdf import render_quote_pdf
+
+
+def pdf_filename(quote_id):
+    return f"ShipQuote_{quote_id}.pdf"
+
+
+class _ZipSink:
+    def __init__(self, target):
+        self.zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, quote_id, pdf):
+        self.zip.writestr(pdf_filename(quote_id), pdf)
+
+    def close(self):
+        self.zip.close()
+
+
+class _DirectorySink:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, quote_id, pdf):
+        final = os.path.join(self.path, pdf_filename(quote_id))
+        partial = final + ".part"
+        with open(partial, "wb") as f:
+            f.write(pdf)
+        os.replace(partial, final)
+
+    def close(self):
+        pass
+
+
+def _open_sink(output):
+    if not isinstance(output, (str, os.PathLike)):
+        return _ZipSink(output)
+    if str(output).endswith(".zip"):
+        return _ZipSink(output)
+    return _DirectorySink(output)
+
+
+def render_bulk(quotes, output, workers=None, max_pending=None, on_progress=None,
+                rates=DEFAULT_RATES, executor=None):
+    """Render ``(consignment, result)`` pairs into ``output``.
+
+    ``on_progress(quote_id, error)`` is called once per quote as it finishes,
+    with ``error`` None on success.  Returns ``{"rendered": n, "failed":
+    {quote_id: message}}``.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    own_executor = executor is None
+    executor = executor or ProcessPoolExecutor(workers)
+    sink = _open_sink(output)
+    rendered, failed = 0, {}
+    pending = {}
+
+    def drain(block_until):
+        nonlocal rendered
+        while len(pending) > block_until:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                quote_id = pending.pop(future)
+                try:
+                    sink.write(quote_id, future.result())
+                except Exception as e:
+                    failed[quote_id] = f"{type(e).__name__}: {e}"
+                else:
+                    rendered += 1
+                if on_progress is not None:
+                    on_progress(quote_id, failed.get(quote_id))
+
+    try:
+        for consignment, result in quotes:
+            # Bypasses the PDF cache: a bulk run would evict the interactive working set
+            future = executor.submit(render_quote_pdf, consignment, result, rates, cached=False)
+            pending[future] = consignment["quote_id"]
+            drain(max_pending - 1)
+        drain(0)
+    finally:
+        for future in pending:
+            future.cancel()
+        sink.close()
+        if own_executor:
+            executor.shutdown()
+    return {"rendered": rendered, "failed": failed}
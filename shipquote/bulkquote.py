@@ -0,0 +1,221 @@
+"""Streaming, resumable bulk quoting of CSV/Parquet consignment files.
+
+``quote_file`` reads a file of consignments (see ``shipquote.consignment``)
+``chunk_rows`` at a time, prices each chunk - every distinct address in a
+chunk is geocoded once - and appends the flat quote records to the output
+before reading the next chunk, so memory stays flat however many rows the
+file has.  Rows that cannot be priced - invalid, or an address that is
+unknown or could not be geocoded - are written with their ``error``.
+
+* A ``.csv`` output is one file.
+* A ``.parquet`` output is a directory of ``part-NNNNNN.parquet`` files, one
+  per chunk, readable as one table with ``pandas.read_parquet(directory)``.
+
+After every chunk the output is flushed and ``<output>.checkpoint.json``
+records how many input rows are done.  Running the same source and output
+again resumes after the last finished chunk: a partly written CSV chunk is
+truncated away and a stray Parquet part is replaced.  The checkpoint is
+removed once the file is done.  Reading and writing Parquet needs pyarrow.
+
+Rows without a ``quote_id`` get one derived from the source file and row
+number, so a resumed run issues the same IDs.  With a ``store`` a chunk's
+quotes are saved once its output is written, skipping any revision a run
+interrupted before its checkpoint had already saved.
+"""
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+
+from . import metrics
+from .catalog import DEMO_CATALOG
+from .config import DEFAULT_RATES
+from .consignment import FIELDS, error_record, price_consignment, quote_record
+from .engine import locate_address
+
+CHUNK_ROWS = 10_000
+
+
+def _is_parquet(path):
+    return str(path).endswith(".parquet")
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS, skip=0):
+    """Yield lists of raw consignment dicts from ``path``, after its first ``skip`` rows."""
+    if not _is_parquet(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = itertools.islice(csv.DictReader(f), skip, None)
+            while True:
+                chunk = list(itertools.islice(rows, chunk_rows))
+                if not chunk:
+                    return
+                yield chunk
+
+    import pyarrow.parquet as pq
+
+    source = pq.ParquetFile(path)
+    # Whole row groups before the resume point are never read
+    groups = range(source.metadata.num_row_groups)
+    for group in groups:
+        rows = source.metadata.row_group(group).num_rows
+        if skip < rows:
+            break
+        skip -= rows
+    else:
+        return
+    for batch in source.iter_batches(batch_size=chunk_rows, row_groups=groups[group:]):
+        chunk = batch.to_pylist()
+        if skip >= len(chunk):
+            skip -= len(chunk)
+            continue
+        yield chunk[skip:]
+        skip = 0
+
+
+class _CsvSink:
+    def __init__(self, path, state=None):
+        if state is None:
+            self.f = open(path, "wb")
+            self.f.write((",".join(FIELDS) + "\r\n").encode())
+            self.f.flush()
+        else:
+            # Drop whatever was written after the last checkpoint
+            self.f = open(path, "r+b")
+            self.f.truncate(state["output_bytes"])
+            self.f.seek(state["output_bytes"])
+
+    def write(self, records):
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, FIELDS, extrasaction="ignore").writerows(records)
+        self.f.write(buffer.getvalue().encode())
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def position(self):
+        return {"output_bytes": self.f.tell()}
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetSink:
+    def __init__(self, path, state=None):
+        import pyarrow as pa
+
+        self.path = path
+        self.parts = state["parts"] if state else 0
+        self.schema = pa.schema([
+            ("quote_id", pa.string()), ("currency", pa.string()), ("km", pa.int64()),
+            ("total_weight", pa.float64()), ("subtotal", pa.float64()), ("insurance", pa.float64()),
+            ("vat", pa.float64()), ("total", pa.float64()), ("error", pa.string()),
+        ])
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:11]) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    def write(self, records):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist([{k: r.get(k) for k in FIELDS} for r in records], schema=self.schema)
+        part = os.path.join(self.path, f"part-{self.parts:06d}.parquet")
+        pq.write_table(table, part + ".tmp")
+        os.replace(part + ".tmp", part)
+        self.parts += 1
+
+    def position(self):
+        return {"parts": self.parts}
+
+    def close(self):
+        pass
+
+
+def _source_id(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _row_quote_id(source, row):
+    digest = hashlib.sha256(json.dumps([source, row]).encode()).hexdigest()
+    return f"SQ-{digest[:8].upper()}"
+
+
+def _price_chunk(chunk, first_row, source, geocoder, currency, rates, catalog):
+    """``(records, priced)`` for a chunk; ``priced`` has ``(consignment, result, place)`` per quote."""
+    places = {}
+
+    def locate(address):
+        # Every distinct address once per chunk, failed lookups included
+        if address not in places:
+            try:
+                places[address] = locate_address(address, geocoder)
+            except Exception as e:
+                places[address] = e
+        if isinstance(places[address], Exception):
+            raise places[address]
+        return places[address]
+
+    records = []
+    priced = []
+    for row, raw in enumerate(chunk, first_row):
+        if not raw.get("quote_id"):
+            raw = {**raw, "quote_id": _row_quote_id(source, row)}
+        try:
+            consignment, result = price_consignment(raw, geocoder, currency, rates, catalog, locate=locate)
+        except Exception as e:
+            records.append(error_record(raw, e, currency))
+            continue
+        records.append(quote_record(consignment, result, rates))
+        priced.append((consignment, result, places[consignment["address"]]))
+    return records, priced
+
+
+def _save_checkpoint(path, state):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def quote_file(source, output, geocoder=None, currency="EUR", rates=DEFAULT_RATES, catalog=DEMO_CATALOG,
+               store=None, chunk_rows=CHUNK_ROWS, resume=True, on_progress=None):
+    """Price every consignment in ``source`` into ``output``, resuming an interrupted run.
+
+    Returns ``{"rows", "failed", "resumed_at"}``; ``on_progress(rows, failed)``
+    is called after every chunk.  Raises ValueError when a checkpoint exists
+    for a different source - pass ``resume=False`` to start over.
+    """
+    source, output = str(source), str(output)
+    checkpoint = output + ".checkpoint.json"
+    state = None
+    if resume and os.path.exists(checkpoint) and os.path.exists(output):
+        with open(checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["source"] != _source_id(source):
+            raise ValueError(f"{checkpoint} belongs to another source file; remove it or start over")
+    resumed_at = state["rows"] if state else 0
+    sink = (_ParquetSink if _is_parquet(output) else _CsvSink)(output, state)
+    if state is None:
+        state = {"source": _source_id(source), "rows": 0, "failed": 0, **sink.position()}
+        _save_checkpoint(checkpoint, state)
+
+    try:
+        for chunk in read_chunks(source, chunk_rows, skip=state["rows"]):
+            records, priced = _price_chunk(chunk, state["rows"], state["source"], geocoder, currency, rates, catalog)
+            failed = len(records) - len(priced)
+            sink.write(records)
+            if store is not None:
+                for consignment, result, place in priced:
+                    store.save(consignment, result, place, rates=rates, if_changed=True)
+            state.update(sink.position(), rows=state["rows"] + len(chunk), failed=state["failed"] + failed)
+            _save_checkpoint(checkpoint, state)
+            metrics.count("bulk_quote_rows", len(chunk))
+            metrics.count("bulk_quote_failed", failed)
+            if on_progress is not None:
+                on_progress(state["rows"], state["failed"])
+    finally:
+        sink.close()
+    os.remove(checkpoint)
+    return {"rows": state["rows"], "failed": state["failed"], "resumed_at": resumed_at}
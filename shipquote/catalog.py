@@ -0,0 +1,212 @@
+"""Lot catalogs backed by columnar storage.
+
+A ``LotCatalog`` keeps one compact fixed-size record per lot in a NumPy
+structured array - saved as ``.npy`` and memory-mapped on load, or read from
+Parquet - with the weight class and material stored as small integer codes
+into per-catalog vocabularies.  Lookup by lot number is O(1): an offset
+array when lot numbers are dense, a dict otherwise.
+
+``LotCatalog`` is a read-only mapping of lot number to the same info dicts
+as ``DEMO_LOTS``, so the engine can use either.  ``CatalogStore`` loads one
+catalog per sale from a directory, lazily and only when first asked for.
+"""
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+from .config import DEMO_LOTS
+
+LOT_DTYPE = np.dtype([
+    ("lot", "<i8"),
+    ("weight", "u1"),
+    ("material", "<u2"),
+    ("weight_kg", "<f8"),
+    ("title", "S96"),
+    ("artist", "S48"),
+])
+LOT_COLUMNS = ["lot", "weight", "weight_kg", "material", "title", "artist"]
+
+# A dense offset array is used while it is at most this many times the lot count
+DENSE_INDEX_FACTOR = 4
+
+
+def _vocabulary(values):
+    vocab = list(dict.fromkeys(values))
+    codes = {v: i for i, v in enumerate(vocab)}
+    return vocab, codes
+
+
+class LotCatalog(Mapping):
+    def __init__(self, records, weights, materials):
+        self.records = records
+        self.weights = list(weights)
+        self.materials = list(materials)
+        lots = np.asarray(records["lot"])
+        self._lo = int(lots.min()) if len(lots) else 0
+        span = int(lots.max()) - self._lo + 1 if len(lots) else 0
+        self._dense = None
+        self._sparse = None
+        if span <= max(DENSE_INDEX_FACTOR * len(lots), 1024):
+            self._dense = np.full(span, -1, dtype=np.int64)
+            self._dense[lots - self._lo] = np.arange(len(lots))
+        else:
+            self._sparse = dict(zip(lots.tolist(), range(len(lots))))
+            self._sorted = np.argsort(lots, kind="stable")
+
+    # ---- construction / persistence ----
+    @classmethod
+    def from_mapping(cls, lots):
+        return cls.from_columns(
+            lot=list(lots),
+            weight=[i["weight"] for i in lots.values()],
+            weight_kg=[i["weight_kg"] for i in lots.values()],
+            material=[i["material"] for i in lots.values()],
+            title=[i.get("title", "") for i in lots.values()],
+            artist=[i.get("artist", "") for i in lots.values()],
+        )
+
+    @classmethod
+    def from_columns(cls, lot, weight, weight_kg, material, title, artist):
+        weights, weight_codes = _vocabulary(weight)
+        materials, material_codes = _vocabulary(material)
+        records = np.empty(len(lot), dtype=LOT_DTYPE)
+        records["lot"] = np.asarray(lot, dtype=np.int64)
+        records["weight"] = [weight_codes[w] for w in weight]
+        records["material"] = [material_codes[m] for m in material]
+        records["weight_kg"] = np.asarray(weight_kg, dtype=np.float64)
+        records["title"] = [str(t).encode()[:96] for t in title]
+        records["artist"] = [str(a).encode()[:48] for a in artist]
+        return cls(records, weights, materials)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls.from_columns(*(df[c].tolist() for c in LOT_COLUMNS))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load ``path.npy`` (+ ``path.json`` vocabularies), ``.parquet`` or ``.csv``."""
+        path = str(path)
+        if path.endswith(".parquet"):
+            import pandas as pd
+
+            return cls.from_frame(pd.read_parquet(path, columns=LOT_COLUMNS))
+        if path.endswith(".csv"):
+            import pandas as pd
+
+            return cls.from_frame(pd.read_csv(path, usecols=LOT_COLUMNS))
+        stem = path[:-4] if path.endswith(".npy") else path
+        with open(stem + ".json", encoding="utf-8") as f:
+            vocab = json.load(f)
+        records = np.load(stem + ".npy", mmap_mode="r" if mmap else None)
+        return cls(records, vocab["weights"], vocab["materials"])
+
+    def save(self, path):
+        stem = str(path)[:-4] if str(path).endswith(".npy") else str(path)
+        np.save(stem + ".npy", np.asarray(self.records))
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump({"weights": self.weights, "materials": self.materials}, f)
+
+    # ---- lookup ----
+    def position(self, lot):
+        """Row of ``lot`` in ``records``, or -1."""
+        if self._dense is not None:
+            offset = int(lot) - self._lo
+            return int(self._dense[offset]) if 0 <= offset < len(self._dense) else -1
+        return self._sparse.get(int(lot), -1)
+
+    def positions(self, lots):
+        """Vectorized ``position`` for an array of lot numbers."""
+        lots = np.asarray(lots, dtype=np.int64)
+        if self._dense is not None:
+            offset = lots - self._lo
+            inside = (offset >= 0) & (offset < len(self._dense))
+            out = np.full(len(lots), -1, dtype=np.int64)
+            out[inside] = self._dense[offset[inside]]
+            return out
+        sorted_lots = np.asarray(self.records["lot"])[self._sorted]
+        idx = np.searchsorted(sorted_lots, lots).clip(max=len(sorted_lots) - 1)
+        return np.where(sorted_lots[idx] == lots, self._sorted[idx], -1)
+
+    def __getitem__(self, lot):
+        pos = self.position(lot)
+        if pos < 0:
+            raise KeyError(lot)
+        r = self.records[pos]
+        weight_kg = float(r["weight_kg"])
+        return {
+            "weight": self.weights[r["weight"]],
+            "weight_kg": int(weight_kg) if weight_kg.is_integer() else weight_kg,
+            "material": self.materials[r["material"]],
+            "title": r["title"].decode("utf-8", "ignore"),
+            "artist": r["artist"].decode("utf-8", "ignore"),
+        }
+
+    def __contains__(self, lot):
+        try:
+            return self.position(lot) >= 0
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return iter(np.asarray(self.records["lot"]).tolist())
+
+    def __len__(self):
+        return len(self.records)
+
+
+def as_catalog(lots):
+    """``lots`` as a ``LotCatalog``, converting plain mappings such as ``DEMO_LOTS``."""
+    if isinstance(lots, LotCatalog):
+        return lots
+    if lots is DEMO_LOTS:
+        return DEMO_CATALOG
+    return LotCatalog.from_mapping(lots)
+
+
+class CatalogStore:
+    """Directory of per-sale catalogs (``<sale>.npy``/``.json`` or ``<sale>.parquet``)."""
+
+    def __init__(self, root, max_loaded=8):
+        self.root = str(root)
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+
+    def sales(self):
+        names = os.listdir(self.root) if os.path.isdir(self.root) else []
+        return sorted({n.rsplit(".", 1)[0] for n in names if n.endswith((".npy", ".parquet"))})
+
+    def sale(self, sale_id):
+        if sale_id in self._loaded:
+            self._loaded.move_to_end(sale_id)
+            return self._loaded[sale_id]
+        stem = os.path.join(self.root, sale_id)
+        path = stem + ".parquet" if os.path.exists(stem + ".parquet") else stem + ".npy"
+        if not os.path.exists(path):
+            raise KeyError(f"no catalog for sale {sale_id!r} in {self.root}")
+        catalog = LotCatalog.load(path)
+        self._loaded[sale_id] = catalog
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+        return catalog
+
+    def import_file(self, sale_id, source):
+        """Convert a CSV/Parquet lot list into this store's ``.npy`` format."""
+        os.makedirs(self.root, exist_ok=True)
+        catalog = LotCatalog.load(source)
+        catalog.save(os.path.join(self.root, sale_id))
+        self._loaded.pop(sale_id, None)
+        return catalog
+
+
+def catalog_from_env():
+    """Catalog for ``SHIPQUOTE_SALE`` under ``SHIPQUOTE_CATALOG_DIR``, else the demo lots."""
+    root, sale = os.environ.get("SHIPQUOTE_CATALOG_DIR"), os.environ.get("SHIPQUOTE_SALE")
+    if root and sale:
+        return CatalogStore(root).sale(sale)
+    return DEMO_CATALOG
+
+
+DEMO_CATALOG = LotCatalog.from_mapping(DEMO_LOTS)
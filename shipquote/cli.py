@@ -0,0 +1,281 @@
+"""Command-line entry point.
+
+Consignments (see ``shipquote.consignment``) are read from stdin as JSON -
+one object, an array of objects or JSON Lines - or CSV.
+
+* ``python -m shipquote quote`` writes priced quotes to stdout: JSON Lines
+  for JSON input, CSV for CSV input.
+* ``python -m shipquote bulk consignments.csv quotes.parquet`` prices a
+  CSV/Parquet file of consignments in chunks into a CSV/Parquet output,
+  resuming where an interrupted run stopped (see ``shipquote.bulkquote``).
+* ``python -m shipquote pdfs --out quotes.zip`` renders a PDF per
+  consignment in parallel into a ZIP archive (``-`` for stdout) or directory.
+* ``python -m shipquote --store quotes.sqlite3 reissue SQ-1234ABCD`` re-renders
+  a stored quote's PDF; ``find`` looks stored quotes up by ID, client or date.
+* ``python -m shipquote import-catalog SALE lots.csv`` converts a lot list
+  into the memory-mapped catalog format under ``--catalog-dir``.
+
+Prices come from ``--rate-card`` (see ``shipquote.ratecard``) when given.
+Lots are priced from ``--sale`` in ``--catalog-dir`` when given, otherwise
+from the demo lots.  With ``--store`` every priced quote is saved to that
+quote store.  ``--fx-rates`` (a dated rates file, see ``shipquote.fx``) supplies
+the exchange rates in force on ``--fx-date``, default today.  ``--metrics out.json`` records hot-path timings and
+swallowed geocoding errors and writes a snapshot when the command ends.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+from .config import DEFAULT_RATES
+from .consignment import FIELDS, error_record, price_consignment, quote_consignment
+from .bulk import render_bulk
+from .bulkquote import CHUNK_ROWS, quote_file
+from .catalog import DEMO_CATALOG, CatalogStore
+from .engine import DEFAULT_GEOCODE_CACHE, NOMINATIM_RATE, build_geocoder
+from .fx import load_fx
+from .ratecard import load_rate_card
+from . import metrics
+from .store import QuoteStore, render_stored_pdf
+
+
+def read_consignments(stream, fmt=None):
+    """Yield raw consignment dicts from ``stream``."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    first = stream.readline()
+    try:
+        record = json.loads(first)
+    except ValueError:
+        records = json.loads(first + stream.read())
+        yield from records if isinstance(records, list) else [records]
+        return
+    yield from record if isinstance(record, list) else [record]
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _sniff(stream):
+    if stream.seekable():
+        head = stream.read(1)
+        stream.seek(0)
+        return "json" if head in ("[", "{") else "csv"
+    return None
+
+
+def _catalog(args):
+    if args.sale:
+        return CatalogStore(args.catalog_dir).sale(args.sale)
+    return DEMO_CATALOG
+
+
+def _rates(args, catalog=DEMO_CATALOG):
+    rates = load_rate_card(args.rate_card, catalog=catalog) if args.rate_card else DEFAULT_RATES
+    if not args.fx_rates:
+        return rates
+    return load_fx(args.fx_rates).snapshot(args.fx_date).as_rates(rates)
+
+
+def _store(args):
+    return QuoteStore(args.store) if args.store else None
+
+
+def _stored_record(quote):
+    return {
+        "quote_id": quote.quote_id,
+        "revision": quote.revision,
+        "client": quote.client,
+        "issued_at": quote.issued_at.isoformat(timespec="seconds"),
+        "place": quote.place,
+        "consignment": quote.consignment,
+        "result": quote.result,
+    }
+
+
+def cmd_quote(args):
+    stdin, stdout = sys.stdin, sys.stdout
+    fmt = args.format or _sniff(stdin) or "json"
+    geocoder = build_geocoder(args.geocode_cache, args.gazetteer, args.offline, args.geocode_rate)
+    catalog = _catalog(args)
+    rates = _rates(args, catalog)
+    store = _store(args)
+    failures = 0
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(stdout, FIELDS, extrasaction="ignore")
+        writer.writeheader()
+    for consignment in read_consignments(stdin, fmt):
+        record = quote_consignment(consignment, geocoder, args.currency, rates, catalog, store)
+        failures += "error" in record
+        if writer is not None:
+            writer.writerow(record)
+        else:
+            stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    if failures:
+        print(f"{failures} consignment(s) could not be priced", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def cmd_bulk(args):
+    geocoder = build_geocoder(args.geocode_cache, args.gazetteer, args.offline, args.geocode_rate)
+
+    catalog = _catalog(args)
+
+    def report(rows, failed):
+        print(f"{rows} rows priced, {failed} failed", file=sys.stderr)
+
+    summary = quote_file(
+        args.source, args.output, geocoder, args.currency, _rates(args, catalog), catalog, _store(args),
+        chunk_rows=args.chunk_rows, resume=not args.restart, on_progress=report,
+    )
+    if summary["resumed_at"]:
+        print(f"resumed after row {summary['resumed_at']}", file=sys.stderr)
+    if summary["failed"]:
+        print(f"{summary['failed']} consignment(s) could not be priced", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+def cmd_pdfs(args):
+    stdin = sys.stdin
+    fmt = args.format or _sniff(stdin) or "json"
+    geocoder = build_geocoder(args.geocode_cache, args.gazetteer, args.offline, args.geocode_rate)
+    catalog = _catalog(args)
+    rates = _rates(args, catalog)
+    store = _store(args)
+    failures = {}
+
+    def report(quote_id, error):
+        print(f"{quote_id}\t{'FAILED ' + error if error else 'ok'}", file=sys.stderr)
+
+    def priced():
+        for raw in read_consignments(stdin, fmt):
+            try:
+                yield price_consignment(raw, geocoder, args.currency, rates, catalog, store)
+            except Exception as e:
+                record = error_record(raw, e, args.currency)
+                failures[record["quote_id"]] = record["error"]
+                report(record["quote_id"], record["error"])
+
+    output = sys.stdout.buffer if args.out == "-" else args.out
+    summary = render_bulk(priced(), output, workers=args.workers, on_progress=report, rates=rates)
+    failures.update(summary["failed"])
+    print(f"{summary['rendered']} rendered, {len(failures)} failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def cmd_import_catalog(args):
+    catalog = CatalogStore(args.catalog_dir).import_file(args.sale_id, args.source)
+    print(f"{len(catalog)} lots imported into {args.catalog_dir}/{args.sale_id}.npy", file=sys.stderr)
+    return 0
+
+
+def cmd_reissue(args):
+    if not args.store:
+        print("reissue needs --store", file=sys.stderr)
+        return 2
+    store = QuoteStore(args.store)
+    quote = store.get(args.quote_id)
+    if quote is None:
+        print(f"unknown quote: {args.quote_id}", file=sys.stderr)
+        return 1
+    output = sys.stdout.buffer if args.out == "-" else args.out or f"ShipQuote_{quote.quote_id}.pdf"
+    render_stored_pdf(quote, output=output)
+    return 0
+
+
+def cmd_find(args):
+    if not args.store:
+        print("find needs --store", file=sys.stderr)
+        return 2
+    store = QuoteStore(args.store)
+    if args.quote_id:
+        quotes = store.history(args.quote_id)
+    elif args.client:
+        quotes = store.by_client(args.client, args.limit)
+    else:
+        since = datetime.fromisoformat(args.since)
+        until = datetime.fromisoformat(args.until) if args.until else datetime.now()
+        quotes = store.issued_between(since, until, args.limit)
+    for quote in quotes:
+        sys.stdout.write(json.dumps(_stored_record(quote), ensure_ascii=False) + "\n")
+    return 0 if quotes else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m shipquote", description="ShipQuote Pro quote engine")
+    parser.add_argument("--geocode-cache", default=os.environ.get("SHIPQUOTE_GEOCODE_CACHE", DEFAULT_GEOCODE_CACHE))
+    parser.add_argument("--gazetteer", default=os.environ.get("SHIPQUOTE_GAZETTEER"),
+                        help="local CSV/Parquet gazetteer consulted before Nominatim")
+    parser.add_argument("--offline", action="store_true", default=os.environ.get("SHIPQUOTE_OFFLINE") == "1",
+                        help="never query Nominatim")
+    parser.add_argument("--geocode-rate", type=float,
+                        default=float(os.environ.get("SHIPQUOTE_GEOCODE_RATE", NOMINATIM_RATE)),
+                        help="Nominatim requests per second")
+    parser.add_argument("--catalog-dir", default=os.environ.get("SHIPQUOTE_CATALOG_DIR", "catalogs"))
+    parser.add_argument("--sale", default=os.environ.get("SHIPQUOTE_SALE"),
+                        help="price lots from this sale's catalog instead of the demo lots")
+    parser.add_argument("--store", default=os.environ.get("SHIPQUOTE_QUOTE_STORE"),
+                        help="SQLite quote store; priced quotes are saved there")
+    parser.add_argument("--rate-card", default=os.environ.get("SHIPQUOTE_RATE_CARD"),
+                        help="JSON rate card overriding the built-in prices (see data/rate-card.json)")
+    parser.add_argument("--fx-rates", default=os.environ.get("SHIPQUOTE_FX_RATES"),
+                        help="CSV/Parquet of dated exchange rates (default: the built-in EUR/USD/GBP rates)")
+    parser.add_argument("--fx-date", help="price at the rates in force on this ISO date (default: today)")
+    parser.add_argument("--metrics", metavar="PATH", help="write a JSON snapshot of timings and counters here")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    quote = commands.add_parser("quote", help="price consignments from stdin")
+    quote.add_argument("--format", choices=["json", "csv"], help="input/output format (sniffed by default)")
+    quote.add_argument("--currency", default="EUR", help="default quote currency")
+    quote.set_defaults(func=cmd_quote)
+
+    bulk = commands.add_parser("bulk", help="price a CSV/Parquet file of consignments, resumably")
+    bulk.add_argument("source", help="CSV or Parquet of consignments")
+    bulk.add_argument("output", help="*.csv file or *.parquet directory of priced quotes")
+    bulk.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows priced and written at a time")
+    bulk.add_argument("--restart", action="store_true", help="ignore an interrupted run's checkpoint")
+    bulk.add_argument("--currency", default="EUR", help="default quote currency")
+    bulk.set_defaults(func=cmd_bulk)
+
+    pdfs = commands.add_parser("pdfs", help="render a PDF per consignment from stdin")
+    pdfs.add_argument("--out", required=True, help="ZIP archive (*.zip or - for stdout) or directory")
+    pdfs.add_argument("--workers", type=int, help="rendering processes (default: one per core)")
+    pdfs.add_argument("--format", choices=["json", "csv"], help="input format (sniffed by default)")
+    pdfs.add_argument("--currency", default="EUR", help="default quote currency")
+    pdfs.set_defaults(func=cmd_pdfs)
+
+    reissue = commands.add_parser("reissue", help="re-render a stored quote's PDF without repricing it")
+    reissue.add_argument("quote_id")
+    reissue.add_argument("--out", help="PDF path or - for stdout (default: ShipQuote_<quote_id>.pdf)")
+    reissue.set_defaults(func=cmd_reissue)
+
+    find = commands.add_parser("find", help="look up stored quotes as JSON Lines")
+    criteria = find.add_mutually_exclusive_group(required=True)
+    criteria.add_argument("--quote-id", help="every revision of this quote")
+    criteria.add_argument("--client", help="quotes issued to this client, newest first")
+    criteria.add_argument("--since", help="quotes issued from this ISO date")
+    find.add_argument("--until", help="end of the --since range (default: now)")
+    find.add_argument("--limit", type=int, default=100)
+    find.set_defaults(func=cmd_find)
+
+    importer = commands.add_parser("import-catalog", help="convert a CSV/Parquet lot list for a sale")
+    importer.add_argument("sale_id")
+    importer.add_argument("source", help="CSV or Parquet with lot, weight, weight_kg, material, title, artist")
+    importer.set_defaults(func=cmd_import_catalog)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.metrics:
+        return args.func(args)
+    metrics.enable()
+    try:
+        return args.func(args)
+    finally:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump(metrics.snapshot(), f, indent=2)
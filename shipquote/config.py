@@ -0,0 +1,95 @@
+"""Pricing configuration shared by the Streamlit app and the quote engine."""
+from collections import namedtuple
+
+PARIS_COORD = (48.8566, 2.3522)
+# Warehouses quotes ship from: name -> (latitude, longitude); the nearest is used
+DEPOTS = {"Paris": PARIS_COORD}
+DAYS_LEFT = 7
+
+# ================= DEMO LOT DATA =================
+DEMO_LOTS = {
+    86: {"weight": "Heavy", "weight_kg": 45, "material": "Canvas", "title": "Abstract Expressionism #3", "artist": "J. Basquiat"},
+    87: {"weight": "Medium", "weight_kg": 25, "material": "Canvas", "title": "Landscape Vista", "artist": "M. Rousseau"},
+    88: {"weight": "Medium", "weight_kg": 30, "material": "Canvas", "title": "Urban Nocturne", "artist": "K. Tanaka"},
+    89: {"weight": "Heavy", "weight_kg": 85, "material": "Glass/Steel", "title": "Reflections III", "artist": "L. Fontana"},
+    90: {"weight": "Heavy", "weight_kg": 120, "material": "Metal", "title": "Kinetic Sculpture", "artist": "A. Calder"},
+    91: {"weight": "Medium", "weight_kg": 22, "material": "Canvas", "title": "Still Life with Fruit", "artist": "P. Cezanne"},
+    92: {"weight": "Heavy", "weight_kg": 55, "material": "Canvas", "title": "The Great Wave", "artist": "K. Hokusai"},
+    93: {"weight": "Light", "weight_kg": 8, "material": "Photograph", "title": "Portrait Series #7", "artist": "A. Adams"},
+    94: {"weight": "Light", "weight_kg": 5, "material": "Photograph", "title": "Cityscape 2024", "artist": "D. LaChapelle"},
+    95: {"weight": "Medium", "weight_kg": 18, "material": "Photograph", "title": "Nature's Symmetry", "artist": "A. Gursky"},
+}
+
+WEIGHT_MULT = {"Light": 1, "Medium": 1.5, "Heavy": 2}
+MATERIAL_MULT = {
+    "Canvas": 1,
+    "Photograph": 1,
+    "Metal": 1.5,
+    "Glass/Steel": 1.6,
+}
+
+DELIVERY_COST = {
+    "Front delivery": 0,
+    "White Glove (ground)": 100,
+    "White Glove (elevator)": 150,
+    "Curbside": -30,
+}
+
+PACKING_COST = {
+    "Automatic (AI)": 0,
+    "Wood crate": 80,
+    "Cardboard box": 20,
+    "Bubble wrap": 40,
+    "Custom": 100,
+}
+
+# Containers lots can share when a consignment is consolidated:
+# packing type -> (max total kg, max lots, material classes it may hold).
+# Lots of different material classes never share a container.
+CONTAINERS = {
+    "Wood crate": (250, 6, ("rigid", "flat", "canvas")),
+    "Bubble wrap": (60, 3, ("canvas",)),
+    "Cardboard box": (25, 4, ("flat",)),
+}
+OVERSIZE_PACKING = "Custom"  # a lot no container can hold ships alone in this
+
+PACKING_TYPES = list(PACKING_COST.keys())
+DELIVERY_TYPES = list(DELIVERY_COST.keys())
+
+CURRENCY_RATE = {"EUR": 1, "USD": 1.1, "GBP": 0.85}
+CURRENCY_SYMBOL = {"EUR": "€", "USD": "$", "GBP": "£"}
+
+VAT_RATE = 0.20  # 20% VAT
+INSURANCE_RATE = 0.02  # 2% of shipping cost for insurance
+
+# ================= PRICING MODEL =================
+BASE_RATE = 220  # € per lot before multipliers
+PRICE_PER_KG = 2  # € per kg, added on top of the multiplied base
+
+# (upper bound in km, multiplier) - first band whose bound exceeds the distance
+DISTANCE_BANDS = ((50, 1), (300, 1.2), (1000, 1.5))
+FAR_DISTANCE_MULT = 2
+
+# ================= RATE BUNDLE =================
+# Everything the engine prices with, so callers can inject alternative rates
+# with DEFAULT_RATES._replace(...) instead of patching module constants.
+Rates = namedtuple("Rates", [
+    "base_rate", "price_per_kg", "weight_mult", "material_mult", "delivery_cost",
+    "packing_cost", "distance_bands", "far_distance_mult", "insurance_rate", "vat_rate",
+    "currency_rate", "currency_symbol",
+])
+
+DEFAULT_RATES = Rates(
+    base_rate=BASE_RATE,
+    price_per_kg=PRICE_PER_KG,
+    weight_mult=WEIGHT_MULT,
+    material_mult=MATERIAL_MULT,
+    delivery_cost=DELIVERY_COST,
+    packing_cost=PACKING_COST,
+    distance_bands=DISTANCE_BANDS,
+    far_distance_mult=FAR_DISTANCE_MULT,
+    insurance_rate=INSURANCE_RATE,
+    vat_rate=VAT_RATE,
+    currency_rate=CURRENCY_RATE,
+    currency_symbol=CURRENCY_SYMBOL,
+)
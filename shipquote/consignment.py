@@ -0,0 +1,140 @@
+"""Consignment records shared by the CLI and the HTTP service.
+
+A consignment is the raw request for one quote:
+
+* ``lots`` - lot numbers, as a list or a ``;``/space separated string
+* ``address`` - delivery address
+* ``packing`` - optional, defaults to the suggested packing for the lots
+* ``delivery`` - optional, defaults to "Front delivery"
+* ``include_insurance`` - optional, defaults to true
+* ``consolidate`` - optional, defaults to false; share containers between
+  lots (see ``shipquote.packing``) instead of packing each lot alone
+* ``currency`` - optional, defaults to the caller's currency
+* ``quote_id`` - optional, generated when missing
+* ``client`` - optional client name, used on the PDF
+"""
+from uuid import uuid4
+
+from .catalog import DEMO_CATALOG
+from .config import DEFAULT_RATES
+from .engine import convert_result, locate_address, measure_distance, price_quote, suggest_packing_for_lots
+
+# Columns of a flat quote record, as written to CSV/Parquet
+FIELDS = ["quote_id", "currency", "km", "total_weight", "subtotal", "insurance", "vat", "total", "error"]
+
+
+def new_quote_id():
+    return f"SQ-{uuid4().hex[:8].upper()}"
+
+
+def parse_lots(value):
+    if isinstance(value, list):
+        try:
+            return [int(v) for v in value]
+        except TypeError:
+            raise ValueError(f"invalid lots: {value!r}")
+    return [int(v) for v in str(value).replace(";", " ").replace(",", " ").split()]
+
+
+def parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "n")
+
+
+def _text(raw, key):
+    """``raw[key]`` as a string, ``""`` when missing or null; raises ValueError for any other type."""
+    value = raw.get(key)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string, not {type(value).__name__}")
+    return value
+
+
+def normalize_consignment(raw, currency="EUR", rates=DEFAULT_RATES, catalog=DEMO_CATALOG):
+    """Validated consignment with defaults filled in; raises KeyError/ValueError."""
+    lots = parse_lots(raw["lots"])
+    if not lots:
+        raise ValueError("no lots given")
+    address = _text(raw, "address")
+    if not address.strip():
+        raise ValueError("no address given")
+    consignment = {
+        "quote_id": _text(raw, "quote_id") or new_quote_id(),
+        "client": _text(raw, "client"),
+        "lots": lots,
+        "packing": _text(raw, "packing") or suggest_packing_for_lots(lots, catalog)[0],
+        "delivery": _text(raw, "delivery") or "Front delivery",
+        "address": address,
+        "include_insurance": parse_bool(raw.get("include_insurance")),
+        "consolidate": parse_bool(raw.get("consolidate"), default=False),
+        "currency": _text(raw, "currency") or currency,
+    }
+    for key, table in (("packing", rates.packing_cost), ("delivery", rates.delivery_cost),
+                       ("currency", rates.currency_rate)):
+        if consignment[key] not in table:
+            raise ValueError(f"unknown {key}: {consignment[key]!r}")
+    return consignment
+
+
+def quote_record(consignment, result, rates=DEFAULT_RATES):
+    """Flat output record for a priced consignment, amounts in its currency."""
+    record = {
+        "quote_id": consignment["quote_id"],
+        "currency": consignment["currency"],
+        "km": result["km"],
+        "total_weight": result["total_weight"],
+    }
+    converted = convert_result(result, consignment["currency"], rates)
+    record.update({k: round(v, 2) for k, v in converted.items()})
+    record["breakdown"] = result["breakdown"]
+    return record
+
+
+def error_record(raw, error, currency="EUR"):
+    quote_id, raw_currency = raw.get("quote_id"), raw.get("currency")
+    return {
+        "quote_id": quote_id if quote_id and isinstance(quote_id, str) else new_quote_id(),
+        "currency": raw_currency if raw_currency and isinstance(raw_currency, str) else currency,
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+def price_consignment(raw, geocoder=None, currency="EUR", rates=DEFAULT_RATES, catalog=DEMO_CATALOG,
+                      store=None, locate=None):
+    """``(consignment, result)`` for one raw consignment.
+
+    Raises KeyError/ValueError for an invalid consignment, AddressNotFound
+    for an address the geocoder does not know and the geocoder's own errors,
+    e.g. ``RateLimitExceeded``, when the lookup fails.
+
+    With a ``store`` the priced quote is also saved there.  ``locate``
+    replaces ``locate_address`` for resolving the address, e.g. to memoize it.
+    """
+    consignment = normalize_consignment(raw, currency, rates, catalog)
+    if locate is None:
+        place = locate_address(consignment["address"], geocoder)
+    else:
+        place = locate(consignment["address"])
+    km, dist_mult = measure_distance(place, rates)
+    result = price_quote(
+        consignment["lots"], consignment["packing"], consignment["delivery"], km, dist_mult,
+        consignment["include_insurance"], rates=rates, catalog=catalog, consolidate=consignment["consolidate"],
+    )
+    if store is not None:
+        store.save(consignment, result, place, rates=rates)
+    return consignment, result
+
+
+def quote_consignment(raw, geocoder=None, currency="EUR", rates=DEFAULT_RATES, catalog=DEMO_CATALOG,
+                      store=None, locate=None):
+    """Price one raw consignment into a flat output record, with ``error`` set when it cannot be."""
+    try:
+        consignment, result = price_consignment(raw, geocoder, currency, rates, catalog, store, locate)
+    except Exception as e:
+        # Invalid, unknown or unreachable - reported on the row, never priced as 0 km
+        return error_record(raw, e, currency)
+    return quote_record(consignment, result, rates)
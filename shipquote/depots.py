@@ -0,0 +1,177 @@
+"""Origin depots: ship every quote from the nearest warehouse.
+
+``DepotIndex`` holds the depots as unit vectors and answers "which depot
+is nearest?" for one destination or a whole batch with one matrix product -
+the nearest depot on a sphere has the largest dot product - in chunks of
+``CHUNK_ROWS`` destinations; the distance to it is then one haversine per
+destination.  The distance bands only ever grow with distance, so the
+nearest depot is also the cheapest one.
+
+Haversine distances are on a sphere and differ from the geodesic distances
+quotes are priced on by up to about 0.5%.  ``measure`` therefore only runs
+geodesic calls for the depots within ``TIE_TOLERANCE`` of the nearest one -
+almost always just that one - however many depots there are - and
+remembers the last ``MEASURE_CACHE_SIZE`` destinations, since bulk files
+repeat addresses and a geodesic costs about a millisecond.
+``nearest_measured`` gives a whole batch the same answers as ``measure``
+where it matters - depot ties and distances close to a band bound - and
+keeps the cheap great-circle km everywhere else.
+
+Depots come from ``SHIPQUOTE_DEPOTS`` - a CSV or Parquet file with ``name``,
+``latitude`` and ``longitude`` columns - or ``config.DEPOTS``.
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .config import DEPOTS
+from .gazetteer import _COLUMN_ALIASES, _read_rows
+from .geocoding import Place
+
+EARTH_RADIUS_KM = 6371.0088
+TIE_TOLERANCE = 0.006  # relative haversine/geodesic disagreement worth double-checking
+CHUNK_ROWS = 65536
+MEASURE_CACHE_SIZE = 4096
+
+Depot = namedtuple("Depot", ["name", "latitude", "longitude"])
+
+_default_depots = None
+
+
+class DepotIndex:
+    def __init__(self, depots):
+        self.depots = [Depot(*d) for d in depots]
+        if not self.depots:
+            raise ValueError("at least one depot is needed")
+        self._lat = np.radians([d.latitude for d in self.depots])
+        self._lon = np.radians([d.longitude for d in self.depots])
+        self._cos_lat = np.cos(self._lat)
+        self._vectors = _unit_vectors(self._lat, self._lon)
+        self._measured = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_mapping(cls, depots=DEPOTS):
+        """Index of ``{name: (latitude, longitude)}``."""
+        return cls(Depot(name, lat, lon) for name, (lat, lon) in depots.items())
+
+    @classmethod
+    def load(cls, path):
+        depots = []
+        for row in _read_rows(path):
+            row = {_COLUMN_ALIASES.get(k.lower(), k.lower()): v for k, v in row.items()}
+            depots.append(Depot(str(row["name"]), float(row["latitude"]), float(row["longitude"])))
+        return cls(depots)
+
+    def __len__(self):
+        return len(self.depots)
+
+    def haversine(self, latitude, longitude):
+        """``(destinations, depots)`` matrix of great-circle km."""
+        lat = np.radians(np.asarray(latitude, dtype=float)).reshape(-1, 1)
+        lon = np.radians(np.asarray(longitude, dtype=float)).reshape(-1, 1)
+        a = (np.sin((lat - self._lat) / 2) ** 2
+             + np.cos(lat) * self._cos_lat * np.sin((lon - self._lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def nearest(self, latitude, longitude):
+        """``(depot positions, great-circle km)`` of the nearest depot to each destination."""
+        positions, km, _ = self._nearest(latitude, longitude)
+        return positions, km
+
+    def nearest_measured(self, latitude, longitude, limits=()):
+        """``nearest``, with ``measure``'s depot and geodesic km where they could differ from it.
+
+        That is wherever a second depot is within ``TIE_TOLERANCE`` of the
+        nearest one, or the great-circle km are within it of one of
+        ``limits`` - e.g. distance band bounds, so every destination falls in
+        the band ``measure`` puts it in.  Everywhere else the km stay
+        great-circle.
+        """
+        lat = np.asarray(latitude, dtype=float).ravel()
+        lon = np.asarray(longitude, dtype=float).ravel()
+        positions, km, second = self._nearest(lat, lon, second=len(self.depots) > 1)
+        unsure = np.zeros(len(km), dtype=bool)
+        if second is not None:
+            unsure |= second <= km * (1 + TIE_TOLERANCE)
+        for limit in np.asarray(limits, dtype=float).ravel():
+            unsure |= np.abs(km - limit) <= TIE_TOLERANCE * np.maximum(km, limit)
+        if unsure.any():
+            position = {id(d): i for i, d in enumerate(self.depots)}
+            km = km.copy()
+            for i in np.flatnonzero(unsure).tolist():
+                depot, km[i] = self.measure(Place(None, lat[i], lon[i]))
+                positions[i] = position[id(depot)]
+        return positions, km
+
+    def _nearest(self, latitude, longitude, second=False):
+        # Positions and great-circle km of the nearest depots, and with
+        # ``second`` the great-circle km of the runner-up
+        lat = np.radians(np.asarray(latitude, dtype=float).ravel())
+        lon = np.radians(np.asarray(longitude, dtype=float).ravel())
+        positions = np.empty(len(lat), dtype=np.int64)
+        runner_up = np.empty(len(lat)) if second else None
+        for start in range(0, len(lat), CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            closeness = _unit_vectors(lat[start:stop], lon[start:stop]) @ self._vectors.T
+            positions[start:stop] = closeness.argmax(axis=1)
+            if second:
+                cos_angle = np.partition(closeness, -2, axis=1)[:, -2]
+                runner_up[start:stop] = EARTH_RADIUS_KM * np.arccos(np.clip(cos_angle, -1.0, 1.0))
+        a = (np.sin((lat - self._lat[positions]) / 2) ** 2
+             + np.cos(lat) * self._cos_lat[positions] * np.sin((lon - self._lon[positions]) / 2) ** 2)
+        return positions, 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0))), runner_up
+
+    def measure(self, place):
+        """``(depot, geodesic km)`` from the nearest depot to a geocoded place."""
+        destination = (place.latitude, place.longitude)
+        with self._lock:
+            cached = self._measured.get(destination)
+            if cached is not None:
+                self._measured.move_to_end(destination)
+                return cached
+        measured = self._measure(destination)
+        with self._lock:
+            self._measured[destination] = measured
+            while len(self._measured) > MEASURE_CACHE_SIZE:
+                self._measured.popitem(last=False)
+        return measured
+
+    def _measure(self, destination):
+        from geopy.distance import geodesic
+
+        if len(self.depots) == 1:
+            return self.depots[0], geodesic(self.depots[0][1:], destination).km
+        distances = self.haversine(*destination)[0]
+        candidates = np.flatnonzero(distances <= distances.min() * (1 + TIE_TOLERANCE))
+        best = None
+        for i in candidates.tolist():
+            km = geodesic(self.depots[i][1:], destination).km
+            if best is None or km < best[1]:
+                best = (self.depots[i], km)
+        return best
+
+
+def _unit_vectors(lat, lon):
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def depots_from_env():
+    """``DepotIndex`` from ``SHIPQUOTE_DEPOTS``, or of ``config.DEPOTS`` when it is not set."""
+    path = os.environ.get("SHIPQUOTE_DEPOTS")
+    return DepotIndex.load(path) if path else DepotIndex.from_mapping()
+
+
+def get_default_depots():
+    global _default_depots
+    if _default_depots is None:
+        _default_depots = depots_from_env()
+    return _default_depots
+
+
+def set_default_depots(depots):
+    global _default_depots
+    _default_depots = depots
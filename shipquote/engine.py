@@ -0,0 +1,225 @@
+"""Headless quote engine.
+
+Pricing, packing suggestions and distance lookup without any Streamlit
+dependency, so workers, batch jobs and the CLI can import them directly.
+Every function takes its collaborators as keyword arguments - ``geocoder``
+(anything with a geopy-style ``geocode``), ``rates`` (a ``Rates`` bundle)
+and ``catalog`` (a ``LotCatalog`` or any mapping of lot number to lot info) - and falls back to
+the process defaults when they are omitted.
+"""
+import os
+
+from .catalog import DEMO_CATALOG
+from .config import DEFAULT_RATES
+from .depots import get_default_depots
+from .gazetteer import FallbackGeocoder, Gazetteer
+from .geocoding import CachingGeocoder, GeocodeCache, NullGeocoder, Place
+from .metrics import count, swallowed, timed
+from .packing import describe_plan, plan_packing
+from .ratecard import tables
+from .ratelimit import RateLimitedGeocoder
+
+USER_AGENT = "shipquote_pro"
+DEFAULT_GEOCODE_CACHE = ".shipquote_geocode.sqlite3"
+NOMINATIM_RATE = 1.0  # requests per second, per Nominatim's usage policy
+
+_default_geocoder = None
+
+
+# ================= GEOCODER =================
+def build_geocoder(cache_path=DEFAULT_GEOCODE_CACHE, gazetteer_path=None, offline=False,
+                   rate=NOMINATIM_RATE):
+    """Geocoder stack: local gazetteer first, then rate-limited Nominatim behind the SQLite cache.
+
+    ``offline`` replaces Nominatim with a geocoder that knows no address, so
+    nothing the gazetteer cannot answer ever reaches the network.
+    """
+    online = NullGeocoder()
+    if not offline:
+        from geopy.geocoders import Nominatim
+
+        limited = RateLimitedGeocoder(Nominatim(user_agent=USER_AGENT), rate=rate)
+        online = CachingGeocoder(limited, GeocodeCache(cache_path))
+    if not gazetteer_path:
+        return online
+    return FallbackGeocoder(Gazetteer.load(gazetteer_path), online)
+
+
+def geocoder_from_env():
+    """``build_geocoder`` configured from the ``SHIPQUOTE_*`` environment variables."""
+    return build_geocoder(
+        cache_path=os.environ.get("SHIPQUOTE_GEOCODE_CACHE", DEFAULT_GEOCODE_CACHE),
+        gazetteer_path=os.environ.get("SHIPQUOTE_GAZETTEER"),
+        offline=os.environ.get("SHIPQUOTE_OFFLINE") == "1",
+        rate=float(os.environ.get("SHIPQUOTE_GEOCODE_RATE", NOMINATIM_RATE)),
+    )
+
+
+def get_default_geocoder():
+    global _default_geocoder
+    if _default_geocoder is None:
+        _default_geocoder = geocoder_from_env()
+    return _default_geocoder
+
+
+def set_default_geocoder(geocoder):
+    global _default_geocoder
+    _default_geocoder = geocoder
+
+
+# ================= QUOTING =================
+@timed("get_address_suggestions")
+def get_address_suggestions(query, geocoder=None):
+    if not query or len(query) < 3:
+        return []
+    geocoder = geocoder or get_default_geocoder()
+    try:
+        results = geocoder.geocode(query, exactly_one=False, limit=5, timeout=3, addressdetails=True)
+        return [r.address for r in results] if results else []
+    except:
+        swallowed("get_address_suggestions")
+        return []
+
+
+def suggest_packing_for_lots(selected_lots, catalog=DEMO_CATALOG, rates=DEFAULT_RATES):
+    """``(packing, note)``: the packing ``plan_packing`` puts most of the lots in, and the plan."""
+    lots = [lot for lot in selected_lots if catalog.get(lot)]
+    if not lots:
+        return "Automatic (AI)", "ℹ️ Select lots for packing suggestions"
+
+    plan = plan_packing(lots, rates=rates, catalog=catalog)
+    votes = {}
+    for container in plan.containers:
+        votes[container.packing] = votes.get(container.packing, 0) + len(container.lots)
+
+    overall = max(votes, key=votes.get)
+    return overall, f"💡 Recommended: {overall} (cheapest shared packing: {describe_plan(plan.containers)})"
+
+
+def distance_multiplier(km, rates=DEFAULT_RATES):
+    return tables(rates).distance_multiplier(km)
+
+
+def measure_distance(place, rates=DEFAULT_RATES, origin=None):
+    """``(km, multiplier)`` to an already geocoded place from ``origin``, by default the nearest depot."""
+    if origin is None:
+        _, km = get_default_depots().measure(place)
+    else:
+        from geopy.distance import geodesic
+
+        km = geodesic(origin, (place.latitude, place.longitude)).km
+    return round(km), distance_multiplier(km, rates)
+
+
+class AddressNotFound(LookupError):
+    pass
+
+
+def locate_address(address, geocoder=None):
+    """``Place`` for ``address``; raises AddressNotFound when the geocoder does not know it.
+
+    Geocoder errors - timeouts, ``RateLimitExceeded`` - propagate, so a
+    failed lookup is never priced as a zero distance.
+    """
+    geocoder = geocoder or get_default_geocoder()
+    try:
+        loc = geocoder.geocode(address, timeout=4)
+    except Exception as e:
+        count("geocode_errors", error=type(e).__name__)
+        raise
+    if not loc:
+        count("address_not_found")
+        raise AddressNotFound(f"address not found: {address}")
+    return Place(loc.address, loc.latitude, loc.longitude)
+
+
+@timed("get_distance_and_multiplier")
+def get_distance_and_multiplier(address, geocoder=None, rates=DEFAULT_RATES, origin=None):
+    return measure_distance(locate_address(address, geocoder), rates, origin)
+
+
+def price_quote(lots, packing, delivery, km, dist_mult, include_insurance=True,
+                rates=DEFAULT_RATES, catalog=DEMO_CATALOG, consolidate=False):
+    """Price ``lots`` for an already resolved distance; no network access.
+
+    With ``consolidate`` the lots share the containers ``plan_packing``
+    chooses - ``packing`` is ignored and each container is charged once, as
+    its own breakdown row - and the plan is returned as ``containers``.
+    ``prices`` holds the unrounded price of every breakdown row, in euros.
+    """
+    base = rates.base_rate
+    packing_cost = 0 if consolidate else rates.packing_cost[packing]
+    subtotal = 0
+    breakdown = []
+    prices = []
+    total_weight = 0
+
+    for lot in lots:
+        info = catalog[lot]
+
+        # Weight-based pricing component (€2 per kg)
+        weight_cost = info["weight_kg"] * rates.price_per_kg
+
+        # Calculate price with all factors
+        price = (
+            base
+            * rates.weight_mult[info["weight"]]
+            * rates.material_mult[info["material"]]
+            * dist_mult
+        )
+        price += weight_cost + rates.delivery_cost[delivery] + packing_cost
+
+        subtotal += price
+        total_weight += info["weight_kg"]
+        breakdown.append([f"Lot {lot}", info["weight"], info["material"], f"{info['weight_kg']} kg", f"{price:,.2f}"])
+        prices.append(price)
+
+    containers = None
+    if consolidate:
+        containers = plan_packing(lots, rates=rates, catalog=catalog).containers
+        subtotal, breakdown, prices = add_containers(subtotal, breakdown, prices, containers)
+
+    # Calculate insurance and VAT
+    insurance = subtotal * rates.insurance_rate if include_insurance else 0
+    subtotal_with_insurance = subtotal + insurance
+    vat = subtotal_with_insurance * rates.vat_rate
+    total = subtotal_with_insurance + vat
+
+    result = {
+        "subtotal": subtotal,
+        "insurance": insurance,
+        "vat": vat,
+        "total": total,
+        "breakdown": breakdown,
+        "prices": prices,
+        "km": km,
+        "total_weight": total_weight
+    }
+    if containers is not None:
+        result["containers"] = [c._asdict() for c in containers]
+    return result
+
+
+def add_containers(subtotal, breakdown, prices, containers):
+    """``subtotal``, ``breakdown`` and ``prices`` with one charge and row per shared container."""
+    breakdown = list(breakdown)
+    prices = list(prices)
+    for n, c in enumerate(containers, 1):
+        subtotal += c.cost
+        breakdown.append([f"Pack {n}", f"{len(c.lots)} lot{'s' if len(c.lots) > 1 else ''}", c.packing, f"{c.weight_kg} kg", f"{c.cost:,.2f}"])
+        prices.append(c.cost)
+    return subtotal, breakdown, prices
+
+
+@timed("calculate_shipping")
+def calculate_shipping(lots, packing, delivery, address, include_insurance=True,
+                       geocoder=None, rates=DEFAULT_RATES, catalog=DEMO_CATALOG, consolidate=False):
+    km, dist_mult = get_distance_and_multiplier(address, geocoder=geocoder, rates=rates)
+    return price_quote(lots, packing, delivery, km, dist_mult, include_insurance,
+                       rates=rates, catalog=catalog, consolidate=consolidate)
+
+
+def convert_result(result, currency, rates=DEFAULT_RATES):
+    """Subtotal, insurance, VAT and total of ``result`` in ``currency``."""
+    rate = rates.currency_rate[currency]
+    return {k: result[k] * rate for k in ("subtotal", "insurance", "vat", "total")}
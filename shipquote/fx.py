@@ -0,0 +1,195 @@
+"""Exchange rates from dated snapshots in a local file.
+
+An FX file is a CSV (or Parquet) table with ``date``, ``currency`` and
+``rate`` columns - units of the currency per euro on that date - and an
+optional ``symbol`` column::
+
+    date,currency,rate,symbol
+    2025-01-02,USD,1.035,$
+    2025-01-02,JPY,162.9,¥
+
+``FxTable`` holds every snapshot as one dense date x currency matrix; a
+currency missing from a snapshot keeps its previous rate.  Tables are cached
+in memory per file and reloaded when the file changes; a file that is
+missing or malformed mid-update leaves the last good table in use.  ``FxSnapshot`` is
+the set of rates in force on one date: ``as_rates`` plugs it into the rest
+of the engine, and ``convert``/``convert_batch`` turn one result or a whole
+frame of quotes into every requested currency in a single NumPy product.
+"""
+import csv
+import os
+import threading
+from datetime import date as Date
+
+import numpy as np
+
+from .config import CURRENCY_SYMBOL, DEFAULT_RATES
+from .metrics import swallowed
+
+AMOUNTS = ("subtotal", "insurance", "vat", "total")
+
+# Shown when the FX file has no symbol column; other currencies use their code
+SYMBOLS = {
+    **CURRENCY_SYMBOL, "CHF": "CHF ", "JPY": "¥", "CNY": "CN¥", "HKD": "HK$", "SGD": "S$",
+    "CAD": "CA$", "AUD": "A$", "INR": "₹", "KRW": "₩", "AED": "AED ",
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _read_rows(path):
+    path = str(path)
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+class FxSnapshot:
+    def __init__(self, date, currencies, rates, symbols):
+        self.date = date
+        self.currencies = list(currencies)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.symbols = dict(symbols)
+        self._index = {c: i for i, c in enumerate(self.currencies)}
+
+    @classmethod
+    def from_rates(cls, rates=DEFAULT_RATES, date=None):
+        """Snapshot of the currencies already in ``rates``."""
+        return cls(date, rates.currency_rate, list(rates.currency_rate.values()), rates.currency_symbol)
+
+    def rate(self, currency):
+        return float(self.rates[self._index[currency]])
+
+    def as_rates(self, rates=DEFAULT_RATES):
+        """``rates`` with this snapshot's currencies and symbols."""
+        return rates._replace(
+            currency_rate=dict(zip(self.currencies, self.rates.tolist())),
+            currency_symbol={c: self.symbols.get(c, SYMBOLS.get(c, f"{c} ")) for c in self.currencies},
+        )
+
+    def _select(self, currencies):
+        if currencies is None:
+            return self.currencies, self.rates
+        currencies = list(currencies)
+        return currencies, self.rates[[self._index[c] for c in currencies]]
+
+    def convert(self, result, currencies=None):
+        """``{currency: {"subtotal", "insurance", "vat", "total"}}`` for one result."""
+        currencies, rates = self._select(currencies)
+        amounts = np.array([result[k] for k in AMOUNTS], dtype=np.float64)
+        converted = np.multiply.outer(rates, amounts).tolist()
+        return {c: dict(zip(AMOUNTS, row)) for c, row in zip(currencies, converted)}
+
+    def convert_batch(self, quotes, currencies=None):
+        """Long frame of ``quotes`` (one row per quote) in every currency.
+
+        ``quotes`` is a DataFrame such as ``calculate_shipping_batch`` returns,
+        with ``quote_id`` as a column or the index; the output has
+        ``quote_id``, ``currency`` and the four amounts.
+        """
+        import pandas as pd
+
+        currencies, rates = self._select(currencies)
+        quote_ids = quotes["quote_id"] if "quote_id" in quotes.columns else quotes.index
+        amounts = quotes[list(AMOUNTS)].to_numpy(dtype=np.float64)
+        converted = (amounts[:, None, :] * rates[None, :, None]).reshape(-1, len(AMOUNTS))
+        frame = pd.DataFrame(converted, columns=list(AMOUNTS))
+        frame.insert(0, "currency", np.tile(np.asarray(currencies, dtype=object), len(quotes)))
+        frame.insert(0, "quote_id", np.repeat(quote_ids.to_numpy(), len(currencies)))
+        return frame
+
+
+class FxTable:
+    def __init__(self, dates, currencies, matrix, symbols=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.currencies = list(currencies)
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.symbols = dict(symbols or {})
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Table of ``date``/``currency``/``rate`` rows; raises ValueError/KeyError when malformed."""
+        rows = [{k.lower(): v for k, v in row.items()} for row in rows]
+        if not rows:
+            raise ValueError("no exchange rates")
+        dates = sorted({str(r["date"])[:10] for r in rows})
+        currencies = sorted({str(r["currency"]).upper() for r in rows} | {"EUR"})
+        date_index = {d: i for i, d in enumerate(dates)}
+        currency_index = {c: i for i, c in enumerate(currencies)}
+        matrix = np.full((len(dates), len(currencies)), np.nan)
+        matrix[:, currency_index["EUR"]] = 1.0
+        symbols = {}
+        for r in rows:
+            currency = str(r["currency"]).upper()
+            rate = float(r["rate"])
+            if not rate > 0:
+                raise ValueError(f"{currency} rate must be positive, got {r['rate']!r}")
+            matrix[date_index[str(r["date"])[:10]], currency_index[currency]] = rate
+            if r.get("symbol"):
+                symbols[currency] = r["symbol"]
+        # Carry each currency's last known rate forward into later snapshots
+        for i in range(1, len(dates)):
+            missing = np.isnan(matrix[i])
+            matrix[i, missing] = matrix[i - 1, missing]
+        return cls(dates, currencies, matrix, symbols)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_rows(_read_rows(path))
+
+    def snapshot(self, on=None):
+        """Rates in force on ``on`` (a date or ISO string; default today)."""
+        on = np.datetime64(on or Date.today(), "D")
+        row = int(np.searchsorted(self.dates, on, side="right")) - 1
+        if row < 0:
+            raise KeyError(f"no FX snapshot on or before {on}")
+        known = ~np.isnan(self.matrix[row])
+        currencies = [c for c, k in zip(self.currencies, known) if k]
+        return FxSnapshot(self.dates[row].item(), currencies, self.matrix[row, known], self.symbols)
+
+
+def load_fx(path):
+    """``FxTable`` for ``path``, cached until the file's mtime changes.
+
+    If a changed file does not parse, or the file is missing for a moment,
+    the last good table stays in use; raises only when there is none.
+    """
+    path = str(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        table = FxTable.load(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if cached is None:
+            raise
+        swallowed("load_fx")
+        if isinstance(e, OSError):
+            return cached[1]
+        table = cached[1]
+    with _cache_lock:
+        _cache[path] = (mtime, table)
+    return table
+
+
+def snapshot_from_env(rates=DEFAULT_RATES, on=None):
+    """Snapshot in force on ``on`` from ``SHIPQUOTE_FX_RATES``, else the one in ``rates``."""
+    path = os.environ.get("SHIPQUOTE_FX_RATES")
+    if not path:
+        return FxSnapshot.from_rates(rates)
+    return load_fx(path).snapshot(on)
+
+
+def fx_rates_from_env(rates=DEFAULT_RATES, on=None):
+    """``rates`` with the exchange rates from ``SHIPQUOTE_FX_RATES`` in force on ``on``, if set.
+
+    Apply it on top of ``ratecard.rates_from_env()`` to price the way the
+    CLI does with ``--rate-card`` and ``--fx-rates``.
+    """
+    return snapshot_from_env(rates, on).as_rates(rates)
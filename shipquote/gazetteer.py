@@ -0,0 +1,129 @@
+"""Offline geocoding from a local gazetteer file.
+
+A gazetteer is a CSV or Parquet table of places with at least ``name``,
+``latitude`` and ``longitude`` columns (``lat``/``lon``/``lng`` are accepted
+too).  Optional columns are ``address`` - the label shown to users, e.g.
+"Lyon, Auvergne-Rhône-Alpes, France" - and ``population``, used to rank
+places that share a name.
+
+``Gazetteer`` speaks the same ``geocode`` interface as geopy's geocoders, so
+it can replace Nominatim outright or sit in front of it through
+``FallbackGeocoder``.
+"""
+import csv
+from bisect import bisect_left
+
+from .geocoding import Place, normalize_address
+
+_COLUMN_ALIASES = {
+    "lat": "latitude",
+    "lon": "longitude",
+    "lng": "longitude",
+    "label": "address",
+}
+
+
+def _read_rows(path):
+    path = str(path)
+    if path.endswith(".parquet"):
+        import pandas as pd
+
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+class Gazetteer:
+    """In-memory place index with exact and prefix lookup on normalized names."""
+
+    def __init__(self, places, populations=None):
+        populations = populations or [0] * len(places)
+        self.places = list(places)
+        self._exact = {}
+        self._by_country = {}
+        keys = []
+        for idx, (place, population) in enumerate(zip(self.places, populations)):
+            label = normalize_address(place.address)
+            name = label.split(", ")[0]
+            for key in {name, label}:
+                best = self._exact.get(key)
+                if best is None or population > populations[best]:
+                    self._exact[key] = idx
+                keys.append((key, -population, idx))
+            if ", " in label:
+                key = (name, label.rsplit(", ", 1)[1])
+                best = self._by_country.get(key)
+                if best is None or population > populations[best]:
+                    self._by_country[key] = idx
+        keys.sort()
+        self._keys = [k for k, _, _ in keys]
+        self._key_rows = [idx for _, _, idx in keys]
+        self._populations = populations
+
+    @classmethod
+    def load(cls, path):
+        places, populations = [], []
+        for row in _read_rows(path):
+            row = {_COLUMN_ALIASES.get(k.lower(), k.lower()): v for k, v in row.items()}
+            name = str(row["name"]).strip()
+            places.append(Place(
+                str(row.get("address") or name).strip(),
+                float(row["latitude"]),
+                float(row["longitude"]),
+            ))
+            populations.append(int(float(row.get("population") or 0)))
+        return cls(places, populations)
+
+    def __len__(self):
+        return len(self.places)
+
+    def lookup(self, address):
+        """Place whose name or full label is ``address``, or None.
+
+        "Lyon, France" also finds Lyon's "Lyon, Auvergne-Rhône-Alpes, France":
+        a place name followed by its country, with any parts in between from
+        its label.  Anything more specific - a street, or another region
+        such as "Paris, Texas" - is not a place the gazetteer knows and
+        returns None, so ``FallbackGeocoder`` asks the online geocoder.
+        """
+        key = normalize_address(address)
+        idx = self._exact.get(key)
+        if idx is None and ", " in key:
+            parts = key.split(", ")
+            idx = self._by_country.get((parts[0], parts[-1]))
+            if idx is not None and not set(parts[1:-1]) <= set(normalize_address(self.places[idx].address).split(", ")):
+                idx = None
+        return self.places[idx] if idx is not None else None
+
+    def suggest(self, prefix, limit=5, scan=200):
+        """Places whose name or label starts with ``prefix``, most populous first."""
+        key = normalize_address(prefix)
+        if not key:
+            return []
+        start = bisect_left(self._keys, key)
+        seen = set()
+        for pos in range(start, min(start + scan, len(self._keys))):
+            if not self._keys[pos].startswith(key):
+                break
+            seen.add(self._key_rows[pos])
+        ranked = sorted(seen, key=lambda idx: -self._populations[idx])
+        return [self.places[idx] for idx in ranked[:limit]]
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        if exactly_one:
+            return self.lookup(query)
+        return self.suggest(query, limit=limit or 5) or None
+
+
+class FallbackGeocoder:
+    """Ask ``primary`` first and only fall back to ``fallback`` when it has no answer."""
+
+    def __init__(self, primary, fallback=None):
+        self.primary = primary
+        self.fallback = fallback
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        found = self.primary.geocode(query, exactly_one=exactly_one, limit=limit, **kwargs)
+        if found or self.fallback is None:
+            return found
+        return self.fallback.geocode(query, exactly_one=exactly_one, limit=limit, **kwargs)
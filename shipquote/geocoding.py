@@ -0,0 +1,160 @@
+"""Geocoding helpers shared by the quote engine.
+
+``GeocodeCache`` keeps geocoder answers in a SQLite file so that repeated
+lookups of the same address - across Streamlit reruns, sessions and worker
+processes - never reach Nominatim twice.  ``CachingGeocoder`` wraps any
+geopy-style geocoder with that cache.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+Place = namedtuple("Place", ["address", "latitude", "longitude"])
+
+DEFAULT_TTL = 30 * 24 * 3600  # 30 days for addresses that resolved
+DEFAULT_NEGATIVE_TTL = 24 * 3600  # 1 day for addresses the geocoder did not know
+DEFAULT_MAX_ENTRIES = 50_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used);
+"""
+
+
+def normalize_address(address):
+    """Canonical cache key for an address: case, unicode and spacing folded."""
+    text = unicodedata.normalize("NFKC", address or "").casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,")
+
+
+class GeocodeCache:
+    """SQLite-backed geocode cache with TTL, negative caching and LRU eviction.
+
+    ``get`` returns ``None`` when the key is unknown or expired, ``[]`` for a
+    cached miss and a list of ``Place`` otherwise.  ``clock`` (``time.time``
+    by default) dates entries and their expiry.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, evict_every=64, clock=time.time):
+        self.path = str(path)
+        self.clock = clock
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE geocode SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            places = [Place(*p) for p in json.loads(row[0])]
+            if places:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return places
+
+    def put(self, key, places):
+        now = self.clock()
+        ttl = self.ttl if places else self.negative_ttl
+        payload = json.dumps([[p.address, p.latitude, p.longitude] for p in places])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode (key, payload, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM geocode WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM geocode WHERE key IN ("
+            "SELECT key FROM geocode ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachingGeocoder:
+    """Geopy-compatible geocoder that consults a ``GeocodeCache`` first.
+
+    Only definitive answers are cached; exceptions from the wrapped geocoder
+    (timeouts, throttling) propagate and leave the cache untouched.
+    """
+
+    def __init__(self, geocoder, cache):
+        self.geocoder = geocoder
+        self.cache = cache
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        key = normalize_address(query)
+        if not exactly_one:
+            key = f"{key}|{limit}"
+        places = self.cache.get(key)
+        if places is None:
+            if exactly_one:
+                found = self.geocoder.geocode(query, exactly_one=True, **kwargs)
+                found = [found] if found else []
+            else:
+                found = self.geocoder.geocode(query, exactly_one=False, limit=limit, **kwargs) or []
+            places = [Place(r.address, r.latitude, r.longitude) for r in found]
+            self.cache.put(key, places)
+        if exactly_one:
+            return places[0] if places else None
+        return places or None
+
+
+class NullGeocoder:
+    """Geocoder that knows no address; stands in for Nominatim when running offline."""
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        return None
@@ -0,0 +1,176 @@
+"""Incremental quote recalculation for interactive editing.
+
+``calculate_shipping`` prices a quote from scratch.  ``IncrementalQuote``
+keeps the intermediate results of the previous quote and, on every
+``update``, recomputes only the stages whose inputs changed:
+
+* ``distance`` - depends on the address (the geocode)
+* ``lot_base`` - per lot: base rate x weight x material x distance multiplier;
+  depends on the lot and the distance multiplier
+* ``adders`` - per lot: weight cost + delivery + packing; depends on the lot,
+  packing and delivery
+* ``containers`` - the shared containers when consolidating; depends on the
+  set of lots
+* ``totals`` - lot prices, subtotal, insurance and VAT; depends on all of
+  the above and ``include_insurance``
+
+Toggling insurance therefore only re-runs ``totals``, changing delivery
+re-runs ``adders`` and ``totals``, and adding a lot prices just that lot.
+Results are identical to ``calculate_shipping``, float for float.  When the
+address cannot be located - unknown, or the geocoder failed or was
+throttled - ``update`` returns an error record instead of a price.
+``report()`` tells which stages the last update reused.
+"""
+from . import metrics
+from .catalog import DEMO_CATALOG
+from .config import DEFAULT_RATES
+from .engine import add_containers, locate_address, measure_distance
+from .packing import plan_packing
+
+STAGES = ("distance", "lot_base", "adders", "containers", "totals")
+
+
+class IncrementalQuote:
+    def __init__(self, geocoder=None, rates=DEFAULT_RATES, catalog=DEMO_CATALOG, locate=None):
+        self.rates = rates
+        self.catalog = catalog
+        self.locate = locate or (lambda address: locate_address(address, geocoder))
+        self._report = {}
+        self.invalidate()
+
+    def update(self, lots, packing, delivery, address, include_insurance=True, consolidate=False):
+        """Quote for these inputs, in the same shape as ``calculate_shipping``.
+
+        Returns ``{"error", "address"}`` instead when the address cannot be
+        located; the lookup is retried on the next update.
+        """
+        self._report = {stage: {"reused": 0, "computed": 0} for stage in STAGES}
+        rates = self.rates
+
+        if address == self._address:
+            self._mark("distance", reused=1)
+        else:
+            self._mark("distance", computed=1)
+            try:
+                place = self.locate(address)
+            except Exception as e:
+                self.place = self._address = self._distance = None
+                return {"error": f"{type(e).__name__}: {e}", "address": address}
+            self.place = place
+            self._distance = measure_distance(place, rates)
+            self._address = address
+        km, dist_mult = self._distance
+
+        lot_base = {}
+        adders = {}
+        for lot in lots:
+            cached = self._lot_base.get(lot)
+            if cached is not None and cached[0] == dist_mult:
+                lot_base[lot] = cached
+                self._mark("lot_base", reused=1)
+            else:
+                info = self.catalog[lot]
+                base = (
+                    rates.base_rate
+                    * rates.weight_mult[info["weight"]]
+                    * rates.material_mult[info["material"]]
+                    * dist_mult
+                )
+                lot_base[lot] = (dist_mult, base, info)
+                self._mark("lot_base", computed=1)
+
+            cached = self._adders.get(lot)
+            if cached is not None and cached[0] == (packing, delivery, consolidate):
+                adders[lot] = cached
+                self._mark("adders", reused=1)
+            else:
+                info = lot_base[lot][2]
+                weight_cost = info["weight_kg"] * rates.price_per_kg
+                packing_cost = 0 if consolidate else rates.packing_cost[packing]
+                adder = weight_cost + rates.delivery_cost[delivery] + packing_cost
+                adders[lot] = ((packing, delivery, consolidate), adder)
+                self._mark("adders", computed=1)
+        self._lot_base = lot_base
+        self._adders = adders
+
+        containers = None
+        if consolidate:
+            if self._containers is not None and self._containers[0] == tuple(lots):
+                self._mark("containers", reused=1)
+            else:
+                plan = plan_packing(lots, rates=rates, catalog=self.catalog)
+                self._containers = (tuple(lots), plan.containers)
+                self._mark("containers", computed=1)
+            containers = self._containers[1]
+
+        totals_key = (tuple(lots), km, dist_mult, packing, delivery, include_insurance, consolidate)
+        if totals_key == self._totals_key:
+            self._mark("totals", reused=1)
+            return self._result
+        self._result = self._totals(lots, km, include_insurance, containers)
+        self._totals_key = totals_key
+        self._mark("totals", computed=1)
+        return self._result
+
+    def report(self):
+        """``{stage: {"reused": n, "computed": m}}`` for the last ``update``."""
+        return {stage: dict(counts) for stage, counts in self._report.items()}
+
+    def reused(self):
+        """Stages the last ``update`` did not recompute at all."""
+        return [stage for stage, counts in self._report.items() if counts["reused"] and not counts["computed"]]
+
+    def invalidate(self):
+        """Forget every intermediate, e.g. after changing ``rates`` or ``catalog``."""
+        self.place = None
+        self._address = None
+        self._distance = None
+        self._lot_base = {}
+        self._adders = {}
+        self._containers = None
+        self._totals_key = None
+        self._result = None
+
+    def _mark(self, stage, reused=0, computed=0):
+        self._report[stage]["reused"] += reused
+        self._report[stage]["computed"] += computed
+        if metrics.REGISTRY.enabled:
+            metrics.count("incremental_stage", reused + computed, stage=stage,
+                          outcome="reused" if reused else "computed")
+
+    def _totals(self, lots, km, include_insurance, containers=None):
+        # Same operations in the same order as price_quote
+        rates = self.rates
+        subtotal = 0
+        breakdown = []
+        prices = []
+        total_weight = 0
+        for lot in lots:
+            _, base, info = self._lot_base[lot]
+            price = base
+            price += self._adders[lot][1]
+            subtotal += price
+            total_weight += info["weight_kg"]
+            breakdown.append([f"Lot {lot}", info["weight"], info["material"], f"{info['weight_kg']} kg", f"{price:,.2f}"])
+            prices.append(price)
+        if containers is not None:
+            subtotal, breakdown, prices = add_containers(subtotal, breakdown, prices, containers)
+
+        insurance = subtotal * rates.insurance_rate if include_insurance else 0
+        subtotal_with_insurance = subtotal + insurance
+        vat = subtotal_with_insurance * rates.vat_rate
+        total = subtotal_with_insurance + vat
+
+        result = {
+            "subtotal": subtotal,
+            "insurance": insurance,
+            "vat": vat,
+            "total": total,
+            "breakdown": breakdown,
+            "prices": prices,
+            "km": km,
+            "total_weight": total_weight
+        }
+        if containers is not None:
+            result["containers"] = [c._asdict() for c in containers]
+        return result
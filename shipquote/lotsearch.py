@@ -0,0 +1,89 @@
+"""Search-as-you-type index over a lot catalog.
+
+``LotIndex`` tokenizes the lot number, title, artist and material of every
+lot into an inverted index.  Each query word is matched as a prefix against
+the sorted token list, so "bas 86" finds lot 86 by J. Basquiat, and the
+postings of all words are intersected.  Results are lot numbers, so the UI
+keeps selections by ID instead of parsing display strings.
+"""
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from .catalog import as_catalog
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _WORD.findall(str(text).casefold())
+
+
+class LotIndex:
+    def __init__(self, catalog):
+        self.catalog = as_catalog(catalog)
+        records = self.catalog.records
+        self.lots = np.asarray(records["lot"])
+        postings = {}
+
+        def add(token, row):
+            postings.setdefault(token, []).append(row)
+
+        materials = [tokenize(m) for m in self.catalog.materials]
+        material_codes = np.asarray(records["material"]).tolist()
+        titles = np.asarray(records["title"]).tolist()
+        artists = np.asarray(records["artist"]).tolist()
+        for row, lot in enumerate(self.lots.tolist()):
+            add(str(lot), row)
+            words = tokenize(titles[row].decode("utf-8", "ignore"))
+            words += tokenize(artists[row].decode("utf-8", "ignore"))
+            words += materials[material_codes[row]]
+            for word in set(words):
+                add(word, row)
+
+        # Postings in CSR layout: tokens sharing a prefix are adjacent in the
+        # sorted token list, so their rows are one contiguous slice
+        self.tokens = sorted(postings)
+        sizes = np.fromiter((len(postings[t]) for t in self.tokens), dtype=np.int64, count=len(self.tokens))
+        self._offsets = np.concatenate(([0], np.cumsum(sizes)))
+        self._rows = np.fromiter((r for t in self.tokens for r in postings[t]), dtype=np.int64,
+                                 count=int(self._offsets[-1]))
+
+    def _rows_for_prefix(self, prefix):
+        start = bisect_left(self.tokens, prefix)
+        stop = bisect_left(self.tokens, prefix + "\U0010ffff", lo=start)
+        if stop == start:
+            return np.empty(0, dtype=np.int64)
+        rows = self._rows[self._offsets[start]:self._offsets[stop]]
+        if stop == start + 1:
+            return rows
+        mask = np.zeros(len(self.lots), dtype=bool)
+        mask[rows] = True
+        return np.flatnonzero(mask)
+
+    def search(self, query, limit=20):
+        """Up to ``limit`` lot numbers matching every word of ``query``."""
+        words = tokenize(query)
+        if not words:
+            return self.lots[:limit].tolist()
+        rows = None
+        for word in sorted(set(words), key=len, reverse=True):
+            matched = self._rows_for_prefix(word)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            if not len(rows):
+                return []
+        # Rows come back in catalog order; only lots whose number was typed
+        # in full are moved to the front
+        exact = []
+        for word in words:
+            row = self.catalog.position(int(word)) if word.isdigit() else -1
+            at = np.searchsorted(rows, row)
+            if row >= 0 and at < len(rows) and rows[at] == row and row not in exact:
+                exact.append(row)
+        rest = [r for r in rows[:limit + len(exact)].tolist() if r not in exact]
+        return self.lots[(exact + rest)[:limit]].tolist()
+
+    def label(self, lot):
+        info = self.catalog[lot]
+        return f"Lot {lot} - {info['title']} ({info['artist']})"
@@ -0,0 +1,270 @@
+"""Latency histograms and counters for the quote hot path.
+
+Recording is off unless ``SHIPQUOTE_METRICS=1`` is set or ``enable()`` is
+called; while off, a ``timed`` function costs one attribute check per call
+and ``count``/``gauge``/``observe`` return immediately.
+
+    @timed("calculate_shipping")
+    def calculate_shipping(...): ...
+
+    with span("streamlit_rerun"):
+        ...
+
+``snapshot()`` returns everything recorded so far as a JSON-ready dict and
+``prometheus_text()`` renders it in the Prometheus text exposition format.
+``serve(port)`` exposes both over HTTP (``/metrics`` and ``/metrics.json``)
+for processes without their own endpoint, such as the Streamlit app.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+PREFIX = "shipquote_"
+
+# Histogram upper bounds in seconds, from sub-millisecond pricing to slow geocodes
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_NOOP = nullcontext()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None past the last bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+
+class Registry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, n=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {k: (list(h.counts), h.sum, h.count, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99))
+                          for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return {
+            "enabled": self.enabled,
+            "timings": [
+                {"name": name, "labels": dict(labels), "count": count, "sum_s": total,
+                 "mean_ms": total / count * 1000 if count else 0.0,
+                 "p50_le_s": p50, "p95_le_s": p95, "p99_le_s": p99,
+                 "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], counts))}
+                for (name, labels), (counts, total, count, p50, p95, p99) in sorted(histograms.items())
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "gauges": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(gauges.items())
+            ],
+        }
+
+    def prometheus_text(self):
+        with self._lock:
+            histograms = sorted((k, list(h.counts), h.sum, h.count) for k, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+        lines = []
+        last = None
+        for (name, labels), counts, total, count in histograms:
+            metric = f"{PREFIX}{name}_seconds"
+            if metric != last:
+                lines.append(f"# TYPE {metric} histogram")
+                last = metric
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}{name}_total"
+            if metric != last:
+                lines.append(f"# TYPE {metric} counter")
+                last = metric
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            metric = f"{PREFIX}{name}"
+            if metric != last:
+                lines.append(f"# TYPE {metric} gauge")
+                last = metric
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+REGISTRY = Registry(enabled=os.environ.get("SHIPQUOTE_METRICS") == "1")
+
+
+def enable(enabled=True):
+    REGISTRY.enabled = enabled
+
+
+def observe(name, seconds, **labels):
+    REGISTRY.observe(name, seconds, **labels)
+
+
+def count(name, n=1, **labels):
+    REGISTRY.count(name, n, **labels)
+
+
+def gauge(name, value, **labels):
+    REGISTRY.gauge(name, value, **labels)
+
+
+def span(name, **labels):
+    """Context manager timing its block into the ``name`` histogram."""
+    if not REGISTRY.enabled:
+        return _NOOP
+    return _Span(REGISTRY, name, labels)
+
+
+def timed(name):
+    """Decorator timing every call into the ``name`` histogram."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def swallowed(where):
+    """Count the exception being handled by a catch-all ``except`` in ``where``."""
+    if REGISTRY.enabled:
+        error = sys.exc_info()[0]
+        REGISTRY.count("swallowed_errors", where=where, error=error.__name__ if error else "unknown")
+
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+
+def prometheus_text():
+    return REGISTRY.prometheus_text()
+
+
+def _do_get(handler):
+    path = handler.path.split("?", 1)[0].rstrip("/")
+    if path == "/metrics":
+        body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+    elif path == "/metrics.json":
+        body, content_type = json.dumps(snapshot()).encode(), "application/json"
+    else:
+        handler.send_error(404)
+        return
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def serve(port, host="0.0.0.0"):
+    """Serve ``/metrics`` and ``/metrics.json`` from a daemon thread; returns the server."""
+    # http.server is only imported by processes that actually serve metrics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        do_GET = _do_get
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="shipquote-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,235 @@
+"""Crate consolidation: pack a consignment's lots into shared containers.
+
+``price_quote`` normally charges the packing cost once per lot.  With
+``consolidate=True`` it asks ``plan_packing`` for the cheapest set of
+containers the lots can share instead, and charges once per container.
+
+Lots are grouped by material class (``rigid`` glass and metal, ``flat``
+photographs, ``canvas`` everything else) and never share a container with
+another class.  Each class is then a bin packing problem over the
+containers in ``config.CONTAINERS`` that may hold it, each with its own
+weight limit, lot limit and cost (``rates.packing_cost``):
+
+* Groups of up to ``EXACT_MAX_LOTS`` lots are solved exactly by dynamic
+  programming over subsets.
+* Larger groups are packed first-fit decreasing into each container size in
+  turn, then improved by emptying containers into the others' spare room
+  while the time budget lasts.
+
+The heuristic always runs first; the exact solver only runs when a simple
+lower bound cannot prove the heuristic's plan optimal, so a plan is always
+returned within about ``time_limit`` seconds.  Lots no container can hold -
+too heavy, or of a class no container takes - ship alone in
+``OVERSIZE_PACKING``.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from . import metrics
+from .catalog import DEMO_CATALOG
+from .config import CONTAINERS, DEFAULT_RATES, OVERSIZE_PACKING
+from .metrics import timed
+
+EXACT_MAX_LOTS = 10
+PLAN_TIME_LIMIT = 0.05  # seconds
+_EPS = 1e-9
+
+# First matching keyword decides the class; anything else is "canvas"
+MATERIAL_CLASSES = (("rigid", ("glass", "metal", "steel")), ("flat", ("photo",)))
+
+Container = namedtuple("Container", ["packing", "lots", "weight_kg", "cost"])
+PackingPlan = namedtuple("PackingPlan", ["containers", "cost", "exact"])
+
+
+def material_class(material):
+    material = material.lower()
+    for name, keywords in MATERIAL_CLASSES:
+        if any(k in material for k in keywords):
+            return name
+    return "canvas"
+
+
+def _options(klass, containers, rates):
+    """``(cost, max kg, max lots, packing)`` for containers that may hold ``klass``, cheapest first."""
+    return sorted(
+        (rates.packing_cost[packing], capacity, max_lots, packing)
+        for packing, (capacity, max_lots, classes) in containers.items()
+        if klass in classes and packing in rates.packing_cost
+    )
+
+
+def _cheapest(options, load, count):
+    for cost, capacity, max_lots, packing in options:
+        if load <= capacity + _EPS and count <= max_lots:
+            return cost, packing
+    return None
+
+
+def _first_fit(weights, order, capacity, max_lots):
+    bins = []  # [load, items]
+    for i in order:
+        w = weights[i]
+        for b in bins:
+            if b[0] + w <= capacity + _EPS and len(b[1]) < max_lots:
+                b[0] += w
+                b[1].append(i)
+                break
+        else:
+            bins.append([w, [i]])
+    return bins
+
+
+def _improve(bins, weights, options, deadline):
+    """Empty containers into the spare room of the others while that saves money."""
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        bins.sort(key=lambda b: b[0])
+        for k, victim in enumerate(bins):
+            if time.perf_counter() >= deadline:
+                break
+            others = bins[:k] + bins[k + 1:]
+            loads = [[b[0], len(b[1]), _cheapest(options, b[0], len(b[1]))[0]] for b in others]
+            moves = []
+            extra = 0
+            for i in sorted(victim[1], key=lambda i: -weights[i]):
+                best = None
+                for j, (load, count, cost) in enumerate(loads):
+                    fit = _cheapest(options, load + weights[i], count + 1)
+                    if fit is not None and (best is None or fit[0] - cost < best[1]):
+                        best = (j, fit[0] - cost, fit[0])
+                if best is None:
+                    break
+                j, delta, cost = best
+                loads[j] = [loads[j][0] + weights[i], loads[j][1] + 1, cost]
+                moves.append((i, j))
+                extra += delta
+            else:
+                if extra < _cheapest(options, victim[0], len(victim[1]))[0] - _EPS:
+                    for i, j in moves:
+                        others[j][0] += weights[i]
+                        others[j][1].append(i)
+                    bins[:] = others
+                    improved = True
+                    break
+    return bins
+
+
+def _heuristic(weights, options, deadline):
+    order = sorted(range(len(weights)), key=lambda i: -weights[i])
+    best = None
+    for _, capacity, max_lots, _ in options:
+        bins = _improve(_first_fit(weights, order, capacity, max_lots), weights, options, deadline)
+        cost = sum(_cheapest(options, load, len(items))[0] for load, items in bins)
+        if best is None or cost < best[0] - _EPS:
+            best = (cost, [items for _, items in bins])
+    return best
+
+
+def _exact(weights, options, deadline):
+    """Optimal ``(cost, groups)`` by DP over subsets, or None when out of time."""
+    n = len(weights)
+    size = 1 << n
+    load = np.zeros(size)
+    count = np.zeros(size, dtype=np.int64)
+    for i, w in enumerate(weights):
+        load[1 << i:2 << i] = load[:1 << i] + w
+        count[1 << i:2 << i] = count[:1 << i] + 1
+    # Cheapest single container for every subset, inf when none holds it
+    fits = np.full(size, np.inf)
+    for cost, capacity, max_lots, _ in reversed(options):
+        fits[(load <= capacity + _EPS) & (count <= max_lots)] = cost
+    feasible = np.flatnonzero(np.isfinite(fits))[1:]
+    feasible_cost = fits[feasible]
+
+    best = np.full(size, np.inf)
+    best[0] = 0
+    split = np.zeros(size, dtype=np.int64)
+    for mask in range(1, size):
+        if time.perf_counter() >= deadline:
+            return None
+        low = mask & -mask
+        # Containers holding the lowest remaining lot and nothing outside ``mask``
+        ok = ((feasible & ~mask) == 0) & ((feasible & low) != 0)
+        subs = feasible[ok]
+        totals = feasible_cost[ok] + best[mask ^ subs]
+        j = int(np.argmin(totals))
+        best[mask] = totals[j]
+        split[mask] = subs[j]
+
+    groups = []
+    mask = size - 1
+    while mask:
+        sub = int(split[mask])
+        groups.append([i for i in range(n) if sub >> i & 1])
+        mask ^= sub
+    return float(best[size - 1]), groups
+
+
+def _lower_bound(weights, options):
+    return max(
+        sum(weights) * min(cost / capacity for cost, capacity, _, _ in options),
+        len(weights) * min(cost / max_lots for cost, _, max_lots, _ in options),
+    )
+
+
+@timed("plan_packing")
+def plan_packing(lots, rates=DEFAULT_RATES, catalog=DEMO_CATALOG, containers=CONTAINERS,
+                 time_limit=PLAN_TIME_LIMIT):
+    """Cheapest ``PackingPlan`` for ``lots`` found within about ``time_limit`` seconds.
+
+    ``exact`` is True when every material class was solved (or bounded) to
+    optimality rather than left to the heuristic.
+    """
+    deadline = time.perf_counter() + time_limit
+    infos = [catalog[lot] for lot in lots]
+    groups = {}
+    for position, info in enumerate(infos):
+        groups.setdefault(material_class(info["material"]), []).append(position)
+
+    packed = []  # (packing, cost, positions)
+    exact = True
+    for klass, positions in groups.items():
+        options = _options(klass, containers, rates)
+        largest = max((capacity for _, capacity, _, _ in options), default=0)
+        fitting = []
+        for p in positions:
+            # Without any container for the class, even a 0 kg lot ships alone
+            if not options or infos[p]["weight_kg"] > largest + _EPS:
+                packed.append((OVERSIZE_PACKING, rates.packing_cost[OVERSIZE_PACKING], [p]))
+            else:
+                fitting.append(p)
+        if not fitting:
+            continue
+        weights = [float(infos[p]["weight_kg"]) for p in fitting]
+        cost, solution = _heuristic(weights, options, deadline)
+        solved = cost <= _lower_bound(weights, options) + _EPS
+        if not solved and len(fitting) <= EXACT_MAX_LOTS:
+            found = _exact(weights, options, deadline)
+            if found is not None:
+                cost, solution = found
+                solved = True
+        exact = exact and solved
+        for items in solution:
+            load = sum(weights[i] for i in items)
+            cost, packing = _cheapest(options, load, len(items))
+            packed.append((packing, cost, sorted(fitting[i] for i in items)))
+
+    packed.sort(key=lambda c: c[2][0])
+    plan = [
+        Container(packing, [lots[p] for p in positions], sum(infos[p]["weight_kg"] for p in positions), cost)
+        for packing, cost, positions in packed
+    ]
+    metrics.count("packing_plans", solver="exact" if exact else "heuristic")
+    return PackingPlan(plan, sum(c.cost for c in plan), exact)
+
+
+def describe_plan(containers):
+    """``"2 × Wood crate, 1 × Cardboard box"`` for a plan's containers."""
+    counts = {}
+    for c in containers:
+        packing = c.packing if isinstance(c, Container) else c["packing"]
+        counts[packing] = counts.get(packing, 0) + 1
+    return ", ".join(f"{n} × {packing}" for packing, n in counts.items())
@@ -0,0 +1,287 @@
+"""Branded PDF rendering for quotes.
+
+Everything that is identical between quotes - the style sheet, the parsed
+header/heading/footer paragraphs and the table styles - lives in a
+``QuoteTemplate`` that is built once per process.  Rendering a quote only
+creates the per-quote paragraphs and tables.
+
+reportlab is imported on the first PDF rather than with this module, so
+processes that never render one do not pay for it at startup.
+
+Breakdowns longer than ``LONG_TABLE_ROWS`` rows use a large-document
+layout: the summary stays on the first page and the breakdown follows,
+``ROWS_PER_PAGE`` fixed-height rows per page, each page its own ``LongTable``
+with the column headers, a page subtotal and the running total.  Like the
+line prices these are in euros, summed from the result's unrounded
+``prices`` in pricing order, so the last running total is the quote's
+subtotal; for other currencies it is also given as the summary shows it.  Pages are
+created only as the layout reaches them and never have to be split, so
+render time grows linearly with the row count and only one page of layout
+is held at a time (reportlab keeps the finished page streams until it
+writes the file).  ``output`` renders straight to a file or stream.
+
+``cached_branded_pdf`` serves PDFs that were rendered before from the
+content-addressed ``shipquote.pdfcache``; ``render_quote_pdf`` goes through
+it whenever it returns bytes.
+"""
+import copy
+import itertools
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from .config import DAYS_LEFT, DEFAULT_RATES
+from .engine import convert_result
+from .metrics import timed
+from .packing import describe_plan
+from .pdfcache import get_default_pdf_cache, pdf_key
+
+HEADER_MARKUP = "<font size=22><b>ShipQuote Pro</b></font><br/><font size=10 color='grey'>Fine Art & High-Value Logistics</font>"
+FOOTER_MARKUP = "<font size=8 color='grey'>Demo quote generated by ShipQuote Pro. Non-binding and indicative.</font>"
+BREAKDOWN_HEADER = ["Lot", "Weight", "Material", "Weight (kg)", "Price (€)"]
+BREAKDOWN_WIDTHS = [2.5, 2.5, 3.5, 2.5, 2.5]  # cm
+
+LONG_TABLE_ROWS = 150
+ROWS_PER_PAGE = 40
+ROW_HEIGHT = 15  # points; header and subtotal rows included, 43 rows fill an A4 frame
+
+
+class _FlowableQueue(list):
+    """``doc.build`` input that creates flowables only as the layout reaches them.
+
+    ``build`` consumes its list from the front, so topping it up whenever
+    it is read keeps just the next couple of flowables alive.
+    """
+
+    _END = object()
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._pending = iter(flowables)
+
+    def _fill(self):
+        while list.__len__(self) < 2:
+            flowable = next(self._pending, self._END)
+            if flowable is self._END:
+                return
+            self.append(flowable)
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+class QuoteTemplate:
+    """Static styles and flowables of the quote PDF."""
+
+    def __init__(self):
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, TableStyle
+
+        styles = getSampleStyleSheet()
+        self.normal = styles["Normal"]
+        self.heading = styles["Heading2"]
+        self.header = Paragraph(HEADER_MARKUP, self.normal)
+        self.details_heading = Paragraph("<b>Shipment Details</b>", self.heading)
+        self.breakdown_heading = Paragraph("<b>Itemized Breakdown</b>", self.heading)
+        self.footer = Paragraph(FOOTER_MARKUP, self.normal)
+        self.meta_style = TableStyle([
+            ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
+            ("FONT", (0,0), (0,-1), "Helvetica-Bold"),
+            ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
+            ("BOTTOMPADDING", (0,0), (-1,-1), 8),
+            ("TOPPADDING", (0,0), (-1,-1), 8),
+        ])
+        self.breakdown_style = TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.black),
+            ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
+            ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, None]),
+            ("ALIGN", (3,1), (-1,-1), "RIGHT"),
+            ("FONT", (0,0), (-1,0), "Helvetica-Bold"),
+            ("BOTTOMPADDING", (0,0), (-1,-1), 8),
+            ("TOPPADDING", (0,0), (-1,-1), 8),
+        ])
+        self.long_breakdown_style = TableStyle([
+            ("BACKGROUND", (0,0), (-1,0), colors.black),
+            ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
+            ("ROWBACKGROUNDS", (0,1), (-1,-3), [colors.whitesmoke, None]),
+            ("ALIGN", (3,1), (-1,-1), "RIGHT"),
+            ("FONT", (0,0), (-1,0), "Helvetica-Bold"),
+            ("FONTSIZE", (0,0), (-1,-1), 9),
+            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+            ("BOTTOMPADDING", (0,0), (-1,-1), 2),
+            ("TOPPADDING", (0,0), (-1,-1), 2),
+            ("FONT", (0,-2), (-1,-1), "Helvetica-Bold"),
+            ("LINEABOVE", (0,-2), (-1,-2), 1.5, colors.black),
+        ])
+        self.summary_style = TableStyle([
+            ("ALIGN", (1,0), (1,-1), "RIGHT"),
+            ("FONT", (0,-1), (-1,-1), "Helvetica-Bold"),
+            ("FONTSIZE", (0,-1), (-1,-1), 14),
+            ("TOPPADDING", (0,-1), (-1,-1), 12),
+            ("LINEABOVE", (0,-1), (-1,-1), 2, colors.black),
+        ])
+
+    def static(self, flowable):
+        # Layout state is stored on the flowable during a build, so every
+        # document gets its own shallow copy sharing the parsed fragments
+        return copy.copy(flowable)
+
+    def elements(self, quote_id, client, address, packing, delivery, breakdown, result, currency,
+                 rates=DEFAULT_RATES, issued=None):
+        from reportlab.lib.units import cm
+        from reportlab.platypus import Paragraph, Spacer, Table
+
+        now = issued or datetime.now()
+        elements = []
+
+        # Header
+        elements.append(self.static(self.header))
+        elements.append(Spacer(1, 16))
+
+        # Quote metadata table
+        meta = Table([
+            ["Quote ID", quote_id],
+            ["Client", client or "—"],
+            ["Issued", now.strftime("%d %b %Y")],
+            ["Valid Until", (now + timedelta(days=DAYS_LEFT)).strftime("%d %b %Y")],
+        ], colWidths=[4*cm, 10*cm])
+        meta.setStyle(self.meta_style)
+        elements.append(meta)
+        elements.append(Spacer(1, 20))
+
+        # Shipment details
+        elements.append(self.static(self.details_heading))
+        elements.append(Paragraph(f"<b>Delivery:</b><br/>{address}", self.normal))
+        elements.append(Spacer(1, 8))
+        elements.append(Paragraph(f"<b>Packing:</b> {packing}", self.normal))
+        elements.append(Spacer(1, 8))
+        elements.append(Paragraph(f"<b>Delivery Type:</b> {delivery}", self.normal))
+        elements.append(Spacer(1, 16))
+
+        # Breakdown table; long ones get their own pages after the summary
+        long = len(breakdown) > LONG_TABLE_ROWS
+        if not long:
+            table = Table([BREAKDOWN_HEADER] + breakdown, colWidths=[w*cm for w in BREAKDOWN_WIDTHS])
+            table.setStyle(self.breakdown_style)
+            elements.append(table)
+            elements.append(Spacer(1, 18))
+
+        # Cost summary
+        converted = convert_result(result, currency, rates)
+        symbol = rates.currency_symbol[currency]
+        summary = Table([
+            ["Subtotal", f"{symbol}{converted['subtotal']:,.2f}"],
+            [f"Insurance ({rates.insurance_rate * 100:g}%)", f"{symbol}{converted['insurance']:,.2f}"],
+            [f"VAT ({rates.vat_rate * 100:g}%)", f"{symbol}{converted['vat']:,.2f}"],
+            ["<b>Total Quote</b>", f"<b>{symbol}{converted['total']:,.2f}</b>"],
+        ], colWidths=[10*cm, 4*cm])
+        summary.setStyle(self.summary_style)
+        elements.append(summary)
+        elements.append(Spacer(1, 12))
+
+        # Footer
+        elements.append(self.static(self.footer))
+        if long:
+            pages = self.breakdown_pages(breakdown, result.get("prices"), currency, rates)
+            return _FlowableQueue(itertools.chain(elements, pages))
+        return elements
+
+    def breakdown_pages(self, breakdown, prices=None, currency="EUR", rates=DEFAULT_RATES):
+        """Flowables of the large-document breakdown, one page at a time."""
+        from reportlab.lib.units import cm
+        from reportlab.platypus import LongTable, PageBreak
+
+        if prices is None or len(prices) != len(breakdown):
+            # Results stored before they carried their unrounded prices
+            prices = [float(row[4].replace(",", "")) for row in breakdown]
+        running = 0
+        for start in range(0, len(breakdown), ROWS_PER_PAGE):
+            rows = breakdown[start:start + ROWS_PER_PAGE]
+            page = 0
+            for price in prices[start:start + ROWS_PER_PAGE]:
+                page += price
+                running += price
+            last = start + ROWS_PER_PAGE >= len(breakdown)
+            label = "Subtotal" if last else "Running total"
+            if last and currency != "EUR":
+                # The same product convert_result gives the summary
+                label += f" = {rates.currency_symbol[currency]}{running * rates.currency_rate[currency]:,.2f}"
+            yield PageBreak()
+            if not start:
+                yield self.static(self.breakdown_heading)
+            table = LongTable(
+                [BREAKDOWN_HEADER, *rows,
+                 [f"Page subtotal ({start + 1}–{start + len(rows)})", "", "", "", f"€{page:,.2f}"],
+                 [label, "", "", "", f"€{running:,.2f}"]],
+                colWidths=[w*cm for w in BREAKDOWN_WIDTHS], rowHeights=ROW_HEIGHT, repeatRows=1,
+            )
+            table.setStyle(self.long_breakdown_style)
+            yield table
+
+
+_template = None
+
+
+def get_template():
+    global _template
+    if _template is None:
+        _template = QuoteTemplate()
+    return _template
+
+
+@timed("generate_branded_pdf")
+def generate_branded_pdf(quote_id, client, address, packing, delivery, breakdown, result, currency,
+                         rates=DEFAULT_RATES, template=None, issued=None, output=None):
+    """Quote PDF written to ``output`` (a path or binary file), which is returned.
+
+    Without ``output`` the PDF is returned as a ``BytesIO``.  ``issued`` (a
+    datetime) defaults to now.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate
+
+    template = template or get_template()
+    buffer = BytesIO() if output is None else output
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=2*cm, rightMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+    doc.build(template.elements(quote_id, client, address, packing, delivery, breakdown, result, currency,
+                                rates, issued))
+    if output is None:
+        buffer.seek(0)
+    return buffer
+
+
+def cached_branded_pdf(quote_id, client, address, packing, delivery, breakdown, result, currency,
+                       rates=DEFAULT_RATES, issued=None, cache=None):
+    """``generate_branded_pdf`` as bytes, from ``cache`` (default: the process cache) when rendered before."""
+    issued = issued or datetime.now()
+    if cache is None:
+        cache = get_default_pdf_cache()
+    key = pdf_key(quote_id, client, address, packing, delivery, breakdown, result, currency, rates, issued)
+    return cache.get_or_render(key, lambda: generate_branded_pdf(
+        quote_id, client, address, packing, delivery, breakdown, result, currency,
+        rates=rates, issued=issued,
+    ).getvalue())
+
+
+def render_quote_pdf(consignment, result, rates=DEFAULT_RATES, issued=None, output=None, cached=True):
+    """PDF bytes for a normalized consignment; picklable, for worker pools.
+
+    With ``output`` (a path or binary file) the PDF is rendered there instead
+    of through the PDF cache, and None is returned.  ``cached=False`` renders
+    without reading or filling the PDF cache, for one-off bulk runs.
+    """
+    packing = describe_plan(result["containers"]) if result.get("containers") else consignment["packing"]
+    args = (consignment["quote_id"], consignment["client"], consignment["address"], packing,
+            consignment["delivery"], result["breakdown"], result, consignment["currency"])
+    if output is None and cached:
+        return cached_branded_pdf(*args, rates=rates, issued=issued)
+    pdf = generate_branded_pdf(*args, rates=rates, issued=issued, output=output)
+    return None if output is not None else pdf.getvalue()
@@ -0,0 +1,201 @@
+"""Content-addressed cache of rendered quote PDFs.
+
+A quote PDF only depends on what is printed on it, so ``pdf_key`` hashes
+exactly that - quote ID, client, address, packing, delivery, breakdown
+rows, the amounts and rate labels as printed, and the issue date - into a
+sha256 key.  Clicking "Generate PDF Quote" again, re-issuing a stored quote
+or rendering the same quote in another worker then finds the PDF already
+rendered.
+
+``PdfCache`` keeps the most recently used PDFs in memory up to
+``max_bytes``.  With a ``directory`` it also keeps them there as
+``<key>.pdf`` files that every process pointed at the directory shares;
+files are written atomically and the directory is trimmed back to
+``max_disk_bytes``, least recently used first.  Lookups are counted as
+``pdf_cache`` with ``result`` (hit/miss) and ``layer`` labels, and the
+cache's hit rate so far is the ``pdf_cache_hit_rate`` gauge.
+
+The process cache is configured by ``SHIPQUOTE_PDF_CACHE_MB`` (memory,
+default 64) and ``SHIPQUOTE_PDF_CACHE_DIR`` (disk, off when unset).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from . import metrics
+from .config import DAYS_LEFT, DEFAULT_RATES
+from .engine import convert_result
+
+KEY_VERSION = 2  # bump when the PDF layout changes, so disk caches start over
+MAX_BYTES = 64 << 20
+MAX_DISK_BYTES = 1 << 30
+TRIM_INTERVAL = 60  # seconds between trims of the disk layer, per process
+
+_default_cache = None
+
+
+def pdf_key(quote_id, client, address, packing, delivery, breakdown, result, currency,
+            rates=DEFAULT_RATES, issued=None):
+    """sha256 hex digest of everything ``generate_branded_pdf`` prints."""
+    converted = convert_result(result, currency, rates)
+    printed = {
+        "version": KEY_VERSION,
+        "quote_id": quote_id,
+        # Exactly as printed - whitespace included - so one key is one PDF
+        "client": client or "—",
+        "address": address,
+        "packing": packing,
+        "delivery": delivery,
+        "breakdown": [[str(cell) for cell in row] for row in breakdown],
+        "currency": currency,
+        "symbol": rates.currency_symbol[currency],
+        "amounts": [f"{converted[k]:,.2f}" for k in ("subtotal", "insurance", "vat", "total")],
+        "rates": [f"{rates.insurance_rate * 100:g}", f"{rates.vat_rate * 100:g}"],
+        # Only the day is printed, along with the validity it implies
+        "issued": (issued or datetime.now()).date().isoformat(),
+        "days_left": DAYS_LEFT,
+    }
+    encoded = json.dumps(printed, ensure_ascii=False, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, max_bytes=MAX_BYTES, directory=None, max_disk_bytes=MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = str(directory) if directory else None
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._trimmed_at = 0.0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                "entries": len(self._entries), "bytes": self._size}
+
+    def _record(self, result, layer):
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+            else:
+                self.misses += 1
+            rate = self.hit_rate
+        metrics.count("pdf_cache", result=result, layer=layer)
+        metrics.gauge("pdf_cache_hit_rate", rate)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pdf")
+
+    def _remember(self, key, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = pdf
+            self._size += len(pdf)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get(self, key):
+        """Cached PDF bytes for ``key``, or None."""
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+        if pdf is not None:
+            self._record("hit", "memory")
+            return pdf
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    pdf = f.read()
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                metrics.swallowed("pdf_cache")
+            if pdf is not None:
+                self._record("hit", "disk")
+                self._remember(key, pdf)
+                return pdf
+        self._record("miss", "disk" if self.directory else "memory")
+        return None
+
+    def put(self, key, pdf):
+        self._remember(key, pdf)
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp, path)
+        except OSError:
+            metrics.swallowed("pdf_cache")
+        if time.monotonic() - self._trimmed_at > TRIM_INTERVAL:
+            self.trim()
+
+    def get_or_render(self, key, render):
+        """PDF bytes for ``key``, calling ``render()`` for them on a miss."""
+        pdf = self.get(key)
+        if pdf is None:
+            pdf = render()
+            self.put(key, pdf)
+        return pdf
+
+    def trim(self):
+        """Delete the least recently used files until the directory fits ``max_disk_bytes``."""
+        self._trimmed_at = time.monotonic()
+        try:
+            files = []
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".pdf"):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes:
+                    break
+                os.remove(path)
+                total -= size
+        except OSError:
+            metrics.swallowed("pdf_cache")
+
+
+def pdf_cache_from_env():
+    """``PdfCache`` sized by ``SHIPQUOTE_PDF_CACHE_MB`` and backed by ``SHIPQUOTE_PDF_CACHE_DIR``."""
+    megabytes = float(os.environ.get("SHIPQUOTE_PDF_CACHE_MB", MAX_BYTES >> 20))
+    return PdfCache(int(megabytes * (1 << 20)), os.environ.get("SHIPQUOTE_PDF_CACHE_DIR"))
+
+
+def get_default_pdf_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = pdf_cache_from_env()
+    return _default_cache
+
+
+def set_default_pdf_cache(cache):
+    global _default_cache
+    _default_cache = cache
@@ -0,0 +1,181 @@
+"""Declarative rate cards, compiled into lookup tables.
+
+A rate card is a JSON file with any of the ``Rates`` fields; fields it
+leaves out keep their ``config`` defaults::
+
+    {
+        "base_rate": 220,
+        "weight_mult": {"Light": 1, "Medium": 1.5, "Heavy": 2},
+        "distance_bands": [[50, 1], [300, 1.2], [1000, 1.5]],
+        "far_distance_mult": 2
+    }
+
+``load_rate_card`` validates the file into a ``Rates`` bundle, which every
+engine function already takes as ``rates=``, and compiles its ``RateTables``
+up front.  A card must price every weight class and material of the
+catalog it prices (the demo lots by default) and every packing
+``shipquote.packing`` can choose.  It is cached per
+file and reloaded when the file changes, so a running app or service picks
+up a new card without restarting.  If a changed card does not validate, or
+the file is missing for a moment mid-deploy, the last good one stays in use.
+
+``RateTables`` are the dense form of a ``Rates`` bundle: each cost table as
+a NumPy array with a name -> index map, and the distance bands as a sorted
+limit array searched with ``bisect`` (scalar) or ``np.searchsorted``
+(vectorized).  ``tables(rates)`` compiles them once per bundle, so
+``engine.price_quote`` and ``batch.calculate_shipping_batch`` read the same
+table.
+"""
+import json
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+import numpy as np
+
+from .catalog import DEMO_CATALOG
+from .config import CONTAINERS, DEFAULT_RATES, OVERSIZE_PACKING, Rates
+from .metrics import swallowed
+
+_NUMBERS = ("base_rate", "price_per_kg", "far_distance_mult", "insurance_rate", "vat_rate")
+_TABLES = ("weight_mult", "material_mult", "delivery_cost", "packing_cost", "currency_rate")
+
+# Compiled tables for the most recently used bundles, by identity
+TABLES_CACHE_SIZE = 32
+_tables = OrderedDict()
+_cards = {}
+_lock = threading.Lock()
+
+
+class RateTables:
+    def __init__(self, rates):
+        self.weights, self.weight_mult = self._table(rates.weight_mult)
+        self.materials, self.material_mult = self._table(rates.material_mult)
+        self.deliveries, self.delivery_cost = self._table(rates.delivery_cost)
+        self.packings, self.packing_cost = self._table(rates.packing_cost)
+        self.weight_index = {w: i for i, w in enumerate(self.weights)}
+        self.material_index = {m: i for i, m in enumerate(self.materials)}
+        self.delivery_index = {d: i for i, d in enumerate(self.deliveries)}
+        self.packing_index = {p: i for i, p in enumerate(self.packings)}
+        # Plain lists for the scalar path keep the card's ints as ints
+        self._limits = [limit for limit, _ in rates.distance_bands]
+        self._mults = [mult for _, mult in rates.distance_bands] + [rates.far_distance_mult]
+        self.band_limits = np.array(self._limits, dtype=float)
+        self.band_mults = np.array(self._mults, dtype=float)
+
+    @staticmethod
+    def _table(mapping):
+        return list(mapping), np.array(list(mapping.values()), dtype=float)
+
+    def distance_multiplier(self, km):
+        """Multiplier of the first band whose upper bound exceeds ``km``."""
+        return self._mults[bisect_right(self._limits, km)]
+
+    def distance_multipliers(self, km):
+        """Vectorized ``distance_multiplier``."""
+        return self.band_mults[np.searchsorted(self.band_limits, np.asarray(km, dtype=float), side="right")]
+
+
+def tables(rates=DEFAULT_RATES):
+    """``RateTables`` for ``rates``, compiled on first use."""
+    key = id(rates)
+    with _lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] is rates:
+            _tables.move_to_end(key)
+            return cached[1]
+    compiled = RateTables(rates)
+    with _lock:
+        _tables[key] = (rates, compiled)
+        while len(_tables) > TABLES_CACHE_SIZE:
+            _tables.popitem(last=False)
+    return compiled
+
+
+def _number(field, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    return value
+
+
+def _mapping(field, value):
+    if not isinstance(value, dict) or not value:
+        raise ValueError(f"{field} must be a non-empty object")
+    return value
+
+
+def rates_from_dict(data, rates=DEFAULT_RATES, catalog=DEMO_CATALOG):
+    """``rates`` with the fields of a parsed rate card, pricing ``catalog``; raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("a rate card must be a JSON object")
+    unknown = set(data) - set(Rates._fields)
+    if unknown:
+        raise ValueError(f"unknown rate card fields: {sorted(unknown)}")
+    changes = {}
+    for field in _NUMBERS:
+        if field in data:
+            changes[field] = _number(field, data[field])
+    for field in _TABLES:
+        if field in data:
+            table = _mapping(field, data[field])
+            changes[field] = {str(k): _number(f"{field}.{k}", v) for k, v in table.items()}
+    if "currency_symbol" in data:
+        symbols = _mapping("currency_symbol", data["currency_symbol"])
+        changes["currency_symbol"] = {str(k): str(v) for k, v in symbols.items()}
+    if "distance_bands" in data:
+        if not isinstance(data["distance_bands"], list):
+            raise ValueError("distance_bands must be a list of [upper km, multiplier]")
+        bands = []
+        for band in data["distance_bands"]:
+            if not isinstance(band, (list, tuple)) or len(band) != 2:
+                raise ValueError(f"distance band must be [upper km, multiplier], got {band!r}")
+            bands.append((_number("distance band", band[0]), _number("distance band", band[1])))
+        limits = [limit for limit, _ in bands]
+        if any(a >= b for a, b in zip(limits, limits[1:])):
+            raise ValueError("distance bands must be in increasing order of distance")
+        changes["distance_bands"] = tuple(bands)
+    rates = rates._replace(**changes)
+    missing = set(rates.currency_rate) ^ set(rates.currency_symbol)
+    if missing:
+        raise ValueError(f"currency_rate and currency_symbol disagree on: {sorted(missing)}")
+    # Every key pricing and packing look up must be priced
+    for field, required in (("weight_mult", catalog.weights), ("material_mult", catalog.materials),
+                            ("packing_cost", [*CONTAINERS, OVERSIZE_PACKING])):
+        missing = [key for key in required if key not in getattr(rates, field)]
+        if missing:
+            raise ValueError(f"{field} is missing {missing}")
+    return rates
+
+
+def load_rate_card(path, rates=DEFAULT_RATES, catalog=DEMO_CATALOG):
+    """``Rates`` from the rate card at ``path`` for ``catalog``, reloaded when the file changes."""
+    path = str(path)
+    with _lock:
+        cached = _cards.get((path, id(catalog)))
+    if cached is not None and (cached[1] is not rates or cached[2] is not catalog):
+        cached = None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        if cached is not None and cached[0] == mtime:
+            return cached[3]
+        with open(path, encoding="utf-8") as f:
+            card = rates_from_dict(json.load(f), rates, catalog)
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        if cached is None:
+            raise
+        # Keep pricing with the last good card until the file is back or fixed
+        swallowed("load_rate_card")
+        if isinstance(e, OSError):
+            return cached[3]
+        card = cached[3]
+    tables(card)
+    with _lock:
+        _cards[(path, id(catalog))] = (mtime, rates, catalog, card)
+    return card
+
+
+def rates_from_env(rates=DEFAULT_RATES, catalog=DEMO_CATALOG):
+    """``rates`` with the rate card at ``SHIPQUOTE_RATE_CARD`` applied, if set."""
+    path = os.environ.get("SHIPQUOTE_RATE_CARD")
+    return load_rate_card(path, rates, catalog) if path else rates
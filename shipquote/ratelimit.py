@@ -0,0 +1,186 @@
+"""Process-wide rate limiting for the online geocoder.
+
+Nominatim's usage policy allows about one request per second per
+application.  ``RateLimitedGeocoder`` wraps a geopy-style geocoder so that
+every session, worker thread and autocomplete lookup of a process shares
+that budget instead of each firing its own requests and getting throttled:
+
+* A token bucket admits ``rate`` requests per second, with bursts of up to
+  ``burst``.
+* Identical queries already waiting or in flight are coalesced - later
+  callers wait for the first caller's answer instead of queueing again.
+* Queued requests are served by priority: single-result lookups that price
+  a quote (``QUOTE``) go ahead of multi-result autocomplete lookups
+  (``SUGGEST``).  Pass ``priority=`` to ``geocode`` to override.
+* Autocomplete is shed when the queue is deep or it has waited too long;
+  quote lookups wait up to ``max_wait`` seconds.  Either way the caller
+  gets ``RateLimitExceeded`` rather than a silently wrong answer.
+
+Queue depth, waits, coalesced and shed requests are reported through
+``shipquote.metrics`` and ``stats()``.  Put the limiter below the geocode
+cache so cache hits never spend a token.  ``clock`` replaces
+``time.monotonic``, e.g. with a fake clock in tests.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+from . import metrics
+from .geocoding import normalize_address
+
+QUOTE = 0
+SUGGEST = 1
+PRIORITY_NAMES = {QUOTE: "quote", SUGGEST: "suggest"}
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class _Flight:
+    __slots__ = ("future", "priority", "deadline", "dispatched")
+
+    def __init__(self, priority, deadline):
+        self.future = Future()
+        self.priority = priority
+        self.deadline = deadline
+        self.dispatched = False
+
+
+class RateLimitedGeocoder:
+    def __init__(self, geocoder, rate=1.0, burst=1, max_wait=60.0, suggest_max_wait=5.0, max_suggest_queue=8,
+                 clock=time.monotonic):
+        self.geocoder = geocoder
+        self.clock = clock
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.suggest_max_wait = suggest_max_wait
+        self.max_suggest_queue = max_suggest_queue
+        self.requests = 0
+        self.coalesced = 0
+        self.shed = 0
+        self.max_queue_depth = 0
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._queue = []
+        self._waiting = 0
+        self._flights = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        priority = kwargs.pop("priority", QUOTE if exactly_one else SUGGEST)
+        key = (exactly_one, limit, normalize_address(query))
+        now = self.clock()
+        with self._cond:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._enqueue(key, priority, now)
+            else:
+                self.coalesced += 1
+                metrics.count("geocode_coalesced", priority=PRIORITY_NAMES.get(priority, priority))
+                if not flight.dispatched and priority < flight.priority:
+                    # A quote now waits on this lookup; move it up the queue
+                    flight.priority = priority
+                    flight.deadline = max(flight.deadline, now + self._max_wait(priority))
+                    heapq.heappush(self._queue, (priority, next(self._seq), flight))
+                    self._cond.notify_all()
+        if not leader:
+            return flight.future.result()
+
+        try:
+            self._wait_for_turn(flight)
+        except RateLimitExceeded as e:
+            self._finish(key, flight)
+            flight.future.set_exception(e)
+            raise
+        try:
+            if exactly_one:
+                found = self.geocoder.geocode(query, exactly_one=True, **kwargs)
+            else:
+                found = self.geocoder.geocode(query, exactly_one=False, limit=limit, **kwargs)
+        except BaseException as e:
+            self._finish(key, flight)
+            flight.future.set_exception(e)
+            raise
+        self._finish(key, flight)
+        flight.future.set_result(found)
+        return found
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "shed": self.shed,
+                "queue_depth": self._waiting,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+    def _max_wait(self, priority):
+        return self.max_wait if priority <= QUOTE else self.suggest_max_wait
+
+    def _enqueue(self, key, priority, now):
+        if priority > QUOTE and self._waiting >= self.max_suggest_queue:
+            self.shed += 1
+            metrics.count("geocode_shed", reason="queue_full")
+            raise RateLimitExceeded(f"geocoder queue full ({self._waiting} waiting)")
+        flight = _Flight(priority, now + self._max_wait(priority))
+        self._flights[key] = flight
+        heapq.heappush(self._queue, (priority, next(self._seq), flight))
+        self.requests += 1
+        self._waiting += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._waiting)
+        metrics.count("geocode_requests", priority=PRIORITY_NAMES.get(priority, priority))
+        metrics.gauge("geocode_queue_depth", self._waiting)
+        return flight
+
+    def _head(self):
+        # Drop heap entries left behind by promoted, dispatched or expired flights
+        while self._queue:
+            priority, _, flight = self._queue[0]
+            if not flight.dispatched and priority == flight.priority:
+                return flight
+            heapq.heappop(self._queue)
+        return None
+
+    def _wait_for_turn(self, flight):
+        started = self.clock()
+        with self._cond:
+            while True:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                is_head = self._head() is flight
+                if is_head and self._tokens >= 1:
+                    heapq.heappop(self._queue)
+                    self._tokens -= 1
+                    break
+                if now >= flight.deadline:
+                    self.shed += 1
+                    metrics.count("geocode_shed", reason="timeout")
+                    self._dequeued(flight)
+                    raise RateLimitExceeded(f"no geocoder capacity within {now - started:.1f}s")
+                timeout = flight.deadline - now
+                if is_head:
+                    timeout = min(timeout, (1 - self._tokens) / self.rate)
+                self._cond.wait(timeout)
+            self._dequeued(flight)
+        metrics.observe("geocode_queue_wait", self.clock() - started,
+                        priority=PRIORITY_NAMES.get(flight.priority, flight.priority))
+
+    def _dequeued(self, flight):
+        flight.dispatched = True
+        self._waiting -= 1
+        metrics.gauge("geocode_queue_depth", self._waiting)
+        # The next flight in line may now be the head
+        self._cond.notify_all()
+
+    def _finish(self, key, flight):
+        with self._cond:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
@@ -0,0 +1,82 @@
+"""Record real geocoder answers once, replay them deterministically offline.
+
+``RecordingGeocoder`` wraps a live geocoder and stores every answer in a JSON
+fixture; ``ReplayGeocoder`` serves the same answers from that fixture with
+an optional fixed latency, so benchmarks and load tests never depend on
+Nominatim being reachable or fast.
+"""
+import json
+import threading
+import time
+
+from .geocoding import Place, normalize_address
+
+
+def _key(query, exactly_one, limit):
+    return f"{'one' if exactly_one else f'many:{limit}'}|{normalize_address(query)}"
+
+
+def _dump(found):
+    if found is None:
+        return None
+    if isinstance(found, list):
+        return [[p.address, p.latitude, p.longitude] for p in found]
+    return [found.address, found.latitude, found.longitude]
+
+
+def _load(value):
+    if value is None:
+        return None
+    if value and isinstance(value[0], list):
+        return [Place(*p) for p in value]
+    return Place(*value) if value else []
+
+
+class RecordingGeocoder:
+    def __init__(self, geocoder, path):
+        self.geocoder = geocoder
+        self.path = str(path)
+        self.answers = {}
+        self._lock = threading.Lock()
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        found = self.geocoder.geocode(query, exactly_one=exactly_one, limit=limit, **kwargs)
+        if not exactly_one and found is not None:
+            found = list(found)
+        with self._lock:
+            self.answers[_key(query, exactly_one, limit)] = _dump(found)
+        return found
+
+    def save(self):
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.answers, f, indent=1, sort_keys=True, ensure_ascii=False)
+
+
+class ReplayGeocoder:
+    """Serves recorded answers; unknown queries raise ``KeyError`` when ``strict``."""
+
+    def __init__(self, answers, latency=0.0, strict=True):
+        self.answers = dict(answers)
+        self.latency = latency
+        self.strict = strict
+        self.calls = 0
+
+    @classmethod
+    def load(cls, path, latency=0.0, strict=True):
+        with open(str(path), encoding="utf-8") as f:
+            return cls(json.load(f), latency, strict)
+
+    def queries(self):
+        """Recorded single-result queries, in a stable order."""
+        return sorted(k.split("|", 1)[1] for k in self.answers if k.startswith("one|"))
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        key = _key(query, exactly_one, limit)
+        if key not in self.answers:
+            if self.strict:
+                raise KeyError(f"no recorded answer for {key!r}")
+            return None
+        return _load(self.answers[key])
@@ -0,0 +1,245 @@
+"""Asynchronous HTTP quoting API for partner integrations.
+
+``QuoteService`` is a dependency-free ASGI application; serve it with any
+ASGI server, e.g.::
+
+    uvicorn shipquote.service:app --workers 2
+
+Endpoints:
+
+* ``POST /quote`` - consignment JSON in (see ``shipquote.consignment``),
+  priced quote JSON out
+* ``POST /quote/pdf`` - consignment JSON in, branded PDF out
+* ``GET /quote/<quote_id>`` and ``GET /quote/<quote_id>/pdf`` - a quote
+  saved in the quote store, and its PDF re-rendered as issued
+* ``GET /healthz``
+* ``GET /metrics`` - Prometheus text, ``?format=json`` for a JSON snapshot
+  (see ``shipquote.metrics``)
+
+Geocoding runs on a bounded thread pool with a timeout, so the event loop
+never waits on Nominatim and a slow lookup turns into a 504 rather than a
+mispriced quote.  Consolidated quotes are priced on the same thread pool,
+since planning their containers can take up to ``packing.PLAN_TIME_LIMIT``.
+PDF rendering, the CPU-heavy step, runs on a process pool.
+With a ``store`` (``SHIPQUOTE_QUOTE_STORE`` for the module-level ``app``)
+every priced quote is saved, see ``shipquote.store``.  With a ``rate_card``
+(``SHIPQUOTE_RATE_CARD``) each request prices with the card as it is on
+disk, see ``shipquote.ratecard``, and with ``fx_rates``
+(``SHIPQUOTE_FX_RATES``) at today's exchange rates, see ``shipquote.fx``.
+"""
+import asyncio
+import functools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .catalog import DEMO_CATALOG
+from .config import DEFAULT_RATES
+from .consignment import normalize_consignment, quote_record
+from .engine import AddressNotFound, get_default_geocoder, locate_address, measure_distance, price_quote
+from .fx import load_fx
+from . import metrics
+from .pdf import render_quote_pdf
+from .ratecard import load_rate_card
+from .store import render_stored_pdf, store_from_env
+
+MAX_BODY_BYTES = 1 << 20
+ROUTES = ("/healthz", "/metrics", "/quote", "/quote/pdf", "/quote/{id}", "/quote/{id}/pdf")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_response(status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    return status, [(b"content-type", b"application/json")], body
+
+
+class QuoteService:
+    def __init__(self, geocoder=None, rates=DEFAULT_RATES, catalog=DEMO_CATALOG,
+                 geocode_concurrency=16, geocode_timeout=10, pdf_workers=None, pdf_executor=None,
+                 store=None, rate_card=None, fx_rates=None):
+        self.geocoder = geocoder
+        self.store = store
+        self.rate_card = rate_card
+        self.fx_rates = fx_rates
+        self._rates = rates
+        self.catalog = catalog
+        self.geocode_timeout = geocode_timeout
+        self.pdf_workers = pdf_workers
+        self._geocode_pool = ThreadPoolExecutor(geocode_concurrency, thread_name_prefix="geocode")
+        self._pdf_pool = pdf_executor
+
+    @property
+    def rates(self):
+        """``rates`` with the rate card and exchange rates applied, re-read whenever their files change."""
+        rates = self._rates
+        if self.rate_card:
+            rates = load_rate_card(self.rate_card, rates, self.catalog)
+        if self.fx_rates:
+            rates = load_fx(self.fx_rates).snapshot().as_rates(rates)
+        return rates
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        start = time.perf_counter()
+        try:
+            status, headers, body = await self._route(scope, receive)
+        except HTTPError as e:
+            status, headers, body = _json_response(e.status, {"error": str(e)})
+        except Exception as e:
+            # A failed render, store write or rate card still gets an answer
+            metrics.swallowed("QuoteService")
+            traceback.print_exc()
+            status, headers, body = _json_response(500, {"error": f"internal error: {type(e).__name__}"})
+        if metrics.REGISTRY.enabled:
+            path = scope["path"].rstrip("/") or "/"
+            if path.startswith("/quote/") and path != "/quote/pdf":
+                path = "/quote/{id}/pdf" if path.endswith("/pdf") else "/quote/{id}"
+            path = path if path in ROUTES else "other"
+            metrics.observe("http_request", time.perf_counter() - start, path=path)
+            metrics.count("http_responses", path=path, status=status)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        self._geocode_pool.shutdown(wait=False, cancel_futures=True)
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _route(self, scope, receive):
+        method, path = scope["method"], scope["path"].rstrip("/")
+        if path == "/healthz":
+            return _json_response(200, {"status": "ok"})
+        if path == "/metrics":
+            if b"format=json" in scope.get("query_string", b""):
+                return _json_response(200, metrics.snapshot())
+            return 200, [(b"content-type", b"text/plain; version=0.0.4")], metrics.prometheus_text().encode()
+        if path.startswith("/quote/") and path != "/quote/pdf":
+            if method != "GET":
+                raise HTTPError(405, "use GET")
+            return await self._stored(path[len("/quote/"):])
+        if path not in ("/quote", "/quote/pdf"):
+            raise HTTPError(404, "not found")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+
+        consignment, result, rates = await self._quote(await self._read_json(receive))
+        if path == "/quote":
+            return _json_response(200, quote_record(consignment, result, rates))
+
+        loop = asyncio.get_running_loop()
+        pdf = await loop.run_in_executor(self._pdf_executor(), render_quote_pdf, consignment, result, rates)
+        disposition = f'attachment; filename="ShipQuote_{consignment["quote_id"]}.pdf"'
+        return 200, [(b"content-type", b"application/pdf"),
+                     (b"content-disposition", disposition.encode())], pdf
+
+    async def _read_json(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise HTTPError(413, "request body too large")
+            if not message.get("more_body"):
+                break
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "expected a JSON object")
+        return payload
+
+    async def _quote(self, raw):
+        # One rate card per request, even if the file changes mid-request
+        rates = self.rates
+        try:
+            consignment = normalize_consignment(raw, rates=rates, catalog=self.catalog)
+        except (KeyError, ValueError) as e:
+            raise HTTPError(400, f"invalid consignment: {e}")
+        unknown = [lot for lot in consignment["lots"] if lot not in self.catalog]
+        if unknown:
+            raise HTTPError(400, f"unknown lots: {unknown}")
+
+        place = await self._geocode(consignment["address"])
+        km, dist_mult = measure_distance(place, rates)
+        price = functools.partial(
+            price_quote, consignment["lots"], consignment["packing"], consignment["delivery"], km, dist_mult,
+            consignment["include_insurance"], rates=rates, catalog=self.catalog,
+            consolidate=consignment["consolidate"],
+        )
+        loop = asyncio.get_running_loop()
+        if consignment["consolidate"]:
+            # plan_packing may take up to PLAN_TIME_LIMIT of CPU; keep it off the event loop
+            result = await loop.run_in_executor(self._geocode_pool, price)
+        else:
+            result = price()
+        if self.store is not None:
+            await loop.run_in_executor(None, lambda: self.store.save(consignment, result, place, rates=rates))
+        return consignment, result, rates
+
+    async def _stored(self, path):
+        quote_id, _, suffix = path.partition("/")
+        if suffix not in ("", "pdf"):
+            raise HTTPError(404, "not found")
+        if self.store is None:
+            raise HTTPError(404, "no quote store configured")
+        loop = asyncio.get_running_loop()
+        quote = await loop.run_in_executor(None, self.store.get, quote_id)
+        if quote is None:
+            raise HTTPError(404, f"unknown quote: {quote_id}")
+        if not suffix:
+            rates = self.rates._replace(currency_rate={quote.consignment["currency"]: quote.currency_rate})
+            record = quote_record(quote.consignment, quote.result, rates)
+            record.update(client=quote.client, issued_at=quote.issued_at.isoformat(timespec="seconds"),
+                          revision=quote.revision, place=quote.place)
+            return _json_response(200, record)
+        pdf = await loop.run_in_executor(self._pdf_executor(), render_stored_pdf, quote, self.rates)
+        disposition = f'attachment; filename="ShipQuote_{quote.quote_id}.pdf"'
+        return 200, [(b"content-type", b"application/pdf"),
+                     (b"content-disposition", disposition.encode())], pdf
+
+    async def _geocode(self, address):
+        """``Place`` for ``address``; 422 when it is unknown, 504/503 when the lookup fails."""
+        geocoder = self.geocoder or get_default_geocoder()
+        loop = asyncio.get_running_loop()
+        lookup = loop.run_in_executor(self._geocode_pool, locate_address, address, geocoder)
+        try:
+            return await asyncio.wait_for(lookup, self.geocode_timeout)
+        except asyncio.TimeoutError:
+            metrics.count("geocode_errors", error="TimeoutError")
+            raise HTTPError(504, "geocoding timed out")
+        except AddressNotFound:
+            raise HTTPError(422, f"address not found: {address}")
+        except Exception as e:
+            # locate_address has counted it in geocode_errors
+            raise HTTPError(503, f"geocoding failed: {type(e).__name__}")
+
+    def _pdf_executor(self):
+        if self._pdf_pool is None:
+            self._pdf_pool = ProcessPoolExecutor(self.pdf_workers)
+        return self._pdf_pool
+
+
+app = QuoteService(store=store_from_env(), rate_card=os.environ.get("SHIPQUOTE_RATE_CARD"),
+                   fx_rates=os.environ.get("SHIPQUOTE_FX_RATES"))
@@ -0,0 +1,177 @@
+"""Append-only store of issued quotes.
+
+Every issued quote is saved with its inputs (the normalized consignment),
+the resolved delivery coordinates, the priced result and the rates its PDF
+prints - exchange rate and symbol, insurance and VAT percentages - as they
+were when it was issued, so it can be looked up and its PDF re-rendered
+later, as issued, without geocoding or pricing it again.
+
+``QuoteStore`` is a SQLite file.  Rows are never updated or deleted -
+triggers reject both - and saving a quote ID again appends a new revision;
+lookups return the latest one.  B-tree indexes on quote ID, client and
+issue time keep every lookup O(log n) however many quotes are stored.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from .config import DEFAULT_RATES
+from .geocoding import Place
+from .pdf import render_quote_pdf
+
+DEFAULT_QUOTE_STORE = "shipquote_quotes.sqlite3"
+
+StoredQuote = namedtuple("StoredQuote", [
+    "quote_id", "revision", "client", "issued_at", "consignment", "place", "result",
+    "currency_rate", "currency_symbol", "insurance_rate", "vat_rate",
+])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quote (
+    revision INTEGER PRIMARY KEY,
+    quote_id TEXT NOT NULL,
+    client TEXT NOT NULL,
+    issued_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quote_by_id ON quote (quote_id, revision);
+CREATE INDEX IF NOT EXISTS quote_by_client ON quote (client, issued_at);
+CREATE INDEX IF NOT EXISTS quote_by_issued ON quote (issued_at);
+CREATE TRIGGER IF NOT EXISTS quote_no_update BEFORE UPDATE ON quote
+BEGIN SELECT RAISE(ABORT, 'quotes are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS quote_no_delete BEFORE DELETE ON quote
+BEGIN SELECT RAISE(ABORT, 'quotes are append-only'); END;
+"""
+
+_COLUMNS = "revision, quote_id, client, issued_at, payload"
+
+
+def _timestamp(value):
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class QuoteStore:
+    def __init__(self, path=DEFAULT_QUOTE_STORE):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def save(self, consignment, result, place=None, issued_at=None, rates=DEFAULT_RATES, if_changed=False):
+        """Append a priced consignment; returns the ``StoredQuote``.
+
+        With ``if_changed`` nothing is appended when the latest revision of the
+        quote ID has the same consignment, place, result and rates; that
+        revision is returned instead.
+        """
+        issued_at = issued_at or datetime.now()
+        currency = consignment["currency"]
+        payload = {
+            "consignment": consignment,
+            "place": [place.address, place.latitude, place.longitude] if place is not None else None,
+            "result": result,
+            "currency_rate": rates.currency_rate[currency],
+            "currency_symbol": rates.currency_symbol[currency],
+            "insurance_rate": rates.insurance_rate,
+            "vat_rate": rates.vat_rate,
+        }
+        row = (consignment["quote_id"], consignment.get("client") or "", issued_at.timestamp(),
+               json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+        with self._lock:
+            if if_changed:
+                latest = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM quote WHERE quote_id = ? ORDER BY revision DESC LIMIT 1",
+                    (consignment["quote_id"],),
+                ).fetchone()
+                if latest is not None and latest[4] == row[3]:
+                    return self._decode(latest)
+            cursor = self._conn.execute(
+                "INSERT INTO quote (quote_id, client, issued_at, payload) VALUES (?, ?, ?, ?)", row
+            )
+            self._conn.commit()
+        return self._decode((cursor.lastrowid,) + row)
+
+    def get(self, quote_id):
+        """Latest revision of ``quote_id``, or None."""
+        rows = self._query(f"SELECT {_COLUMNS} FROM quote WHERE quote_id = ? "
+                           "ORDER BY revision DESC LIMIT 1", (quote_id,))
+        return rows[0] if rows else None
+
+    def history(self, quote_id):
+        """Every revision of ``quote_id``, oldest first."""
+        return self._query(f"SELECT {_COLUMNS} FROM quote WHERE quote_id = ? ORDER BY revision", (quote_id,))
+
+    def by_client(self, client, limit=100):
+        """Quotes issued to ``client``, newest first."""
+        return self._query(f"SELECT {_COLUMNS} FROM quote WHERE client = ? "
+                           "ORDER BY issued_at DESC LIMIT ?", (client, limit))
+
+    def issued_between(self, start, end, limit=1000):
+        """Quotes issued in ``[start, end)`` (datetimes or timestamps), oldest first."""
+        return self._query(f"SELECT {_COLUMNS} FROM quote WHERE issued_at >= ? AND issued_at < ? "
+                           "ORDER BY issued_at LIMIT ?", (_timestamp(start), _timestamp(end), limit))
+
+    def render_pdf(self, quote_id, rates=DEFAULT_RATES):
+        """PDF bytes of the latest revision of ``quote_id``, as issued; no geocoding or pricing."""
+        quote = self.get(quote_id)
+        if quote is None:
+            raise KeyError(quote_id)
+        return render_stored_pdf(quote, rates)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM quote").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._decode(row) for row in rows]
+
+    @staticmethod
+    def _decode(row):
+        revision, quote_id, client, issued_at, payload = row
+        data = json.loads(payload)
+        return StoredQuote(
+            quote_id=quote_id,
+            revision=revision,
+            client=client,
+            issued_at=datetime.fromtimestamp(issued_at),
+            consignment=data["consignment"],
+            place=Place(*data["place"]) if data["place"] else None,
+            result=data["result"],
+            currency_rate=data["currency_rate"],
+            currency_symbol=data["currency_symbol"],
+            # Quotes stored before these were recorded print the current rates
+            insurance_rate=data.get("insurance_rate"),
+            vat_rate=data.get("vat_rate"),
+        )
+
+
+def render_stored_pdf(quote, rates=DEFAULT_RATES, output=None):
+    """PDF bytes for a ``StoredQuote`` at the rates and date it was issued.
+
+    With ``output`` (a path or binary file) the PDF is written there instead.
+    """
+    currency = quote.consignment["currency"]
+    rates = rates._replace(
+        currency_rate={**rates.currency_rate, currency: quote.currency_rate},
+        currency_symbol={**rates.currency_symbol, currency: quote.currency_symbol},
+    )
+    if quote.insurance_rate is not None:
+        rates = rates._replace(insurance_rate=quote.insurance_rate, vat_rate=quote.vat_rate)
+    return render_quote_pdf(quote.consignment, quote.result, rates, issued=quote.issued_at, output=output)
+
+
+def store_from_env():
+    """``QuoteStore`` at ``SHIPQUOTE_QUOTE_STORE``, or None when it is not set."""
+    path = os.environ.get("SHIPQUOTE_QUOTE_STORE")
+    return QuoteStore(path) if path else None
@@ -0,0 +1,97 @@
+"""Debounced, cancellable address autocomplete."""
+import threading
+import time
+
+import pytest
+
+from shipquote.autocomplete import AddressAutocompleter, matches_query
+from shipquote.geocoding import Place
+
+ADDRESSES = ["Paris, Île-de-France, France", "Paris, Texas, United States", "Parma, Emilia-Romagna, Italy"]
+
+
+class RecordingGeocoder:
+    def __init__(self, addresses=ADDRESSES, fail=False):
+        self.addresses = addresses
+        self.fail = fail
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def geocode(self, query, exactly_one=False, limit=None, **kwargs):
+        with self.lock:
+            self.queries.append(query)
+        if self.fail:
+            raise TimeoutError
+        found = [Place(a, 0, 0) for a in self.addresses if matches_query(query, a)]
+        return found[:limit] or None
+
+
+def settle(autocompleter, timeout=5):
+    """Wait until no lookup is in flight."""
+    deadline = time.monotonic() + timeout
+    while autocompleter._inflight:
+        assert time.monotonic() < deadline, "lookups never finished"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def geocoder():
+    return RecordingGeocoder()
+
+
+@pytest.fixture
+def autocompleter(geocoder):
+    autocompleter = AddressAutocompleter(geocoder, limit=5, debounce=0.05)
+    yield autocompleter
+    autocompleter.close()
+
+
+def test_typing_only_looks_up_the_settled_input(autocompleter, geocoder):
+    for query in ("Par", "Pari", "Paris"):
+        suggestions, pending = autocompleter.suggest(query, channel="s1", wait=0)
+        assert pending and suggestions == []
+    settle(autocompleter)
+
+    assert geocoder.queries == ["Paris"]
+    assert autocompleter.suggest("Paris", channel="s1", wait=0) == (ADDRESSES[:2], False)
+
+
+def test_channels_do_not_cancel_each_other(autocompleter, geocoder):
+    autocompleter.suggest("Paris", channel="s1", wait=0)
+    autocompleter.suggest("Parma", channel="s2", wait=0)
+    settle(autocompleter)
+    assert sorted(geocoder.queries) == ["Paris", "Parma"]
+
+
+def test_short_or_cleared_input_cancels_the_lookup(autocompleter, geocoder):
+    autocompleter.suggest("Paris", channel="s1", wait=0)
+    assert autocompleter.pending("Paris", channel="s1")
+    assert autocompleter.suggest("Pa", channel="s1") == ([], False)
+    assert not autocompleter.pending("Paris", channel="s1")
+    time.sleep(0.1)
+    assert geocoder.queries == []
+
+
+def test_finished_lookups_are_forgotten(autocompleter):
+    for n in range(20):
+        autocompleter.suggest(f"Paris {n}", channel=f"session-{n}", wait=0)
+    settle(autocompleter)
+    assert autocompleter._inflight == {}
+    # Waiting out a lookup inside suggest forgets it too
+    assert autocompleter.suggest("Parma", channel="s1", wait=1) == ([ADDRESSES[2]], False)
+    assert autocompleter._inflight == {}
+
+
+def test_longer_input_is_narrowed_from_a_complete_prefix(autocompleter, geocoder):
+    autocompleter.suggest("Par", channel="s1", wait=1)
+    assert autocompleter.suggest("Paris tex", channel="s1") == ([ADDRESSES[1]], False)
+    assert geocoder.queries == ["Par"]
+
+
+def test_failed_lookup_returns_no_suggestions():
+    autocompleter = AddressAutocompleter(RecordingGeocoder(fail=True), debounce=0)
+    try:
+        assert autocompleter.suggest("Paris", channel="s1", wait=1) == ([], False)
+        settle(autocompleter)
+    finally:
+        autocompleter.close()
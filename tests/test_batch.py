@@ -0,0 +1,110 @@
+"""``calculate_shipping_batch`` against the scalar quote path."""
+import numpy as np
+import pandas as pd
+import pytest
+from geopy.distance import geodesic
+
+from shipquote.batch import calculate_shipping_batch
+from shipquote.catalog import DEMO_CATALOG
+from shipquote.config import DEFAULT_RATES, DELIVERY_TYPES, PACKING_TYPES
+from shipquote.depots import TIE_TOLERANCE, DepotIndex
+from shipquote.engine import distance_multiplier, price_quote
+from shipquote.geocoding import Place
+
+DEPOTS = DepotIndex.from_mapping({"Paris": (48.8566, 2.3522), "Lyon": (45.764, 4.8357)})
+PACKINGS = ["Wood crate", "Cardboard box", "Custom"]
+DELIVERIES = ["Front delivery", "Curbside", "White Glove (ground)"]
+
+
+def band_edge_destinations(depots=DEPOTS, rates=DEFAULT_RATES):
+    """Destinations just inside and outside every distance band bound, on every bearing."""
+    places = []
+    for depot in depots.depots:
+        for limit, _ in rates.distance_bands:
+            for offset in (-TIE_TOLERANCE, -0.002, -0.0005, 0.0005, 0.002, TIE_TOLERANCE):
+                for bearing in range(0, 360, 30):
+                    point = geodesic(kilometers=limit * (1 + offset)).destination(depot[1:], bearing)
+                    places.append(Place(None, point.latitude, point.longitude))
+    return places
+
+
+def scalar_quote(lots, packing, delivery, place, include_insurance):
+    depot, km = DEPOTS.measure(place)
+    return depot, price_quote(lots, packing, delivery, round(km), distance_multiplier(km),
+                              include_insurance)
+
+
+def random_quotes(seed, n=300):
+    """Line items and the scalar ``price_quote`` of each quote, priced on ``km``."""
+    rng = np.random.default_rng(seed)
+    lots = list(DEMO_CATALOG.keys())
+    limits = [limit for limit, _ in DEFAULT_RATES.distance_bands]
+    rows = []
+    expected = {}
+    for quote in range(n):
+        chosen = [lot.item() for lot in rng.choice(lots, size=rng.integers(1, 12))]
+        packing = str(rng.choice([p for p in PACKING_TYPES if p != "Automatic (AI)"]))
+        delivery = str(rng.choice(DELIVERY_TYPES))
+        # Half the distances sit exactly on a band bound
+        km = float(rng.choice(limits)) if quote % 2 else float(rng.uniform(0, 3000))
+        include_insurance = bool(rng.integers(2))
+        expected[quote] = price_quote(chosen, packing, delivery, km, distance_multiplier(km),
+                                      include_insurance)
+        rows += [{"quote_id": quote, "lot": lot, "packing": packing, "delivery": delivery,
+                  "km": km, "include_insurance": include_insurance} for lot in chosen]
+    return pd.DataFrame(rows), expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_matches_scalar_path(seed):
+    df, expected = random_quotes(seed)
+
+    batch = calculate_shipping_batch(df)
+
+    assert list(batch.index) == list(expected)
+    for n, result in expected.items():
+        row = batch.loc[n]
+        for field in ("subtotal", "insurance", "vat", "total", "total_weight"):
+            assert row[field] == result[field], (n, field)
+        assert row["lots"] == len(result["breakdown"])
+
+
+def test_dist_mult_column_matches_km():
+    df, _ = random_quotes(0, n=50)
+    with_mult = df.drop(columns="km").assign(dist_mult=[distance_multiplier(km) for km in df["km"]])
+    pd.testing.assert_frame_equal(calculate_shipping_batch(with_mult),
+                                  calculate_shipping_batch(df).drop(columns="km"))
+
+
+def test_band_edges_match_scalar_path():
+    rng = np.random.default_rng(3)
+    places = band_edge_destinations()
+    rows = []
+    expected = {}
+    for n, place in enumerate(places):
+        lots = rng.choice(list(range(86, 96)), size=rng.integers(1, 4), replace=False).tolist()
+        packing, delivery = PACKINGS[n % 3], DELIVERIES[n % 3]
+        include_insurance = bool(n % 2)
+        expected[n] = scalar_quote(lots, packing, delivery, place, include_insurance)
+        rows += [{"quote_id": n, "lot": lot, "packing": packing, "delivery": delivery,
+                  "latitude": place.latitude, "longitude": place.longitude,
+                  "include_insurance": include_insurance} for lot in lots]
+
+    batch = calculate_shipping_batch(pd.DataFrame(rows), depots=DEPOTS)
+
+    for n, (depot, result) in expected.items():
+        row = batch.loc[n]
+        assert row["depot"] == depot.name
+        assert row["km"] == pytest.approx(result["km"], rel=TIE_TOLERANCE, abs=0.5)
+        for field in ("subtotal", "insurance", "vat", "total"):
+            assert row[field] == result[field], (n, field)
+
+
+def test_great_circle_km_is_kept_away_from_band_edges():
+    # 700 km north of Paris is far from every band bound and from Lyon
+    point = geodesic(kilometers=700).destination(DEPOTS.depots[0][1:], 0)
+    positions, km = DEPOTS.nearest_measured([point.latitude], [point.longitude],
+                                            limits=[50, 300, 1000])
+    assert DEPOTS.depots[positions[0]].name == "Paris"
+    assert km[0] == pytest.approx(700, rel=TIE_TOLERANCE)
+    assert km[0] == DEPOTS.nearest([point.latitude], [point.longitude])[1][0]
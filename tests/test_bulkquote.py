@@ -0,0 +1,143 @@
+"""Resumable bulk quoting."""
+import csv
+
+import pandas as pd
+import pytest
+
+from shipquote.bulkquote import quote_file
+from shipquote.geocoding import Place
+from shipquote.store import QuoteStore
+
+PLACES = {
+    "Paris": Place("Paris, France", 48.8566, 2.3522),
+    "Lyon": Place("Lyon, France", 45.764, 4.8357),
+    "Berlin": Place("Berlin, Germany", 52.52, 13.405),
+}
+ROWS = 57
+CHUNK_ROWS = 10
+
+
+class StubGeocoder:
+    def __init__(self):
+        self.calls = 0
+
+    def geocode(self, address, timeout=None, **kwargs):
+        self.calls += 1
+        return PLACES.get(address)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_source(path):
+    addresses = [*PLACES, "Atlantis"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, ["quote_id", "lots", "packing", "delivery", "address"])
+        writer.writeheader()
+        for n in range(ROWS):
+            # Every third row leaves its quote ID to be derived from the row number
+            writer.writerow({"quote_id": "" if n % 3 == 0 else f"SQ-{n:04d}", "lots": f"{86 + n % 5};{90 + n % 3}",
+                             "packing": "Wood crate", "delivery": "Curbside", "address": addresses[n % 4]})
+
+
+def read_output(path):
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def interrupt_after(chunks):
+    def report(rows, failed):
+        if rows >= chunks * CHUNK_ROWS:
+            raise Interrupted
+    return report
+
+
+class FailingStore(QuoteStore):
+    """Crashes on the ``fail_at``-th save, as a process killed mid-chunk would."""
+
+    def __init__(self, path, fail_at):
+        super().__init__(path)
+        self.saves = 0
+        self.fail_at = fail_at
+
+    def save(self, *args, **kwargs):
+        self.saves += 1
+        if self.saves == self.fail_at:
+            raise Interrupted
+        return super().save(*args, **kwargs)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "consignments.csv"
+    write_source(path)
+    return path
+
+
+@pytest.fixture(params=["quotes.csv", "quotes.parquet"])
+def output(request, tmp_path):
+    return tmp_path / request.param
+
+
+def uninterrupted(source, tmp_path):
+    store = QuoteStore(tmp_path / "reference.sqlite3")
+    summary = quote_file(source, tmp_path / "reference.csv", StubGeocoder(), store=store, chunk_rows=CHUNK_ROWS)
+    return summary, read_output(tmp_path / "reference.csv"), store
+
+
+def test_interrupted_run_resumes_without_duplicates(source, output, tmp_path):
+    expected_summary, expected, reference_store = uninterrupted(source, tmp_path)
+    store = QuoteStore(tmp_path / "quotes.sqlite3")
+
+    with pytest.raises(Interrupted):
+        quote_file(source, output, StubGeocoder(), store=store, chunk_rows=CHUNK_ROWS,
+                   on_progress=interrupt_after(2))
+    assert (output.parent / (output.name + ".checkpoint.json")).exists()
+
+    summary = quote_file(source, output, StubGeocoder(), store=store, chunk_rows=CHUNK_ROWS)
+
+    assert summary == {**expected_summary, "resumed_at": 2 * CHUNK_ROWS}
+    pd.testing.assert_frame_equal(read_output(output), expected)
+    assert not (output.parent / (output.name + ".checkpoint.json")).exists()
+    assert len(store) == len(reference_store)
+    assert [q.quote_id for q in store.issued_between(0, 2e9, limit=ROWS)] == \
+        [q.quote_id for q in reference_store.issued_between(0, 2e9, limit=ROWS)]
+
+
+def test_crash_between_store_and_checkpoint_saves_each_quote_once(source, output, tmp_path):
+    expected_summary, expected, reference_store = uninterrupted(source, tmp_path)
+    # Dies partway through saving the third chunk: its rows are written and
+    # some of them stored, but the checkpoint still points at the chunk's start
+    store = FailingStore(tmp_path / "quotes.sqlite3", fail_at=len(reference_store) // 2)
+    with pytest.raises(Interrupted):
+        quote_file(source, output, StubGeocoder(), store=store, chunk_rows=CHUNK_ROWS)
+
+    resumed = quote_file(source, output, StubGeocoder(), store=QuoteStore(store.path), chunk_rows=CHUNK_ROWS)
+
+    assert resumed["rows"] == ROWS and resumed["failed"] == expected_summary["failed"]
+    quotes = read_output(output)
+    pd.testing.assert_frame_equal(quotes, expected)
+    assert quotes["quote_id"].is_unique
+    stored = QuoteStore(store.path).issued_between(0, 2e9, limit=10 * ROWS)
+    assert sorted(q.quote_id for q in stored) == sorted(quotes.loc[quotes["error"].isna(), "quote_id"])
+
+
+def test_each_address_is_geocoded_once_per_chunk(source, tmp_path):
+    geocoder = StubGeocoder()
+    summary = quote_file(source, tmp_path / "quotes.csv", geocoder, chunk_rows=CHUNK_ROWS)
+    chunks = -(-ROWS // CHUNK_ROWS)
+    assert geocoder.calls == 4 * chunks
+    assert summary["failed"] == len([n for n in range(ROWS) if n % 4 == 3])
+
+
+def test_checkpoint_of_another_source_is_refused(source, tmp_path):
+    output = tmp_path / "quotes.csv"
+    with pytest.raises(Interrupted):
+        quote_file(source, output, StubGeocoder(), chunk_rows=CHUNK_ROWS, on_progress=interrupt_after(1))
+    other = tmp_path / "other.csv"
+    write_source(other)
+    with pytest.raises(ValueError, match="another source"):
+        quote_file(other, output, StubGeocoder(), chunk_rows=CHUNK_ROWS)
+    assert quote_file(other, output, StubGeocoder(), chunk_rows=CHUNK_ROWS, resume=False)["resumed_at"] == 0
@@ -0,0 +1,43 @@
+"""The ``python -m shipquote`` command line."""
+import io
+import json
+import os
+
+import geopy.geocoders
+import pytest
+
+from shipquote.cli import main
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "gazetteer-sample.csv")
+
+
+class NoNetwork:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError("offline run built a Nominatim client")
+
+
+def run_quote(monkeypatch, argv, consignments):
+    stdin = io.StringIO("".join(json.dumps(c) + "\n" for c in consignments))
+    stdout = io.StringIO()
+    monkeypatch.setattr("sys.stdin", stdin)
+    monkeypatch.setattr("sys.stdout", stdout)
+    status = main(argv)
+    return status, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("gazetteer", [[], ["--gazetteer", SAMPLE]])
+def test_offline_never_builds_nominatim(monkeypatch, tmp_path, gazetteer):
+    monkeypatch.setattr(geopy.geocoders, "Nominatim", NoNetwork)
+    argv = ["--offline", "--geocode-cache", str(tmp_path / "geocode.sqlite3"), *gazetteer, "quote"]
+
+    status, records = run_quote(monkeypatch, argv, [
+        {"quote_id": "SQ-1", "lots": [86], "address": "Lyon, France"},
+        {"quote_id": "SQ-2", "lots": [86], "address": "12 Nowhere Street, Atlantis"},
+    ])
+
+    assert status == 1
+    assert records[1]["error"].startswith("AddressNotFound")
+    if gazetteer:
+        assert "error" not in records[0] and records[0]["total"] > 0
+    else:
+        assert records[0]["error"].startswith("AddressNotFound")
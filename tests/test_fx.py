@@ -0,0 +1,102 @@
+"""Dated exchange-rate snapshots."""
+import os
+from datetime import date
+
+import pytest
+
+from shipquote.config import DEFAULT_RATES
+from shipquote.fx import FxTable, load_fx
+
+ROWS = [
+    {"date": "2025-01-02", "currency": "USD", "rate": "1.03", "symbol": "$"},
+    {"date": "2025-01-02", "currency": "JPY", "rate": "162.9", "symbol": ""},
+    {"date": "2025-02-03", "currency": "usd", "rate": "1.05", "symbol": ""},
+    {"date": "2025-03-03", "currency": "GBP", "rate": "0.83", "symbol": "£"},
+]
+
+
+@pytest.fixture
+def table():
+    return FxTable.from_rows(ROWS)
+
+
+@pytest.mark.parametrize("on, expected_date, usd", [
+    ("2025-01-02", date(2025, 1, 2), 1.03),
+    ("2025-01-20", date(2025, 1, 2), 1.03),
+    (date(2025, 2, 3), date(2025, 2, 3), 1.05),
+    ("2025-02-28", date(2025, 2, 3), 1.05),
+    ("2030-01-01", date(2025, 3, 3), 1.05),
+])
+def test_snapshot_is_the_latest_on_or_before(table, on, expected_date, usd):
+    snapshot = table.snapshot(on)
+    assert snapshot.date == expected_date
+    assert snapshot.rate("USD") == usd
+    assert snapshot.rate("EUR") == 1.0
+    # JPY was only quoted on the first date and carries forward
+    assert snapshot.rate("JPY") == 162.9
+
+
+def test_currency_appears_from_its_first_date(table):
+    assert "GBP" not in table.snapshot("2025-03-02").currencies
+    assert table.snapshot("2025-03-03").rate("GBP") == 0.83
+
+
+def test_no_snapshot_before_the_first_date(table):
+    with pytest.raises(KeyError):
+        table.snapshot("2025-01-01")
+
+
+def test_as_rates(table):
+    rates = table.snapshot("2025-03-03").as_rates(DEFAULT_RATES)
+    assert rates.currency_rate == {"EUR": 1.0, "GBP": 0.83, "JPY": 162.9, "USD": 1.05}
+    assert rates.currency_symbol == {"EUR": "€", "GBP": "£", "JPY": "¥", "USD": "$"}
+    # Everything but the currencies is left alone
+    assert rates._replace(currency_rate=DEFAULT_RATES.currency_rate,
+                          currency_symbol=DEFAULT_RATES.currency_symbol) == DEFAULT_RATES
+
+
+def test_convert(table):
+    converted = table.snapshot("2025-03-03").convert(
+        {"subtotal": 100.0, "insurance": 2.0, "vat": 20.4, "total": 122.4}, ["EUR", "JPY"])
+    assert converted["EUR"]["total"] == 122.4
+    assert converted["JPY"]["subtotal"] == pytest.approx(16290)
+
+
+@pytest.mark.parametrize("rows", [
+    [],
+    [{"date": "2025-01-02", "currency": "USD"}],
+    [{"date": "2025-01-02", "currency": "USD", "rate": "n/a"}],
+    [{"date": "2025-01-02", "currency": "USD", "rate": "-1"}],
+])
+def test_malformed_rows_are_rejected(rows):
+    with pytest.raises((KeyError, ValueError)):
+        FxTable.from_rows(rows)
+
+
+def write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_load_fx_reloads_and_keeps_the_last_good_table(tmp_path):
+    path = tmp_path / "fx.csv"
+    write(path, "date,currency,rate\n2025-01-02,USD,1.03\n", 1_000_000_000)
+    assert load_fx(path).snapshot("2025-01-02").rate("USD") == 1.03
+
+    write(path, "date,currency,rate\n2025-01-02,USD,1.07\n", 2_000_000_000)
+    good = load_fx(path)
+    assert good.snapshot("2025-01-02").rate("USD") == 1.07
+
+    write(path, "date,currency,rate\n2025-01-02,USD,oops\n", 3_000_000_000)
+    assert load_fx(path) is good
+    path.unlink()
+    assert load_fx(path) is good
+
+
+def test_load_fx_raises_without_a_good_table(tmp_path):
+    path = tmp_path / "fx.csv"
+    with pytest.raises(OSError):
+        load_fx(path)
+    write(path, "date,currency\n2025-01-02,USD\n", 1_000_000_000)
+    with pytest.raises(KeyError):
+        load_fx(path)
@@ -0,0 +1,45 @@
+"""Offline gazetteer lookups."""
+import os
+
+import pytest
+
+from shipquote.gazetteer import FallbackGeocoder, Gazetteer
+from shipquote.geocoding import Place
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "gazetteer-sample.csv")
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer.load(SAMPLE)
+
+
+@pytest.mark.parametrize("query, label", [
+    ("Paris", "Paris, Île-de-France, France"),
+    ("  lyon ,FRANCE ", "Lyon, Auvergne-Rhône-Alpes, France"),
+    ("Lyon, Auvergne-Rhône-Alpes, France", "Lyon, Auvergne-Rhône-Alpes, France"),
+    ("London, United Kingdom", "London, Greater London, England, United Kingdom"),
+])
+def test_known_places(gazetteer, query, label):
+    assert gazetteer.lookup(query).address == label
+
+
+@pytest.mark.parametrize("query", [
+    "12 Rue X, Paris",
+    "Paris, Texas",
+    "Paris, Texas, United States",
+    "10 Downing Street, London",
+    "Lyon, Rhône, France",
+])
+def test_more_specific_addresses_are_not_guessed(gazetteer, query):
+    assert gazetteer.lookup(query) is None
+
+
+def test_misses_fall_through_to_the_online_geocoder(gazetteer):
+    class Online:
+        def geocode(self, query, **kwargs):
+            return Place(query, 33.6609, -95.5555)
+
+    geocoder = FallbackGeocoder(gazetteer, Online())
+    assert geocoder.geocode("Paris, Texas").latitude == 33.6609
+    assert geocoder.geocode("Paris").latitude == 48.8566
@@ -0,0 +1,124 @@
+"""The SQLite geocode cache, on a fake clock."""
+import pytest
+
+from shipquote.geocoding import CachingGeocoder, GeocodeCache, Place, normalize_address
+
+LYON = Place("Lyon, France", 45.764, 4.8357)
+PARIS = Place("Paris, France", 48.8566, 2.3522)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingGeocoder:
+    def __init__(self, places):
+        self.places = places
+        self.calls = 0
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        self.calls += 1
+        found = self.places.get(query)
+        if exactly_one or found is None:
+            return found
+        return [found]
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = GeocodeCache(tmp_path / "geocode.sqlite3", ttl=100, negative_ttl=10, clock=clock)
+    yield cache
+    cache.close()
+
+
+def test_entries_expire_after_their_ttl(cache, clock):
+    cache.put("lyon", [LYON])
+    clock.now += 99
+    assert cache.get("lyon") == [LYON]
+    clock.now += 1
+    assert cache.get("lyon") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_misses_are_cached_for_the_negative_ttl(cache, clock):
+    cache.put("atlantis", [])
+    clock.now += 9
+    assert cache.get("atlantis") == []
+    clock.now += 1
+    assert cache.get("atlantis") is None
+    assert cache.negative_hits == 1
+
+
+def test_put_refreshes_the_expiry(cache, clock):
+    cache.put("lyon", [])
+    clock.now += 5
+    cache.put("lyon", [LYON])
+    clock.now += 50
+    assert cache.get("lyon") == [LYON]
+
+
+def test_eviction_keeps_the_most_recently_used(tmp_path, clock):
+    cache = GeocodeCache(tmp_path / "geocode.sqlite3", max_entries=3, evict_every=1, clock=clock)
+    for key in ("a", "b", "c"):
+        cache.put(key, [LYON])
+        clock.now += 1
+    assert cache.get("a") == [LYON]
+    clock.now += 1
+
+    cache.put("d", [PARIS])
+
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == [[LYON], [LYON], [PARIS]]
+
+
+def test_eviction_drops_expired_entries_first(tmp_path, clock):
+    cache = GeocodeCache(tmp_path / "geocode.sqlite3", ttl=100, negative_ttl=10, max_entries=10,
+                         evict_every=3, clock=clock)
+    cache.put("atlantis", [])
+    cache.put("lyon", [LYON])
+    clock.now += 20
+    cache.put("paris", [PARIS])
+    assert len(cache) == 2
+
+
+def test_cache_is_shared_through_the_file(tmp_path, clock):
+    GeocodeCache(tmp_path / "geocode.sqlite3", clock=clock).put("lyon", [LYON])
+    assert GeocodeCache(tmp_path / "geocode.sqlite3", clock=clock).get("lyon") == [LYON]
+
+
+def test_caching_geocoder(cache, clock):
+    inner = CountingGeocoder({"Lyon": LYON})
+    geocoder = CachingGeocoder(inner, cache)
+
+    assert geocoder.geocode("Lyon") == LYON
+    assert geocoder.geocode("  LYON ") == LYON
+    assert geocoder.geocode("Atlantis") is None
+    assert geocoder.geocode("atlantis") is None
+    assert inner.calls == 2
+    # Suggestions are cached apart from single lookups, per limit
+    assert geocoder.geocode("Lyon", exactly_one=False, limit=5) == [LYON]
+    assert inner.calls == 3
+
+    clock.now += 10
+    assert geocoder.geocode("Atlantis") is None
+    assert inner.calls == 4
+
+
+def test_geocoder_errors_are_not_cached(cache):
+    class Failing:
+        def geocode(self, query, **kwargs):
+            raise TimeoutError
+
+    with pytest.raises(TimeoutError):
+        CachingGeocoder(Failing(), cache).geocode("Lyon")
+    assert cache.get(normalize_address("Lyon")) is None
@@ -0,0 +1,40 @@
+"""Entry points import without the modules only some features need.
+
+Timing is left to ``benchmarks/import_budget.py``; this checks the part that
+does not depend on the machine - what gets imported - in a fresh interpreter.
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_spec = importlib.util.spec_from_file_location("import_budget", os.path.join(ROOT, "benchmarks", "import_budget.py"))
+import_budget = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(import_budget)
+
+# Vectorized batch quoting is the numpy/pandas-heavy path; nothing loads it at startup
+DEFERRED_SHIPQUOTE = ("shipquote.batch",)
+
+
+def loaded_modules(statement):
+    code = f"import json, sys\n{statement}\nprint(json.dumps(sorted(sys.modules)))"
+    child = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(json.loads(child.stdout))
+
+
+def test_package_import_loads_nothing_else():
+    modules = loaded_modules("import shipquote")
+    assert {m for m in modules if m.startswith("shipquote")} == {"shipquote"}
+    assert "numpy" not in modules
+
+
+@pytest.mark.parametrize("name, statement", sorted(import_budget.entry_points().items()))
+def test_entry_point_defers_heavy_modules(name, statement):
+    modules = loaded_modules(statement)
+    eager = [m for m in (*import_budget.DEFERRED, *DEFERRED_SHIPQUOTE) if m in modules]
+    assert not eager, f"{name} imports {eager} at startup"
@@ -0,0 +1,80 @@
+"""``IncrementalQuote`` against quoting from scratch with ``calculate_shipping``."""
+import numpy as np
+import pytest
+
+from shipquote.catalog import DEMO_CATALOG
+from shipquote.config import DELIVERY_TYPES, PACKING_TYPES
+from shipquote.engine import calculate_shipping
+from shipquote.geocoding import Place
+from shipquote.incremental import IncrementalQuote
+
+ADDRESSES = {
+    "Paris": Place("Paris, France", 48.8566, 2.3522),
+    "Marseille": Place("Marseille, France", 43.2965, 5.3698),
+    "Berlin": Place("Berlin, Germany", 52.52, 13.405),
+    "Madrid": Place("Madrid, Spain", 40.4168, -3.7038),
+}
+
+
+class StubGeocoder:
+    def __init__(self, places=ADDRESSES):
+        self.places = dict(places)
+        self.calls = 0
+
+    def geocode(self, address, timeout=None):
+        self.calls += 1
+        return self.places.get(address)
+
+
+def edits(seed, steps=60):
+    """Inputs for a random editing session, one field changed at a time."""
+    rng = np.random.default_rng(seed)
+    lots = list(DEMO_CATALOG.keys())
+    state = {"lots": lots[:2], "packing": PACKING_TYPES[1], "delivery": DELIVERY_TYPES[0],
+             "address": "Paris", "include_insurance": True, "consolidate": False}
+    for _ in range(steps):
+        field = rng.choice(list(state))
+        if field == "lots":
+            chosen = rng.choice(lots, size=rng.integers(1, 8), replace=False)
+            state["lots"] = [lot.item() for lot in chosen]
+        elif field == "packing":
+            state["packing"] = str(rng.choice(PACKING_TYPES))
+        elif field == "delivery":
+            state["delivery"] = str(rng.choice(DELIVERY_TYPES))
+        elif field == "address":
+            state["address"] = str(rng.choice(list(ADDRESSES)))
+        else:
+            state[field] = not state[field]
+        yield dict(state)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_edits_match_calculate_shipping(seed):
+    geocoder = StubGeocoder()
+    quote = IncrementalQuote(geocoder=geocoder)
+    for inputs in edits(seed):
+        result = quote.update(**inputs)
+        expected = calculate_shipping(geocoder=geocoder, **inputs)
+        # Exact equality: the stages must do the same float operations in the same order
+        assert result == expected, inputs
+
+
+def test_insurance_toggle_only_reruns_totals():
+    quote = IncrementalQuote(geocoder=StubGeocoder())
+    lots = list(DEMO_CATALOG.keys())[:3]
+    quote.update(lots, "Wood crate", "Curbside", "Paris")
+    quote.update(lots, "Wood crate", "Curbside", "Paris", include_insurance=False)
+    assert quote.reused() == ["distance", "lot_base", "adders"]
+
+
+def test_unknown_address_is_retried():
+    geocoder = StubGeocoder()
+    quote = IncrementalQuote(geocoder=geocoder)
+    lots = list(DEMO_CATALOG.keys())[:2]
+
+    result = quote.update(lots, "Wood crate", "Curbside", "Lille")
+    assert result["address"] == "Lille" and "AddressNotFound" in result["error"]
+
+    geocoder.places["Lille"] = Place("Lille, France", 50.6292, 3.0573)
+    assert quote.update(lots, "Wood crate", "Curbside", "Lille") == \
+        calculate_shipping(lots, "Wood crate", "Curbside", "Lille", geocoder=geocoder)
@@ -0,0 +1,106 @@
+"""``plan_packing`` against brute force on small consignments."""
+import numpy as np
+import pytest
+
+from shipquote.catalog import LotCatalog
+from shipquote.config import CONTAINERS, DEFAULT_RATES, OVERSIZE_PACKING
+from shipquote.engine import suggest_packing_for_lots
+from shipquote.packing import _cheapest, _exact, _options, plan_packing
+
+MATERIALS = {"rigid": "Glass", "flat": "Photograph", "canvas": "Canvas"}
+
+
+def partitions(items):
+    """Every way to split ``items`` into non-empty groups."""
+    if not items:
+        yield []
+        return
+    first, rest = items[0], items[1:]
+    for groups in partitions(rest):
+        yield [[first]] + groups
+        for k in range(len(groups)):
+            yield groups[:k] + [[first] + groups[k]] + groups[k + 1:]
+
+
+def brute_force(weights, options):
+    best = float("inf")
+    for groups in partitions(list(range(len(weights)))):
+        cost = 0
+        for group in groups:
+            fit = _cheapest(options, sum(weights[i] for i in group), len(group))
+            if fit is None:
+                break
+            cost += fit[0]
+        else:
+            best = min(best, cost)
+    return best
+
+
+def random_weights(rng, n, klass):
+    largest = max(capacity for _, capacity, _, _ in _options(klass, CONTAINERS, DEFAULT_RATES))
+    return [float(w) for w in rng.integers(1, largest + 1, size=n)]
+
+
+@pytest.mark.parametrize("klass", sorted(MATERIALS))
+@pytest.mark.parametrize("seed", range(6))
+def test_exact_matches_brute_force(klass, seed):
+    rng = np.random.default_rng(seed)
+    options = _options(klass, CONTAINERS, DEFAULT_RATES)
+    weights = random_weights(rng, int(rng.integers(1, 8)), klass)
+
+    cost, groups = _exact(weights, options, deadline=float("inf"))
+
+    assert cost == pytest.approx(brute_force(weights, options))
+    assert sorted(i for group in groups for i in group) == list(range(len(weights)))
+    assert sum(_cheapest(options, sum(weights[i] for i in group), len(group))[0]
+               for group in groups) == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_plan_is_optimal_for_small_consignments(seed):
+    rng = np.random.default_rng(seed)
+    records = {}
+    for lot in range(1, int(rng.integers(2, 9))):
+        klass = sorted(MATERIALS)[int(rng.integers(3))]
+        records[lot] = {"weight": "Light", "material": MATERIALS[klass],
+                        "weight_kg": int(rng.integers(1, 120))}
+    catalog = LotCatalog.from_mapping(records)
+
+    plan = plan_packing(list(records), catalog=catalog, time_limit=10)
+
+    expected = 0
+    for klass, material in MATERIALS.items():
+        options = _options(klass, CONTAINERS, DEFAULT_RATES)
+        largest = max(capacity for _, capacity, _, _ in options)
+        weights = [float(r["weight_kg"]) for r in records.values() if r["material"] == material]
+        oversize = [w for w in weights if w > largest]
+        expected += len(oversize) * DEFAULT_RATES.packing_cost[OVERSIZE_PACKING]
+        expected += brute_force([w for w in weights if w <= largest], options)
+    assert plan.exact
+    assert plan.cost == pytest.approx(expected)
+    assert sorted(lot for c in plan.containers for lot in c.lots) == list(records)
+
+
+def test_class_without_containers_ships_oversize():
+    catalog = LotCatalog.from_mapping({
+        1: {"weight": "Light", "material": "Photograph", "weight_kg": 0},
+        2: {"weight": "Light", "material": "Canvas", "weight_kg": 3},
+    })
+    containers = {"Bubble wrap": CONTAINERS["Bubble wrap"]}
+
+    plan = plan_packing([1, 2], catalog=catalog, containers=containers)
+
+    assert [(c.packing, c.lots) for c in plan.containers] == [
+        (OVERSIZE_PACKING, [1]), ("Bubble wrap", [2])]
+
+
+def test_suggestion_follows_the_plan():
+    catalog = LotCatalog.from_mapping({
+        1: {"weight": "Light", "material": "Glass", "weight_kg": 10},
+        2: {"weight": "Light", "material": "Metal", "weight_kg": 20},
+        3: {"weight": "Light", "material": "Photograph", "weight_kg": 2},
+    })
+    packing, note = suggest_packing_for_lots([1, 2, 3, 99], catalog)
+    assert packing == "Wood crate"
+    assert "1 × Wood crate, 1 × Cardboard box" in note
+    assert suggest_packing_for_lots([], catalog)[0] == "Automatic (AI)"
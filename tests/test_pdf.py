@@ -0,0 +1,57 @@
+"""Large-document layout of long breakdowns."""
+import math
+import re
+from datetime import datetime
+
+import pytest
+
+from shipquote.catalog import DEMO_CATALOG
+from shipquote.config import DEFAULT_RATES
+from shipquote.engine import convert_result, price_quote
+from shipquote.pdf import LONG_TABLE_ROWS, ROWS_PER_PAGE, generate_branded_pdf, get_template
+
+ISSUED = datetime(2025, 3, 1, 9, 30)
+LOTS = [list(DEMO_CATALOG)[n % len(DEMO_CATALOG)] for n in range(3 * LONG_TABLE_ROWS + 7)]
+
+
+@pytest.fixture(scope="module")
+def result():
+    return price_quote(LOTS, "Wood crate", "Curbside", 392, 1.37)
+
+
+def tables(result, currency="EUR"):
+    pages = get_template().breakdown_pages(result["breakdown"], result["prices"], currency, DEFAULT_RATES)
+    return [flowable._cellvalues for flowable in pages if hasattr(flowable, "_cellvalues")]
+
+
+def amount(cell):
+    return float(cell.lstrip("€").replace(",", ""))
+
+
+def test_long_breakdown_pages(result):
+    pdf = generate_branded_pdf("SQ-1", "Ada", "Lyon, France", "Wood crate", "Curbside",
+                               result["breakdown"], result, "EUR", issued=ISSUED).getvalue()
+
+    # The summary page, then ROWS_PER_PAGE rows per breakdown page
+    pages = len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+    assert pages == 1 + math.ceil(len(LOTS) / ROWS_PER_PAGE)
+
+
+def test_page_subtotals_add_up_to_the_summary(result):
+    pages = tables(result)
+    assert len(pages) == math.ceil(len(LOTS) / ROWS_PER_PAGE)
+    assert sum(len(page) - 3 for page in pages) == len(LOTS)
+
+    running = 0
+    for page in pages:
+        running += amount(page[-2][-1])
+        assert amount(page[-1][-1]) == pytest.approx(running, abs=0.01)
+        assert page[-1][0] == "Running total" or page is pages[-1]
+    assert pages[-1][-1][0] == "Subtotal"
+    assert pages[-1][-1][-1] == f"€{result['subtotal']:,.2f}"
+
+
+def test_other_currencies_reconcile_with_the_summary(result):
+    label = tables(result, "USD")[-1][-1][0]
+    usd = convert_result(result, "USD")["subtotal"]
+    assert label == f"Subtotal = {DEFAULT_RATES.currency_symbol['USD']}{usd:,.2f}"
@@ -0,0 +1,130 @@
+"""Content-addressed PDF cache."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from shipquote.bulk import render_bulk
+from shipquote.config import DEFAULT_RATES
+from shipquote.engine import price_quote
+from shipquote.pdf import render_quote_pdf
+from shipquote.pdfcache import PdfCache, get_default_pdf_cache, pdf_key, set_default_pdf_cache
+
+ISSUED = datetime(2025, 3, 1, 9, 30)
+RESULT = price_quote([86, 87], "Wood crate", "Curbside", 392, 1.5)
+QUOTE = ("SQ-1", "Ada", "Lyon, France", "Wood crate", "Curbside", RESULT["breakdown"], RESULT, "EUR")
+
+
+def key(**changes):
+    names = ("quote_id", "client", "address", "packing", "delivery", "breakdown", "result", "currency")
+    args = {**dict(zip(names, QUOTE)), "rates": DEFAULT_RATES, "issued": ISSUED, **changes}
+    return pdf_key(**args)
+
+
+def test_key_is_stable():
+    assert key() == key()
+    assert len(key()) == 64
+    # Only the day is printed
+    assert key(issued=datetime(2025, 3, 1, 18)) == key()
+    # Amounts that print the same are the same PDF
+    assert key(result={**RESULT, "total": RESULT["total"] + 1e-9}) == key()
+
+
+@pytest.mark.parametrize("changes", [
+    {"quote_id": "SQ-2"},
+    {"client": "Ada "},
+    {"client": ""},
+    {"address": "Lyon,  France"},
+    {"packing": "Cardboard box"},
+    {"delivery": "Front delivery"},
+    {"breakdown": [RESULT["breakdown"][0][:-1] + ["1.00"], *RESULT["breakdown"][1:]]},
+    {"result": {**RESULT, "total": RESULT["total"] + 0.01}},
+    {"currency": "USD"},
+    {"rates": DEFAULT_RATES._replace(vat_rate=0.21)},
+    {"rates": DEFAULT_RATES._replace(currency_symbol={**DEFAULT_RATES.currency_symbol, "EUR": "EUR "})},
+    {"issued": datetime(2025, 3, 2, 9, 30)},
+])
+def test_any_printed_change_changes_the_key(changes):
+    assert key(**changes) != key()
+
+
+def test_memory_layer_evicts_least_recently_used():
+    cache = PdfCache(max_bytes=30)
+    for name in "abc":
+        cache.put(name, name.encode() * 10)
+    assert cache.get("a") == b"a" * 10
+    cache.put("d", b"d" * 10)
+
+    assert cache.get("b") is None
+    assert [cache.get(name) is not None for name in "acd"] == [True, True, True]
+    assert cache.stats()["bytes"] == 30 and len(cache) == 3
+    # Anything larger than the whole cache is not kept
+    cache.put("huge", b"x" * 31)
+    assert cache.get("huge") is None and len(cache) == 3
+
+
+def test_disk_layer_is_shared(tmp_path):
+    first = PdfCache(directory=tmp_path)
+    first.put("k", b"%PDF one")
+    assert (tmp_path / "k.pdf").read_bytes() == b"%PDF one"
+
+    second = PdfCache(directory=tmp_path)
+    assert second.get("k") == b"%PDF one"
+    assert second.get("k") == b"%PDF one"
+    assert second.get("missing") is None
+    assert (second.hits, second.misses) == (2, 1)
+    assert len(second) == 1
+
+
+def test_trim_deletes_least_recently_used_files(tmp_path):
+    cache = PdfCache(directory=tmp_path, max_disk_bytes=25)
+    for n, name in enumerate("abc"):
+        cache.put(name, name.encode() * 10)
+        os.utime(tmp_path / f"{name}.pdf", (1_000_000 + n, 1_000_000 + n))
+    # Reading a file marks it used
+    PdfCache(directory=tmp_path).get("a")
+
+    cache.trim()
+
+    assert sorted(os.listdir(tmp_path)) == ["a.pdf", "c.pdf"]
+
+
+def test_get_or_render_renders_once():
+    cache = PdfCache()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return b"%PDF"
+
+    assert cache.get_or_render("k", render) == cache.get_or_render("k", render) == b"%PDF"
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def process_cache():
+    previous = get_default_pdf_cache()
+    cache = PdfCache()
+    set_default_pdf_cache(cache)
+    yield cache
+    set_default_pdf_cache(previous)
+
+
+def test_interactive_renders_are_cached(process_cache):
+    consignment = {"quote_id": "SQ-1", "client": "Ada", "address": "Lyon", "packing": "Wood crate",
+                   "delivery": "Curbside", "currency": "EUR"}
+    pdf = render_quote_pdf(consignment, RESULT, issued=ISSUED)
+    assert render_quote_pdf(consignment, RESULT, issued=ISSUED) is pdf
+    assert len(process_cache) == 1
+
+
+def test_bulk_rendering_bypasses_the_cache(process_cache, tmp_path):
+    quotes = [({"quote_id": f"SQ-{n}", "client": "", "address": "Lyon", "packing": "Wood crate",
+                "delivery": "Curbside", "currency": "EUR"}, RESULT) for n in range(3)]
+    with ThreadPoolExecutor(2) as executor:
+        summary = render_bulk(quotes, tmp_path / "pdfs", executor=executor)
+
+    assert summary == {"rendered": 3, "failed": {}}
+    assert sorted(os.listdir(tmp_path / "pdfs")) == [f"ShipQuote_SQ-{n}.pdf" for n in range(3)]
+    assert len(process_cache) == 0 and process_cache.misses == 0
@@ -0,0 +1,104 @@
+"""Rate card validation and hot reload."""
+import json
+import os
+
+import pytest
+
+from shipquote.catalog import DEMO_CATALOG, LotCatalog
+from shipquote.config import DEFAULT_RATES
+from shipquote.ratecard import load_rate_card, rates_from_dict, tables
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rate-card.json")
+
+BRONZES = LotCatalog.from_mapping({
+    1: {"weight": "Light", "material": "Bronze", "weight_kg": 12},
+    2: {"weight": "Heavy", "material": "Canvas", "weight_kg": 40},
+})
+BRONZE_MULT = {"Canvas": 1, "Bronze": 1.8}
+
+
+def write(path, card, mtime):
+    path.write_text(card if isinstance(card, str) else json.dumps(card), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_sample_card_loads():
+    rates = load_rate_card(SAMPLE)
+    assert set(rates._fields) == set(DEFAULT_RATES._fields)
+    assert tables(rates).distance_multiplier(0) == rates.distance_bands[0][1]
+
+
+def test_fields_left_out_keep_their_defaults():
+    rates = rates_from_dict({"base_rate": 220, "distance_bands": [[100, 1], [500, 1.3]]})
+    assert rates.base_rate == 220
+    assert rates.distance_bands == ((100, 1), (500, 1.3))
+    assert rates.material_mult == DEFAULT_RATES.material_mult
+
+
+@pytest.mark.parametrize("card", [
+    [],
+    {"base_rte": 220},
+    {"base_rate": "220"},
+    {"base_rate": True},
+    {"weight_mult": []},
+    {"weight_mult": {}},
+    {"weight_mult": {"Light": 1}},
+    {"material_mult": {"Canvas": 1}},
+    {"packing_cost": {"Wood crate": 80}},
+    {"delivery_cost": {"Front delivery": "free"}},
+    {"currency_symbol": ["€"]},
+    {"currency_rate": {"EUR": 1, "CHF": 0.95}},
+    {"distance_bands": 50},
+    {"distance_bands": [[50]]},
+    {"distance_bands": [[300, 1.2], [50, 1]]},
+])
+def test_invalid_cards_are_rejected(card):
+    with pytest.raises(ValueError):
+        rates_from_dict(card)
+
+
+def test_coverage_is_checked_against_the_priced_catalog():
+    card = {"material_mult": BRONZE_MULT}
+    assert rates_from_dict(card, catalog=BRONZES).material_mult == BRONZE_MULT
+    with pytest.raises(ValueError, match="Metal"):
+        rates_from_dict(card)
+    with pytest.raises(ValueError, match="Bronze"):
+        rates_from_dict({}, catalog=BRONZES)
+
+
+def test_load_rate_card_per_catalog(tmp_path):
+    path = tmp_path / "card.json"
+    write(path, {"material_mult": BRONZE_MULT}, 1_000_000_000)
+    assert load_rate_card(path, catalog=BRONZES).material_mult == BRONZE_MULT
+    with pytest.raises(ValueError):
+        load_rate_card(path, catalog=DEMO_CATALOG)
+
+
+def test_reload_and_keep_the_last_good_card(tmp_path):
+    path = tmp_path / "card.json"
+    write(path, {"base_rate": 220}, 1_000_000_000)
+    assert load_rate_card(path).base_rate == 220
+    assert load_rate_card(path) is load_rate_card(path)
+
+    write(path, {"base_rate": 240}, 2_000_000_000)
+    good = load_rate_card(path)
+    assert good.base_rate == 240
+
+    for n, broken in enumerate(['{"base_rate": ', {"base_rate": "cheap"}, {"weight_mult": ["Light"]},
+                                {"distance_bands": [[50, 1], 300]}, [1, 2]]):
+        write(path, broken, 3_000_000_000 + n)
+        assert load_rate_card(path) is good
+    path.unlink()
+    assert load_rate_card(path) is good
+
+    write(path, {"base_rate": 260}, 4_000_000_000)
+    assert load_rate_card(path).base_rate == 260
+
+
+def test_first_load_of_a_bad_card_raises(tmp_path):
+    path = tmp_path / "card.json"
+    with pytest.raises(OSError):
+        load_rate_card(path)
+    write(path, {"weight_mult": {"Light": 1}}, 1_000_000_000)
+    with pytest.raises(ValueError):
+        load_rate_card(path)
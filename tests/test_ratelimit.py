@@ -0,0 +1,233 @@
+"""``RateLimitedGeocoder`` ordering, coalescing and shedding, on a fake clock.
+
+Tokens only refill when a test advances the clock, so which request is
+served next never depends on thread scheduling or machine speed.
+"""
+import threading
+import time
+
+import pytest
+
+from shipquote import metrics
+from shipquote.engine import locate_address
+from shipquote.geocoding import Place
+from shipquote.incremental import IncrementalQuote
+from shipquote.ratelimit import QUOTE, SUGGEST, RateLimitedGeocoder, RateLimitExceeded
+
+LYON = Place("Lyon, France", 45.764, 4.8357)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingGeocoder:
+    """Answers every query with LYON, optionally holding each call until released."""
+
+    def __init__(self, hold=False, error=None):
+        self.calls = []
+        self.error = error
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def geocode(self, query, exactly_one=True, limit=None, **kwargs):
+        self.calls.append(query)
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return LYON if exactly_one else [LYON]
+
+
+def eventually(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class Harness:
+    def __init__(self, geocoder=None, **kwargs):
+        self.clock = FakeClock()
+        self.inner = geocoder or RecordingGeocoder()
+        self.limiter = RateLimitedGeocoder(self.inner, clock=self.clock, **kwargs)
+        self.results = {}
+        self.threads = []
+
+    def start(self, name, query, **kwargs):
+        def run():
+            try:
+                self.results[name] = self.limiter.geocode(query, **kwargs)
+            except Exception as e:
+                self.results[name] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        return thread
+
+    def queued(self, depth):
+        eventually(lambda: self.limiter.stats()["queue_depth"] == depth)
+
+    def tick(self, seconds=1.0):
+        """Advance the clock and wake the waiters."""
+        self.clock.now += seconds
+        with self.limiter._cond:
+            self.limiter._cond.notify_all()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(5)
+            assert not thread.is_alive()
+
+
+@pytest.fixture
+def harness():
+    return Harness(rate=1.0, burst=1)
+
+
+def test_first_request_uses_the_burst(harness):
+    assert harness.limiter.geocode("Lyon") == LYON
+    assert harness.inner.calls == ["Lyon"]
+
+
+def test_quotes_go_ahead_of_suggestions(harness):
+    harness.limiter.geocode("warm up")
+    harness.start("s1", "Par", exactly_one=False, limit=5)
+    harness.queued(1)
+    harness.start("s2", "Mars", exactly_one=False, limit=5)
+    harness.queued(2)
+    harness.start("q1", "Lille")
+    harness.queued(3)
+    harness.start("q2", "Nice", priority=SUGGEST)
+    harness.queued(4)
+
+    for served in range(2, 6):
+        harness.tick()
+        eventually(lambda: len(harness.inner.calls) == served)
+    harness.join()
+
+    assert harness.inner.calls == ["warm up", "Lille", "Par", "Mars", "Nice"]
+    assert harness.results["q1"] == LYON and harness.results["s1"] == [LYON]
+
+
+def test_no_request_before_a_token(harness):
+    harness.limiter.geocode("warm up")
+    harness.start("q", "Lille")
+    harness.queued(1)
+    harness.tick(0.5)
+    time.sleep(0.05)
+    assert harness.inner.calls == ["warm up"]
+    harness.tick(0.5)
+    harness.join()
+    assert harness.inner.calls == ["warm up", "Lille"]
+
+
+def test_identical_queries_share_one_request():
+    harness = Harness(RecordingGeocoder(hold=True), rate=1.0, burst=1)
+    harness.start("first", "Lyon, France")
+    eventually(lambda: harness.inner.calls)
+    harness.start("second", "  lyon ,FRANCE ")
+    eventually(lambda: harness.limiter.stats()["coalesced"] == 1)
+    harness.inner.release.set()
+    harness.join()
+
+    assert harness.inner.calls == ["Lyon, France"]
+    assert harness.results == {"first": LYON, "second": LYON}
+    assert harness.limiter.stats()["requests"] == 1
+
+
+def test_waiting_quote_promotes_a_queued_suggestion(harness):
+    harness.limiter.geocode("warm up")
+    harness.start("other", "Mars", exactly_one=False, limit=5)
+    harness.queued(1)
+    harness.start("suggest", "Lille", exactly_one=False, limit=5)
+    harness.queued(2)
+    harness.start("quote", "Lille", exactly_one=False, limit=5, priority=QUOTE)
+    eventually(lambda: harness.limiter.stats()["coalesced"] == 1)
+
+    harness.tick()
+    eventually(lambda: len(harness.inner.calls) == 2)
+    harness.tick()
+    harness.join()
+
+    assert harness.inner.calls == ["warm up", "Lille", "Mars"]
+    assert harness.results["quote"] == harness.results["suggest"] == [LYON]
+
+
+def test_followers_get_the_leaders_error():
+    harness = Harness(RecordingGeocoder(hold=True, error=ConnectionError("down")), rate=1.0, burst=1)
+    harness.start("first", "Lyon")
+    eventually(lambda: harness.inner.calls)
+    harness.start("second", "Lyon")
+    eventually(lambda: harness.limiter.stats()["coalesced"] == 1)
+    harness.inner.release.set()
+    harness.join()
+
+    assert isinstance(harness.results["first"], ConnectionError)
+    assert harness.results["second"] is harness.results["first"]
+    # The failed flight is forgotten, so the next lookup asks again
+    harness.inner.error = None
+    harness.tick()
+    assert harness.limiter.geocode("Lyon") == LYON
+    assert harness.inner.calls == ["Lyon", "Lyon"]
+
+
+def test_suggestions_are_shed_when_the_queue_is_full():
+    harness = Harness(rate=1.0, burst=1, max_suggest_queue=1)
+    harness.limiter.geocode("warm up")
+    harness.start("waiting", "Par", exactly_one=False, limit=5)
+    harness.queued(1)
+
+    with pytest.raises(RateLimitExceeded, match="queue full"):
+        harness.limiter.geocode("Mars", exactly_one=False, limit=5)
+    # Quotes are never shed for queue depth
+    harness.start("quote", "Lille")
+    harness.queued(2)
+    assert harness.limiter.stats()["shed"] == 1
+
+    harness.tick()
+    eventually(lambda: len(harness.inner.calls) == 2)
+    harness.tick()
+    harness.join()
+    assert harness.inner.calls == ["warm up", "Lille", "Par"]
+
+
+def test_requests_are_shed_after_their_max_wait():
+    harness = Harness(rate=0.1, burst=1, max_wait=20, suggest_max_wait=2)
+    harness.limiter.geocode("warm up")
+    harness.start("suggest", "Par", exactly_one=False, limit=5)
+    harness.queued(1)
+    harness.start("quote", "Lille")
+    harness.queued(2)
+
+    harness.tick(3)
+    eventually(lambda: "suggest" in harness.results)
+    assert isinstance(harness.results["suggest"], RateLimitExceeded)
+    assert "quote" not in harness.results
+
+    harness.tick(7)
+    harness.join()
+    assert harness.results["quote"] == LYON
+    assert harness.limiter.stats()["shed"] == 1
+    assert harness.inner.calls == ["warm up", "Lille"]
+
+
+def test_throttled_lookup_is_reported_not_priced(monkeypatch):
+    metrics.REGISTRY.reset()
+    monkeypatch.setattr(metrics.REGISTRY, "enabled", True)
+    limiter = RateLimitedGeocoder(RecordingGeocoder(), rate=1.0, burst=1, max_wait=0, clock=FakeClock())
+    limiter.geocode("warm up")
+
+    with pytest.raises(RateLimitExceeded):
+        locate_address("Lille", limiter)
+    counters = {(c["name"], c["labels"].get("error")): c["value"] for c in metrics.snapshot()["counters"]}
+    assert counters[("geocode_errors", "RateLimitExceeded")] == 1
+
+    result = IncrementalQuote(geocoder=limiter).update([86], "Wood crate", "Curbside", "Lille")
+    assert result["address"] == "Lille" and result["error"].startswith("RateLimitExceeded")
+    metrics.REGISTRY.reset()
@@ -0,0 +1,133 @@
+"""``QuoteService`` driven as an ASGI application, with a stub geocoder."""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from geopy.location import Location
+
+from shipquote.engine import measure_distance, price_quote
+from shipquote.geocoding import Place
+from shipquote.service import QuoteService
+from shipquote.store import QuoteStore
+
+LYON = Location("Lyon, France", (45.764, 4.8357), {})
+
+
+class StubGeocoder:
+    def geocode(self, address, timeout=None, **kwargs):
+        if address == "Broken":
+            raise ConnectionError("geocoder down")
+        return LYON if address == "Lyon" else None
+
+
+def call(service, method, path, body=b""):
+    """``(status, headers, body)`` of one request."""
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": b""}
+    asyncio.run(service(scope, receive, send))
+    start, response = sent
+    return start["status"], dict(start["headers"]), response["body"]
+
+
+@pytest.fixture
+def store():
+    store = QuoteStore(":memory:")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def service(store):
+    service = QuoteService(geocoder=StubGeocoder(), store=store, pdf_executor=ThreadPoolExecutor(1))
+    yield service
+    service.close()
+
+
+def test_quote(service, store):
+    status, headers, body = call(service, "POST", "/quote", {
+        "quote_id": "SQ-1", "lots": [86, 87], "address": "Lyon", "packing": "Wood crate"})
+
+    assert status == 200 and headers[b"content-type"] == b"application/json"
+    record = json.loads(body)
+    km, dist_mult = measure_distance(LYON)
+    expected = price_quote([86, 87], "Wood crate", "Front delivery", km, dist_mult)
+    assert record["quote_id"] == "SQ-1"
+    assert record["total"] == round(expected["total"], 2)
+    assert store.get("SQ-1").place == Place("Lyon, France", 45.764, 4.8357)
+
+
+def test_pdf_and_stored_quote(service):
+    status, headers, body = call(service, "POST", "/quote/pdf", {
+        "quote_id": "SQ-2", "client": "Ada", "lots": "86;87", "address": "Lyon"})
+    assert status == 200 and headers[b"content-type"] == b"application/pdf"
+    assert body.startswith(b"%PDF")
+
+    status, _, body = call(service, "GET", "/quote/SQ-2")
+    assert status == 200 and json.loads(body)["client"] == "Ada"
+    status, _, body = call(service, "GET", "/quote/SQ-2/pdf")
+    assert status == 200 and body.startswith(b"%PDF")
+
+
+@pytest.mark.parametrize("payload", [
+    b"not json",
+    b"[1, 2]",
+    {"address": "Lyon"},
+    {"lots": [], "address": "Lyon"},
+    {"lots": [86], "address": None},
+    {"lots": [86], "address": "Lyon", "packing": []},
+    {"lots": [86], "address": "Lyon", "delivery": {"by": "air"}},
+    {"lots": [86], "address": "Lyon", "currency": ["EUR"]},
+    {"lots": [86], "address": "Lyon", "currency": "XXX"},
+    {"lots": [86], "address": "Lyon", "quote_id": 7},
+    {"lots": [86], "address": "Lyon", "client": ["Ada"]},
+    {"lots": [[86]], "address": "Lyon"},
+    {"lots": [999999], "address": "Lyon"},
+])
+def test_invalid_consignment_is_400(service, store, payload):
+    status, _, body = call(service, "POST", "/quote", payload)
+    assert status == 400, body
+    assert "error" in json.loads(body)
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize("address, status", [("Atlantis", 422), ("Broken", 503)])
+def test_address_not_located(service, store, address, status):
+    assert call(service, "POST", "/quote", {"lots": [86], "address": address})[0] == status
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize("method, path, status", [
+    ("GET", "/quote/SQ-UNKNOWN", 404),
+    ("GET", "/quote/SQ-UNKNOWN/pdf", 404),
+    ("GET", "/nowhere", 404),
+    ("GET", "/quote", 405),
+    ("GET", "/healthz", 200),
+])
+def test_routes(service, method, path, status):
+    assert call(service, method, path)[0] == status
+
+
+def test_consolidated_quote_is_priced_off_the_event_loop(service, monkeypatch):
+    threads = []
+
+    def price_quote_spy(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return price_quote(*args, **kwargs)
+
+    monkeypatch.setattr("shipquote.service.price_quote", price_quote_spy)
+    for consolidate in (True, False):
+        status, _, body = call(service, "POST", "/quote", {
+            "lots": [86, 87, 88], "address": "Lyon", "consolidate": consolidate})
+        assert status == 200, body
+    assert threads[0].startswith("geocode") and threads[1] == threading.main_thread().name
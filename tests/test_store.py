@@ -0,0 +1,126 @@
+"""The append-only quote store."""
+import sqlite3
+from datetime import datetime
+
+import pytest
+from geopy.location import Location
+
+from shipquote.config import DEFAULT_RATES
+from shipquote.engine import price_quote
+from shipquote.geocoding import Place
+from shipquote.store import QuoteStore, render_stored_pdf
+
+LYON = Place("Lyon, France", 45.764, 4.8357)
+
+
+def consignment(quote_id="SQ-1", client="Ada", currency="EUR", lots=(86, 87)):
+    return {"quote_id": quote_id, "client": client, "lots": list(lots), "packing": "Wood crate",
+            "delivery": "Curbside", "address": "Lyon", "include_insurance": True,
+            "consolidate": False, "currency": currency}
+
+
+def priced(c):
+    return price_quote(c["lots"], c["packing"], c["delivery"], 392, 1.5)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(tmp_path / "quotes.sqlite3")
+    yield store
+    store.close()
+
+
+def test_save_and_get(store):
+    c = consignment(currency="USD")
+    saved = store.save(c, priced(c), LYON, issued_at=datetime(2025, 3, 1, 12))
+
+    quote = store.get("SQ-1")
+    assert quote == saved
+    assert quote.consignment == c and quote.result == priced(c)
+    assert quote.place == LYON
+    assert quote.issued_at == datetime(2025, 3, 1, 12)
+    assert (quote.currency_rate, quote.currency_symbol) == (1.1, "$")
+    assert (quote.insurance_rate, quote.vat_rate) == (DEFAULT_RATES.insurance_rate, DEFAULT_RATES.vat_rate)
+    assert store.get("SQ-UNKNOWN") is None
+
+
+def test_geopy_location_is_stored_as_place(store):
+    c = consignment()
+    store.save(c, priced(c), Location(LYON.address, (LYON.latitude, LYON.longitude), {}))
+    assert store.get("SQ-1").place == LYON
+
+
+def test_saving_again_appends_a_revision(store):
+    c = consignment()
+    first = store.save(c, priced(c), LYON)
+    c2 = consignment(lots=(86,))
+    second = store.save(c2, priced(c2), LYON)
+
+    assert second.revision > first.revision
+    assert store.get("SQ-1") == second
+    assert store.history("SQ-1") == [first, second]
+    assert len(store) == 2
+
+
+def test_if_changed_keeps_an_unchanged_revision(store):
+    c = consignment()
+    first = store.save(c, priced(c), LYON, issued_at=datetime(2025, 3, 1), if_changed=True)
+    again = store.save(c, priced(c), LYON, issued_at=datetime(2025, 3, 2), if_changed=True)
+    assert again == first and len(store) == 1
+
+    # Any printed rate changing is a new revision
+    vat = DEFAULT_RATES._replace(vat_rate=0.21)
+    changed = store.save(c, priced(c), LYON, rates=vat, if_changed=True)
+    assert changed.revision > first.revision and changed.vat_rate == 0.21
+    assert len(store) == 2
+
+
+def test_lookups_by_client_and_date(store):
+    for n, (client, day) in enumerate([("Ada", 1), ("Bob", 2), ("Ada", 3), ("Ada", 5)]):
+        c = consignment(f"SQ-{n}", client)
+        store.save(c, priced(c), LYON, issued_at=datetime(2025, 3, day))
+
+    assert [q.quote_id for q in store.by_client("Ada")] == ["SQ-3", "SQ-2", "SQ-0"]
+    assert [q.quote_id for q in store.by_client("Ada", limit=1)] == ["SQ-3"]
+    assert store.by_client("Nobody") == []
+    between = store.issued_between(datetime(2025, 3, 2), datetime(2025, 3, 5))
+    assert [q.quote_id for q in between] == ["SQ-1", "SQ-2"]
+    assert [q.quote_id for q in store.issued_between(0, datetime(2025, 3, 2).timestamp())] == ["SQ-0"]
+
+
+@pytest.mark.parametrize("statement", [
+    "UPDATE quote SET client = 'Mallory'",
+    "DELETE FROM quote",
+])
+def test_rows_cannot_be_changed(store, statement):
+    c = consignment()
+    store.save(c, priced(c), LYON)
+    with sqlite3.connect(store.path) as conn, pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute(statement)
+    assert store.get("SQ-1").client == "Ada"
+
+
+def test_reissue_prints_the_rates_as_issued(store, monkeypatch):
+    c = consignment(currency="GBP")
+    issued = DEFAULT_RATES._replace(vat_rate=0.2, insurance_rate=0.02,
+                                    currency_rate={**DEFAULT_RATES.currency_rate, "GBP": 0.8})
+    store.save(c, priced(c), LYON, issued_at=datetime(2025, 3, 1), rates=issued)
+    rendered = []
+    monkeypatch.setattr("shipquote.store.render_quote_pdf",
+                        lambda consignment, result, rates, issued, output: rendered.append((rates, issued)))
+
+    today = DEFAULT_RATES._replace(vat_rate=0.25, insurance_rate=0.03,
+                                   currency_rate={**DEFAULT_RATES.currency_rate, "GBP": 0.9})
+    render_stored_pdf(store.get("SQ-1"), today)
+
+    rates, date = rendered[0]
+    assert (rates.vat_rate, rates.insurance_rate, rates.currency_rate["GBP"]) == (0.2, 0.02, 0.8)
+    assert date == datetime(2025, 3, 1)
+
+
+def test_reissue_renders_a_pdf(store):
+    c = consignment()
+    store.save(c, priced(c), LYON)
+    assert store.render_pdf("SQ-1").startswith(b"%PDF")
+    with pytest.raises(KeyError):
+        store.render_pdf("SQ-UNKNOWN")